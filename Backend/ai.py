@@ -2,38 +2,28 @@ from flask import Blueprint, request, jsonify, session
 import mysql.connector
 from mysql.connector import Error
 from ai_scheduler import AIScheduler
-from config import Config
+from ai_io import flow_route
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import pytz
-from database import get_db_connection
+from shards import get_shard_connection
+from versioning import bump_data_version
+from logs import get_logger
 
 load_dotenv()
 
 ai_bp = Blueprint('ai', __name__)
-
-# --- Database Configuration from Environment Variables ---
-DB_HOST = Config.DB_HOST
-DB_USER = Config.DB_USER
-DB_PASSWORD = Config.DB_PASSWORD
-DB_DATABASE = Config.DB_DATABASE
-
-def get_db_connection():
-    try:
-        return mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_DATABASE
-        )
-    except Error as e:
-        print(f"❌ DB Connection Error: {e}")
-        return None
+log = get_logger(__name__)
 
 ai_scheduler = AIScheduler()
 
-@ai_bp.route('/api/<user_id>/ai/generate-schedule', methods=['POST'])
-def generate_schedule_with_user():
+def init_ai_scheduler():
+    """Rebuilds the provider clients; called once in each worker after fork."""
+    global ai_scheduler
+    ai_scheduler = AIScheduler()
+
+@flow_route(ai_bp, '/api/<user_id>/ai/generate-schedule', methods=['POST'])
+def generate_schedule_with_user(user_id):
     if 'user_id' not in session:
         return jsonify({'message': 'Not logged in'}), 401
 
@@ -43,13 +33,13 @@ def generate_schedule_with_user():
         return jsonify({'message': 'Prompt is required'}), 400
 
     try:
-        tasks = ai_scheduler.generate_tasks(prompt)
+        tasks = yield from ai_scheduler.generate_tasks(prompt, session['user_id'])
         return jsonify(tasks), 200
     except Exception as e:
-        print(f"Error in AI generation: {e}")
+        log.exception("ai.generate_failed")
         return jsonify({'message': 'Failed to generate tasks from AI.'}), 500
 
-@ai_bp.route('/api/ai/generate-schedule', methods=['POST'])
+@flow_route(ai_bp, '/api/ai/generate-schedule', methods=['POST'])
 def generate_schedule():
     if 'user_id' not in session:
         return jsonify({'message': 'Not logged in'}), 401
@@ -60,10 +50,10 @@ def generate_schedule():
         return jsonify({'message': 'Prompt is required'}), 400
 
     try:
-        tasks = ai_scheduler.generate_tasks(prompt)
+        tasks = yield from ai_scheduler.generate_tasks(prompt, session['user_id'])
         return jsonify(tasks), 200
     except Exception as e:
-        print(f"Error in AI generation: {e}")
+        log.exception("ai.generate_failed")
         return jsonify({'message': 'Failed to generate tasks from AI.'}), 500
 
 @ai_bp.route('/api/ai/add-task', methods=['POST'])
@@ -83,7 +73,7 @@ def add_ai_task_to_schedule():
     if not all([title, description, category, date, time, reminder_setting]):
         return jsonify({'message': 'All task fields are required'}), 400
 
-    conn = get_db_connection()
+    conn = get_shard_connection(user_id)
     if conn is None:
         return jsonify({'message': 'Database connection error'}), 500
 
@@ -118,6 +108,7 @@ def add_ai_task_to_schedule():
         )
         values = (user_id, title, description, category, date, time, reminder_setting, reminder_datetime_str, False, False, False, False)
         cursor.execute(query, values)
+        bump_data_version(cursor, user_id)
         conn.commit()
         return jsonify({'message': 'Task added to schedule successfully'}), 201
     except mysql.connector.Error as err:
@@ -1,15 +1,19 @@
-import os
 import re
 import json
-import cohere
 from flask import Blueprint, request, jsonify, session
 from dotenv import load_dotenv
-import google.generativeai as genai
-from database import get_db_connection # Make sure you can import your DB connection
+from shards import get_shard_connection, BucketMoving
 from mysql.connector import Error
+from versioning import bump_data_version
+from ai_batch import batched
+from ai_io import (flow_route, blocking, gemini_generate, gemini_chat, cohere_chat, groq_chat,
+                   llm_available, init_llm_clients)
+from logs import get_logger
+from event_cache import get_upcoming_events
+from recurrence import create_recurring_event, get_occurrences
+from categories import assign_categories
 from datetime import datetime, timedelta
 import pytz
-from groq import Groq
 
 # Configure IST timezone
 IST = pytz.timezone('Asia/Kolkata')
@@ -17,32 +21,151 @@ IST = pytz.timezone('Asia/Kolkata')
 load_dotenv()
 
 ai_assistant_bp = Blueprint('ai_assistant', __name__)
+log = get_logger(__name__)
 
-# API configurations
-api_key = os.getenv("GOOGLE_GEMINI_API_KEY")
-cohere_api_key = os.getenv("COHERE_API_KEY")
-groq_api_key = os.getenv("GROQ_API_KEY")
+def init_ai_clients():
+    """Creates the provider clients (ai_io.py); called again in each worker after fork."""
+    init_llm_clients()
+    if not llm_available('gemini'):
+        log.warning("config.missing_key", key="GOOGLE_GEMINI_API_KEY")
 
-if api_key:
-    genai.configure(api_key=api_key)
-else:
-    print("Warning: GOOGLE_GEMINI_API_KEY not found in .env file.")
+init_ai_clients()
 
-# Initialize backup AI clients
-co = None
-groq_client = None
 
-if cohere_api_key:
-    co = cohere.Client(cohere_api_key)
+def _complete(prompt, operation, gemini_model, max_tokens):
+    """
+    Flow (ai_io.py): asks Gemini, then Cohere if Gemini raised, then Groq if
+    Cohere raised. Returns the stripped reply, or None if the provider whose
+    turn it was has no key. A Groq error is raised to the caller.
+    """
+    try:
+        if not llm_available('gemini'):
+            return None
+        response = yield gemini_generate(gemini_model, prompt)
+        text = response.text.strip()
+        log.debug(f"llm.{operation}", sample=True, provider="gemini", response=text)
+        return text
+    except Exception as gemini_error:
+        log.warning("llm.failed", provider="gemini", operation=operation, error=str(gemini_error))
+
+    try:
+        if not llm_available('cohere'):
+            return None
+        response = yield cohere_chat(
+            model='command-a-03-2025',
+            message=prompt,
+            max_tokens=max_tokens,
+            temperature=0.1
+        )
+        text = (response.text if hasattr(response, 'text') else str(response)).strip()
+        log.debug(f"llm.{operation}", sample=True, provider="cohere", response=text)
+        return text
+    except Exception as cohere_error:
+        log.warning("llm.failed", provider="cohere", operation=operation, error=str(cohere_error))
+
+    if not llm_available('groq'):
+        return None
+    response = yield groq_chat(
+        model="llama-3.1-8b-instant",
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        temperature=0.1
+    )
+    text = response.choices[0].message.content.strip()
+    log.debug(f"llm.{operation}", sample=True, provider="groq", response=text)
+    return text
+
+
+def _valid_extraction(answer):
+    """Whether a batched extraction answer has the shape _extraction_prompt asks for."""
+    return isinstance(answer, dict) and isinstance(answer.get('events'), list) \
+        and all(isinstance(event, dict) for event in answer['events'])
+
+
+def _extraction_prompt(message_line):
+    """
+    The event-extraction prompt. `message_line` introduces the user's
+    message; batched calls (ai_batch.py) list the messages after it instead.
+    """
+    now = datetime.now(IST)
+    return f"""
+    You are an AI assistant that extracts event details from user messages.
+    
+    Today is {now.strftime('%A, %Y-%m-%d')}.
+    Current time: {now.strftime('%H:%M')}
+    
+    {message_line}
+    
+    Extract ALL events mentioned in this message. For each event determine:
+    1. Title (what is the event)
+    2. Description (brief relevant description with context)
+    3. Date (convert relative dates like "tomorrow", "next week" to YYYY-MM-DD format)
+    4. Time (MUST be in HH:MM format, NEVER use "TBD")
+    5. Reminder setting (default "15 minutes" unless specified)
     
-if groq_api_key:
-    groq_client = Groq(api_key=groq_api_key)
+    TIME REQUIREMENTS:
+    - ALWAYS provide a time in HH:MM format (e.g. "09:00", "14:30")
+    - NEVER use "TBD", "unknown", or empty time
+    - Default times: morning events "09:00", afternoon "14:00", evening "19:00"
+    - For school/learning events, use "09:00" as default
+    
+    DATE INTERPRETATION EXAMPLES:
+    - Current date: {now.strftime('%Y-%m-%d')} (September 29, 2025)
+    this is only example
+    - "on 1" → "2025-10-01" (October 1st)
+    - "on 2" → "2025-10-02" (October 2nd)  
+    - "on 5" → "2025-10-05" (October 5th)
+    - "on 7" → "2025-10-07" (October 7th)
+    - "on 15" → "2025-10-15" (October 15th)
+    - "on 25" → "2025-10-25" (October 25th)
+    - "tomorrow" → {(now + timedelta(days=1)).strftime('%Y-%m-%d')}
+    - "today" → {now.strftime('%Y-%m-%d')}
+    
+    CRITICAL RULE: Match the EXACT day number from user input!
+    
+    VALIDATION: 
+    - If user says "on 7", the date MUST be "2025-10-07"
+    - If user says "on 15", the date MUST be "2025-10-15"  
+    - NEVER use today's date unless user says "today"
+    - NEVER use "2025-09-29" unless user specifically mentions today
+    
+    Rules:
+    - If no date specified, assume today
+    - If no time specified, ALWAYS use "09:00" as default (NEVER use "TBD" or empty time)
+    - Handle multiple events in one message
+    - Convert times like "2pm" to "14:00"
+    - For "on [number]", interpret as that EXACT day number of current/next month
+    - NEVER change the day number: "on 5" = day 5, "on 15" = day 15, etc.
+    - For repeating events ("every weekday", "each Monday", "daily", "monthly"), create ONE event
+      dated on its first occurrence and add a "recurrence" object, e.g.
+      {{"freq": "weekly", "weekdays": ["mon", "tue", "wed", "thu", "fri"]}}, {{"freq": "daily", "interval": 2}}
+      or {{"freq": "monthly", "until": "YYYY-MM-DD"}}. Omit "recurrence" for one-off events.
+    
+    Respond with ONLY this JSON format:
+    {{
+        "events": [
+            {{
+                "title": "Event Title",
+                "description": "Detailed description with context",
+                "date": "YYYY-MM-DD",
+                "time": "HH:MM",
+                "reminder_setting": "15 minutes"
+            }}
+        ]
+    }}
+    """
+
+
+def _complete_extraction(prompt, count):
+    """Flow: _complete() for an extraction prompt answering `count` messages."""
+    return (yield from _complete(prompt, "extraction", 'gemini-2.0-flash', max_tokens=500 * count))
+
 
 # --- SMART AI EVENT DETECTION AND CREATION ---
 def detect_and_create_events(user_message, user_id):
     """
-    Uses AI to intelligently detect if the user message contains events
-    and automatically creates them. Only returns JSON when events are found.
+    Flow (ai_io.py): uses AI to intelligently detect if the user message
+    contains events and automatically creates them. Returns (created, message).
     """
     
     # First, use AI to determine if this message contains events
@@ -74,49 +197,11 @@ def detect_and_create_events(user_message, user_id):
     """
     
     # Try different AI services to detect events
-    event_detection_result = None
-    
     try:
-        # Try Gemini first (primary AI)
-        if api_key:
-            model = genai.GenerativeModel('gemini-1.5-pro')  # Using working model
-            response = model.generate_content(detection_prompt)
-            event_detection_result = response.text.strip()
-            print(f"Gemini detection result: {event_detection_result}")
-    except Exception as gemini_error:
-        print(f"Gemini detection failed: {gemini_error}")
-        
-        try:
-            # Fallback to Cohere
-            if co:
-                response = co.chat(
-                    model='command-a-03-2025',
-                    message=detection_prompt,
-                    max_tokens=20,
-                    temperature=0.1
-                )
-                if hasattr(response, 'text'):
-                    event_detection_result = response.text.strip()
-                else:
-                    event_detection_result = str(response).strip()
-                print(f"Cohere detection result: {event_detection_result}")
-        except Exception as cohere_error:
-            print(f"Cohere detection failed: {cohere_error}")
-            
-            try:
-                # Final fallback to Groq
-                if groq_client:
-                    response = groq_client.chat.completions.create(
-                        model="llama-3.1-8b-instant",
-                        messages=[{"role": "user", "content": detection_prompt}],
-                        max_tokens=20,
-                        temperature=0.1
-                    )
-                    event_detection_result = response.choices[0].message.content.strip()
-                    print(f"Groq detection result: {event_detection_result}")
-            except Exception as groq_error:
-                print(f"All AI detection failed: {groq_error}")
-                return False, "AI detection services unavailable"
+        event_detection_result = yield from _complete(detection_prompt, "detection", 'gemini-1.5-pro', max_tokens=20)
+    except Exception as groq_error:
+        log.error("llm.all_failed", operation="detection", error=str(groq_error))
+        return False, "AI detection services unavailable"
     
     # If no events detected, check for deletion requests
     if not event_detection_result or "NO_EVENTS" in event_detection_result or "QUESTION" in event_detection_result:
@@ -124,128 +209,21 @@ def detect_and_create_events(user_message, user_id):
     
     # If deletion request detected, handle event deletion
     if "DELETE_EVENTS" in event_detection_result:
-        return handle_event_deletion(user_message, user_id)
+        return (yield from handle_event_deletion(user_message, user_id))
     
     # If events found, extract them with AI
     if "EVENTS_FOUND" in event_detection_result:
-        extraction_prompt = f"""
-        You are an AI assistant that extracts event details from user messages.
-        
-        Today is {today}.
-        Current time: {datetime.now(IST).strftime('%H:%M')}
-        
-        User message: "{user_message}"
-        
-        Extract ALL events mentioned in this message. For each event determine:
-        1. Title (what is the event)
-        2. Description (brief relevant description with context)
-        3. Category (from allowed categories only)
-        4. Date (convert relative dates like "tomorrow", "next week" to YYYY-MM-DD format)
-        5. Time (MUST be in HH:MM format, NEVER use "TBD")
-        6. Reminder setting (default "15 minutes" unless specified)
-        
-        ALLOWED CATEGORIES (choose most appropriate):
-        work, home, sports, fun, health, fitness, personal, learning, finance, errands, cleaning, gardening, cooking, pets, meeting, commute, networking, admin, social, entertainment, travel, hobby, volunteering, important, to-do, later, family
-        
-        TIME REQUIREMENTS:
-        - ALWAYS provide a time in HH:MM format (e.g. "09:00", "14:30")
-        - NEVER use "TBD", "unknown", or empty time
-        - Default times: morning events "09:00", afternoon "14:00", evening "19:00"
-        - For school/learning events, use "09:00" as default
-        
-        DATE INTERPRETATION EXAMPLES:
-        - Current date: {datetime.now(IST).strftime('%Y-%m-%d')} (September 29, 2025)
-        this is only example
-        - "on 1" → "2025-10-01" (October 1st)
-        - "on 2" → "2025-10-02" (October 2nd)  
-        - "on 5" → "2025-10-05" (October 5th)
-        - "on 7" → "2025-10-07" (October 7th)
-        - "on 15" → "2025-10-15" (October 15th)
-        - "on 25" → "2025-10-25" (October 25th)
-        - "tomorrow" → {(datetime.now(IST) + timedelta(days=1)).strftime('%Y-%m-%d')}
-        - "today" → {datetime.now(IST).strftime('%Y-%m-%d')}
-        
-        CRITICAL RULE: Match the EXACT day number from user input!
-        
-        VALIDATION: 
-        - If user says "on 7", the date MUST be "2025-10-07"
-        - If user says "on 15", the date MUST be "2025-10-15"  
-        - NEVER use today's date unless user says "today"
-        - NEVER use "2025-09-29" unless user specifically mentions today
-        
-        Rules:
-        - If no date specified, assume today
-        - If no time specified, ALWAYS use "09:00" as default (NEVER use "TBD" or empty time)
-        - Handle multiple events in one message
-        - Convert times like "2pm" to "14:00"
-        - For "on [number]", interpret as that EXACT day number of current/next month
-        - NEVER change the day number: "on 5" = day 5, "on 15" = day 15, etc.
-        - Use "meeting" category for meetings, calls, appointments
-        - Use "health" for doctor/dentist appointments
-        - Use "fitness" for gym/workout activities
-        - Use "learning" for school, class, education events
-        
-        Respond with ONLY this JSON format:
-        {{
-            "events": [
-                {{
-                    "title": "Event Title",
-                    "description": "Detailed description with context",
-                    "category": "meeting",
-                    "date": "YYYY-MM-DD",
-                    "time": "HH:MM",
-                    "reminder_setting": "15 minutes"
-                }}
-            ]
-        }}
-        """
-        
-        # Extract events using AI
-        events_json = None
-        
+        # Extract events using AI; concurrent extractions may share one call (ai_batch.py)
+        extraction_prompt = _extraction_prompt(f'User message: "{user_message}"')
+        log.debug("llm.extraction_prompt", sample=True, message=user_message, prompt=extraction_prompt)
         try:
-            # Try Gemini for extraction
-            if api_key:
-                print(f"[DEBUG] Extraction prompt for '{user_message}':")
-                print(f"[DEBUG] Date interpretation should map 'on 5' to October 5th")
-                model = genai.GenerativeModel('gemini-2.0-flash')  # Using faster model
-                response = model.generate_content(extraction_prompt)
-                events_json = response.text.strip()
-                print(f"Gemini extraction result: {events_json}")
-        except Exception as gemini_error:
-            print(f"Gemini extraction failed: {gemini_error}")
-            
-            try:
-                # Fallback to Cohere for extraction
-                if co:
-                    response = co.chat(
-                        model='command-a-03-2025',
-                        message=extraction_prompt,
-                        max_tokens=500,
-                        temperature=0.1
-                    )
-                    if hasattr(response, 'text'):
-                        events_json = response.text.strip()
-                    else:
-                        events_json = str(response).strip()
-                    print(f"Cohere extraction result: {events_json}")
-            except Exception as cohere_error:
-                print(f"Cohere extraction failed: {cohere_error}")
-                
-                try:
-                    # Final fallback to Groq for extraction
-                    if groq_client:
-                        response = groq_client.chat.completions.create(
-                            model="llama-3.1-8b-instant",
-                            messages=[{"role": "user", "content": extraction_prompt}],
-                            max_tokens=500,
-                            temperature=0.1
-                        )
-                        events_json = response.choices[0].message.content.strip()
-                        print(f"Groq extraction result: {events_json}")
-                except Exception as groq_error:
-                    print(f"All AI extraction failed: {groq_error}")
-                    return False, "AI extraction services unavailable"
+            events_json = yield batched(
+                "extraction", user_id, _extraction_prompt("The user messages are listed under REQUESTS below."),
+                user_message, _complete_extraction, extraction_prompt, _valid_extraction
+            )
+        except Exception as groq_error:
+            log.error("llm.all_failed", operation="extraction", error=str(groq_error))
+            return False, "AI extraction services unavailable"
         
         # Parse and save events
         if events_json:
@@ -264,7 +242,7 @@ def detect_and_create_events(user_message, user_id):
                             original_date = event.get('date', '')
                             fixed_date = fix_date_interpretation(user_message, original_date)
                             if fixed_date != original_date:
-                                print(f"[DATE FIX] Changed {original_date} → {fixed_date} based on '{user_message}'")
+                                log.info("event.date_fixed", original=original_date, fixed=fixed_date, message=user_message)
                                 event['date'] = fixed_date
                         
                         # Check for conflicts before creating events
@@ -274,7 +252,8 @@ def detect_and_create_events(user_message, user_id):
                         for event in events_data['events']:
                             if all(key in event for key in ['title', 'date', 'time']):
                                 # Check for conflicts
-                                conflicts = check_event_conflicts(
+                                conflicts = yield blocking(
+                                    check_event_conflicts,
                                     user_id, 
                                     event['date'], 
                                     event['time'], 
@@ -283,7 +262,6 @@ def detect_and_create_events(user_message, user_id):
                                 
                                 if conflicts:
                                     # Store the pending event in session for later confirmation
-                                    from flask import session
                                     session['pending_event_with_conflict'] = event
                                     
                                     # Generate conflict warning
@@ -300,7 +278,7 @@ def detect_and_create_events(user_message, user_id):
                         # No conflicts found, create all events
                         created_count = 0
                         for event in events_to_create:
-                            if create_event_in_db(user_id, event):
+                            if (yield blocking(create_event_in_db, user_id, event)):
                                 created_count += 1
                         
                         if created_count > 0:
@@ -313,10 +291,12 @@ def detect_and_create_events(user_message, user_id):
                     return False, "Could not parse JSON from AI response"
                     
             except json.JSONDecodeError as e:
-                print(f"JSON parsing error: {e}")
+                log.warning("llm.bad_json", operation="extraction", error=str(e))
                 return False, "Invalid JSON format from AI"
+            except BucketMoving:
+                raise  # Answered with 503 (shards.py)
             except Exception as e:
-                print(f"Event creation error: {e}")
+                log.exception("event.create_failed")
                 return False, f"Error creating events: {str(e)}"
     
     return False, "No events detected by AI"
@@ -324,12 +304,13 @@ def detect_and_create_events(user_message, user_id):
 
 def handle_event_deletion(user_message, user_id):
     """
-    Handles event deletion requests using AI to identify which events to delete.
+    Flow (ai_io.py): handles event deletion requests using AI to identify
+    which events to delete.
     """
     today = datetime.now(IST).strftime('%A, %Y-%m-%d')
     
     # First, get user's current events to help with deletion
-    current_events = get_user_events_for_deletion(user_id)
+    current_events = yield blocking(get_user_events_for_deletion, user_id)
     
     if not current_events:
         return False, "No events found to delete"
@@ -375,49 +356,11 @@ def handle_event_deletion(user_message, user_id):
     """
     
     # Get AI analysis for which events to delete
-    deletion_analysis = None
-    
     try:
-        # Try Gemini first (primary AI)
-        if api_key:
-            model = genai.GenerativeModel('gemini-1.5-pro')
-            response = model.generate_content(deletion_prompt)
-            deletion_analysis = response.text.strip()
-            print(f"Gemini deletion analysis: {deletion_analysis}")
-    except Exception as gemini_error:
-        print(f"Gemini deletion analysis failed: {gemini_error}")
-        
-        try:
-            # Fallback to Cohere
-            if co:
-                response = co.chat(
-                    model='command-a-03-2025',
-                    message=deletion_prompt,
-                    max_tokens=500,
-                    temperature=0.1
-                )
-                if hasattr(response, 'text'):
-                    deletion_analysis = response.text.strip()
-                else:
-                    deletion_analysis = str(response).strip()
-                print(f"Cohere deletion analysis: {deletion_analysis}")
-        except Exception as cohere_error:
-            print(f"Cohere deletion analysis failed: {cohere_error}")
-            
-            try:
-                # Final fallback to Groq
-                if groq_client:
-                    response = groq_client.chat.completions.create(
-                        model="llama-3.1-8b-instant",
-                        messages=[{"role": "user", "content": deletion_prompt}],
-                        max_tokens=500,
-                        temperature=0.1
-                    )
-                    deletion_analysis = response.choices[0].message.content.strip()
-                    print(f"Groq deletion analysis: {deletion_analysis}")
-            except Exception as groq_error:
-                print(f"All AI deletion analysis failed: {groq_error}")
-                return False, "AI deletion analysis services unavailable"
+        deletion_analysis = yield from _complete(deletion_prompt, "deletion", 'gemini-1.5-pro', max_tokens=500)
+    except Exception as groq_error:
+        log.error("llm.all_failed", operation="deletion", error=str(groq_error))
+        return False, "AI deletion analysis services unavailable"
     
     # Parse deletion analysis
     if deletion_analysis:
@@ -466,7 +409,7 @@ def handle_event_deletion(user_message, user_id):
                     clean_json += '}'
                     brace_count -= 1
             
-            print(f"Attempting to parse JSON: {clean_json[:200]}...")
+            log.debug("llm.deletion_json", sample=True, response=clean_json)
             deletion_data = json.loads(clean_json)
             
             if 'delete_events' in deletion_data and deletion_data['delete_events']:
@@ -475,7 +418,7 @@ def handle_event_deletion(user_message, user_id):
                 
                 for event_to_delete in deletion_data['delete_events']:
                     event_id = event_to_delete.get('id')
-                    if event_id and delete_event_from_db(user_id, event_id):
+                    if event_id and (yield blocking(delete_event_from_db, user_id, event_id)):
                         deleted_count += 1
                         deleted_titles.append(event_to_delete.get('title', 'Unknown'))
                 
@@ -488,10 +431,10 @@ def handle_event_deletion(user_message, user_id):
                 return False, "No matching events found to delete"
                     
         except json.JSONDecodeError as e:
-            print(f"JSON parsing error in deletion: {e}")
+            log.warning("llm.bad_json", operation="deletion", error=str(e))
             return False, "Could not parse deletion analysis"
         except Exception as e:
-            print(f"Event deletion error: {e}")
+            log.exception("event.delete_failed")
             return False, f"Error processing deletion: {str(e)}"
     
     return False, "Could not analyze deletion request"
@@ -590,25 +533,33 @@ def check_event_conflicts(user_id, new_event_date, new_event_time, new_event_tit
     Check for potential conflicts with existing events on the same date/time
     """
     try:
-        conn = get_db_connection()
-        if not conn:
-            return []
+        if new_event_date >= datetime.now(IST).strftime('%Y-%m-%d'):
+            # Today onward is served from the upcoming-events cache
+            existing_events = get_upcoming_events(user_id, new_event_date, new_event_date) or []
+        else:
+            conn = get_shard_connection(user_id, write=False)
+            if not conn:
+                return []
+                
+            cursor = conn.cursor(dictionary=True)
             
-        cursor = conn.cursor(dictionary=True)
-        
-        # Check for events on the same date
-        query = """
-        SELECT id, title, date, time, category 
-        FROM events 
-        WHERE user_id = %s AND date = %s AND done = FALSE
-        ORDER BY time
-        """
-        
-        cursor.execute(query, (user_id, new_event_date))
-        existing_events = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+            # Check for events on the same date
+            query = """
+            SELECT id, title, date, time, category 
+            FROM events 
+            WHERE user_id = %s AND date = %s AND done = FALSE
+            ORDER BY time
+            """
+            
+            cursor.execute(query, (user_id, new_event_date))
+            existing_events = cursor.fetchall()
+            
+            cursor.close()
+            conn.close()
+
+        existing_events = list(existing_events) + [
+            o for o in get_occurrences(user_id, new_event_date, new_event_date, include_done=False) if o['time']
+        ]
         
         conflicts = []
         
@@ -637,7 +588,7 @@ def check_event_conflicts(user_id, new_event_date, new_event_time, new_event_tit
         return conflicts
         
     except Exception as e:
-        print(f"Error checking conflicts: {e}")
+        log.exception("event.conflict_check_failed")
         return []
 
 
@@ -675,51 +626,17 @@ def create_conflict_warning_message(conflicts, new_event_title, new_event_date,
 def get_user_events_for_deletion(user_id):
     """Get user's upcoming events for deletion analysis."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return []
-            
-        cursor = conn.cursor()
-        
-        # Get events from today onwards
-        today = datetime.now(IST).strftime('%Y-%m-%d')
-        query = """
-        SELECT id, title, description, date, time, category 
-        FROM events 
-        WHERE user_id = %s AND date >= %s AND done = 0
-        ORDER BY date, time
-        """
-        
-        cursor.execute(query, (user_id, today))
-        events = []
-        
-        for row in cursor.fetchall():
-            events.append({
-                'id': row[0],
-                'title': row[1],
-                'description': row[2],
-                'date': row[3],
-                'time': row[4],
-                'category': row[5]
-            })
-        
-        cursor.close()
-        conn.close()
-        
-        return events
-        
-    except Error as e:
-        print(f"Database error getting events for deletion: {e}")
-        return []
+        # Events from today onwards, from the shared upcoming-events cache
+        return get_upcoming_events(user_id) or []
     except Exception as e:
-        print(f"Error getting events for deletion: {e}")
+        log.exception("event.load_for_deletion_failed")
         return []
 
 
 def delete_event_from_db(user_id, event_id):
     """Delete a specific event from the database."""
     try:
-        conn = get_db_connection()
+        conn = get_shard_connection(user_id)
         if not conn:
             return False
             
@@ -730,29 +647,34 @@ def delete_event_from_db(user_id, event_id):
         cursor.execute(query, (event_id, user_id))
         
         deleted_rows = cursor.rowcount
+        if deleted_rows:
+            bump_data_version(cursor, user_id)
         conn.commit()
         
         cursor.close()
         conn.close()
         
-        print(f"✅ Deleted event ID {event_id} for user {user_id}")
+        log.info("event.deleted", event_id=event_id, user_id=user_id)
         return deleted_rows > 0
         
     except Error as e:
-        print(f"Database error deleting event: {e}")
+        log.error("event.delete_failed", event_id=event_id, error=str(e))
         if conn:
             conn.rollback()
             conn.close()
         return False
     except Exception as e:
-        print(f"Error deleting event: {e}")
+        log.exception("event.delete_failed", event_id=event_id)
         return False
 
 
 def create_event_in_db(user_id, event_data):
     """Helper function to create a single event in the database with exact JSON format."""
+    # The prompts no longer ask for a category; the local classifier picks one (categories.py)
+    assign_categories(user_id, [event_data])
+    conn = None
     try:
-        conn = get_db_connection()
+        conn = get_shard_connection(user_id)
         if not conn:
             return False
             
@@ -791,6 +713,20 @@ def create_event_in_db(user_id, event_data):
                 # Default to 15 minutes
                 reminder_datetime = event_datetime - timedelta(minutes=15)
         
+        # Repeating events become a single rule, expanded on read
+        if event_data.get('recurrence'):
+            event_data['reminder_setting'] = reminder_setting
+            try:
+                create_recurring_event(cursor, user_id, event_data, event_data['recurrence'])
+            except ValueError as e:
+                log.warning("event.invalid_recurrence", recurrence=event_data['recurrence'], error=str(e))
+            else:
+                conn.commit()
+                cursor.close()
+                conn.close()
+                log.info("event.recurring_created", user_id=user_id, date=event_data['date'], recurrence=event_data['recurrence'])
+                return True
+
         # Insert event into database
         query = """
         INSERT INTO events (user_id, title, description, category, date, time, done, reminder_setting, reminder_datetime)
@@ -801,7 +737,7 @@ def create_event_in_db(user_id, event_data):
             user_id,
             event_data['title'],
             event_data.get('description', ''),
-            event_data.get('category', 'personal'),  # Default to personal if not specified
+            event_data['category'],
             event_data['date'],
             event_data['time'],
             0,  # done = False (0)
@@ -810,108 +746,32 @@ def create_event_in_db(user_id, event_data):
         )
         
         cursor.execute(query, values)
+        bump_data_version(cursor, user_id)
         conn.commit()
         
         cursor.close()
         conn.close()
         
-        print(f"✅ Event created: {event_data['title']} on {event_data['date']} at {event_data['time']}")
-        print(f"   Category: {event_data.get('category', 'personal')}")
-        print(f"   Reminder: {reminder_setting} -> {reminder_datetime}")
+        log.info("event.created", user_id=user_id, title=event_data['title'], date=event_data['date'],
+                 time=event_data['time'], category=event_data['category'],
+                 reminder_setting=reminder_setting, reminder_datetime=reminder_datetime)
         
         return True
         
     except Error as e:
-        print(f"Database error creating event: {e}")
+        log.error("event.create_failed", error=str(e))
         if conn:
             conn.rollback()
             conn.close()
         return False
+    except BucketMoving:
+        raise  # Answered with 503 (shards.py)
     except Exception as e:
-        print(f"Error creating event: {e}")
+        log.exception("event.create_failed")
         return False
 
 
 # --- PATTERN-BASED FALLBACK FUNCTIONS (Kept for backup) ---
-        try:
-            chat_completion = groq_client.chat.completions.create(
-                messages=[
-                    {"role": "user", "content": extraction_prompt}
-                ],
-                model="llama3-8b-8192",  # Try standard model if available
-                temperature=0.1
-            )
-            response_text = chat_completion.choices[0].message.content.strip()
-            
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                event_details = json.loads(json_match.group())
-        except Exception as e:
-            print(f"Groq extraction failed: {e}")
-            # If Groq fails too, try another model
-            try:
-                chat_completion = groq_client.chat.completions.create(
-                    messages=[
-                        {"role": "user", "content": extraction_prompt}
-                    ],
-                    model="llama-3.1-8b-instant",  # Alternative Groq model
-                    temperature=0.1
-                )
-                response_text = chat_completion.choices[0].message.content.strip()
-                
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    event_details = json.loads(json_match.group())
-            except Exception as e2:
-                print(f"Groq alternative model also failed: {e2}")
-    
-    if not event_details or 'events' not in event_details:
-        # PATTERN-BASED FALLBACK: Create events even when AI APIs fail
-        print("AI APIs failed - attempting pattern-based event extraction")
-        event_details = extract_events_with_patterns(user_message)
-        
-        if not event_details or 'events' not in event_details or len(event_details['events']) == 0:
-            return False, "Could not extract event details"
-    
-    # Create all events in the database
-    created_events = []
-    conn = get_db_connection()
-    
-    if not conn:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = conn.cursor()
-        
-        for event in event_details['events']:
-            if all(key in event for key in ['title', 'date', 'time']):
-                query = "INSERT INTO events (user_id, title, description, date, time, done) VALUES (%s, %s, %s, %s, %s, %s)"
-                values = (
-                    user_id,
-                    event['title'],
-                    event.get('description', ''),
-                    event['date'],
-                    event['time'],
-                    0
-                )
-                cursor.execute(query, values)
-                created_events.append(event['title'])
-        
-        conn.commit()
-        
-        if created_events:
-            return True, f"Created {len(created_events)} events: {', '.join(created_events)}"
-        else:
-            return False, "No valid events to create"
-            
-    except Error as e:
-        print(f"Database error creating events: {e}")
-        return False, f"Database error: {e}"
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
-
 def extract_events_with_patterns(user_message):
     """
     Pattern-based event extraction as fallback when AI APIs are unavailable.
@@ -1073,7 +933,7 @@ def get_next_weekday(current_date, weekday):
     return current_date + timedelta(days_ahead)
 
 
-@ai_assistant_bp.route("/api/ai/test", methods=['POST'])
+@flow_route(ai_assistant_bp, "/api/ai/test", methods=['POST'])
 def ai_test_no_auth():
     """
     TEST ENDPOINT: AI chat without authentication (for debugging)
@@ -1087,10 +947,10 @@ def ai_test_no_auth():
         # Use your actual user ID from the database
         actual_user_id = "8620b861-ea55-478a-b1b4-f266cb6a999d"  # rakesh user
         
-        print(f"[DEBUG] Testing message: '{user_message}' for user: {actual_user_id}")
+        log.debug("ai.test_message", message=user_message, user_id=actual_user_id)
         
         # Test both creation and deletion
-        result = detect_and_create_events(user_message, actual_user_id)
+        result = yield from detect_and_create_events(user_message, actual_user_id)
         
         if isinstance(result, tuple):
             success, message = result
@@ -1125,46 +985,27 @@ def ai_test_no_auth():
             })
 
     except Exception as e:
-        print(f"An error occurred in ai_test_no_auth: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("ai.test_failed")
         return jsonify({"error": f"Debug error: {str(e)}"}), 500
 
 
 # --- HELPER FUNCTION TO GET SCHEDULE ---
 def _get_user_schedule(user_id):
-    """Fetches all the user's upcoming events from the database."""
-    conn = get_db_connection()
-    if not conn:
-        return "Database connection failed."
+    """Fetches all the user's upcoming events (via the upcoming-events cache)."""
+    events = get_upcoming_events(user_id)
+    if events is None:
+        return "Could not retrieve schedule due to a database error."
     
-    try:
-        cursor = conn.cursor(dictionary=True)
-        # Get all events from today onwards
-        today = datetime.now(IST).strftime('%Y-%m-%d')
-        
-        query = "SELECT title, date, time FROM events WHERE user_id = %s AND date >= %s AND done = FALSE ORDER BY date, time"
-        cursor.execute(query, (user_id, today))
-        events = cursor.fetchall()
-        
-        if not events:
-            return "The user's schedule is currently clear."
-            
-        # Format the events into a clean string for the AI
-        schedule_string = "Here is the user's complete schedule:\n"
-        for event in events:
-            schedule_string += f"- On {event['date']} at {event['time']}: {event['title']}\n"
-        return schedule_string
+    if not events:
+        return "The user's schedule is currently clear."
         
-    except Error as e:
-        print(f"Database error fetching schedule: {e}")
-        return "Could not retrieve schedule due to a database error."
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+    # Format the events into a clean string for the AI
+    schedule_string = "Here is the user's complete schedule:\n"
+    for event in events:
+        schedule_string += f"- On {event['date']} at {event['time']}: {event['title']}\n"
+    return schedule_string
 
-@ai_assistant_bp.route("/api/ai/chat", methods=['POST'])
+@flow_route(ai_assistant_bp, "/api/ai/chat", methods=['POST'])
 def ai_chat_automatic():
     """
     Enhanced AI chat with AUTOMATIC multiple event detection and creation.
@@ -1186,7 +1027,7 @@ def ai_chat_automatic():
             pending_event = session.get('pending_event_with_conflict')
             if pending_event:
                 # Create the event despite conflict
-                if create_event_in_db(user_id, pending_event):
+                if (yield blocking(create_event_in_db, user_id, pending_event)):
                     session.pop('pending_event_with_conflict', None)  # Clear pending event
                     return jsonify({
                         "reply": f"✅ Event '{pending_event['title']}' created successfully despite the conflict!",
@@ -1209,7 +1050,7 @@ def ai_chat_automatic():
                 })
         
         # 1. FIRST: Check for automatic event creation (including multiple events)
-        event_created, creation_message = detect_and_create_events(user_message, user_id)
+        event_created, creation_message = yield from detect_and_create_events(user_message, user_id)
         
         # Handle conflict warnings
         if not event_created and "SCHEDULING CONFLICT DETECTED" in creation_message:
@@ -1222,7 +1063,7 @@ def ai_chat_automatic():
             })
         
         # 2. Get updated schedule after potential event creation
-        schedule_context = _get_user_schedule(user_id)
+        schedule_context = yield blocking(_get_user_schedule, user_id)
         
         # 3. Prepare chat history
         history = session.get('chat_history', [])
@@ -1251,18 +1092,16 @@ def ai_chat_automatic():
         ai_response_text = None
         
         # Try Gemini first (primary AI)
-        if api_key:
+        if llm_available('gemini'):
             try:
-                model = genai.GenerativeModel('gemini-1.5-pro')
-                chat = model.start_chat(history=history)
-                response = chat.send_message(user_message)
+                response = yield gemini_chat('gemini-1.5-pro', history, user_message)
                 ai_response_text = response.text
-                print("✓ Used Gemini API for chat response")
+                log.debug("llm.chat", sample=True, provider="gemini")
             except Exception as e:
-                print(f"Gemini API failed: {e}")
+                log.warning("llm.failed", provider="gemini", operation="chat", error=str(e))
         
         # Fallback to Cohere if Gemini fails
-        if not ai_response_text and co:
+        if not ai_response_text and llm_available('cohere'):
             try:
                 # Prepare chat history for Cohere
                 cohere_messages = []
@@ -1272,7 +1111,7 @@ def ai_chat_automatic():
                     elif msg['role'] == 'model':
                         cohere_messages.append({"role": "assistant", "content": msg['parts'][0]['text']})
                 
-                response = co.chat(
+                response = yield cohere_chat(
                     model='command-a-03-2025',
                     message=f"{system_prompt}\n\nUser: {user_message}\n\nAssistant:",
                     max_tokens=1000,
@@ -1282,12 +1121,12 @@ def ai_chat_automatic():
                     ai_response_text = response.text
                 else:
                     ai_response_text = str(response)
-                print("✓ Used Cohere API as fallback for chat response")
+                log.debug("llm.chat", sample=True, provider="cohere")
             except Exception as e:
-                print(f"Cohere API failed: {e}")
+                log.warning("llm.failed", provider="cohere", operation="chat", error=str(e))
         
         # Final fallback to Groq if both fail
-        if not ai_response_text and groq_client:
+        if not ai_response_text and llm_available('groq'):
             try:
                 # Convert history to Groq format
                 groq_messages = [{"role": "system", "content": system_prompt}]
@@ -1297,21 +1136,21 @@ def ai_chat_automatic():
                     elif msg['role'] == 'model':
                         groq_messages.append({"role": "assistant", "content": msg['parts'][0]['text']})
                 
-                chat_completion = groq_client.chat.completions.create(
+                chat_completion = yield groq_chat(
                     messages=groq_messages,
                     model="llama-3.1-8b-instant",  # Using the working model
                     temperature=0.3,
                     max_tokens=1000
                 )
                 ai_response_text = chat_completion.choices[0].message.content
-                print("✓ Used Groq API as final fallback for chat response")
+                log.debug("llm.chat", sample=True, provider="groq")
             except Exception as e:
-                print(f"Groq API failed: {e}")
+                log.warning("llm.failed", provider="groq", operation="chat", error=str(e))
                 try:
                     # Try Cohere as final fallback
-                    if cohere_api_key:
-                        co_fallback = cohere.Client(cohere_api_key)
-                        response = co_fallback.chat(
+                    if llm_available('cohere'):
+                        response = yield cohere_chat(
+                            depth=3,
                             message=f"{system_prompt}\n\nUser: {user_message}",
                             model="command-a-03-2025",
                             temperature=0.3
@@ -1320,9 +1159,9 @@ def ai_chat_automatic():
                             ai_response_text = response.text.strip()
                         else:
                             ai_response_text = str(response).strip()
-                        print("✓ Used Cohere API as final fallback for chat response")
+                        log.debug("llm.chat", sample=True, provider="cohere", retry=True)
                 except Exception as e:
-                    print(f"Cohere API failed: {e}")
+                    log.warning("llm.failed", provider="cohere", operation="chat", error=str(e))
         
         # If all APIs failed
         if not ai_response_text:
@@ -1343,6 +1182,8 @@ def ai_chat_automatic():
             "creation_message": creation_message if event_created else None
         })
 
+    except BucketMoving:
+        raise  # Answered with 503 (shards.py)
     except Exception as e:
-        print(f"An error occurred in ai_chat_automatic: {e}")
+        log.exception("ai.chat_failed")
         return jsonify({"error": "An error occurred while processing your message."}), 500
\ No newline at end of file
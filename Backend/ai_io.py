@@ -0,0 +1,221 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import cohere
+import google.generativeai as genai
+from groq import Groq, AsyncGroq
+from config import Config
+from metrics import record_llm_call
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- AI Request Flows ---
+# The AI endpoints spend nearly all their time waiting on LLM providers. Their
+# logic is written once, as generator "flows" that yield each piece of I/O
+# instead of performing it:
+#
+#     response = yield groq_chat(model=..., messages=[...])
+#     events = yield blocking(get_upcoming_events, user_id)
+#
+# run_flow() drives a flow on the calling thread with the providers' sync
+# clients; the Flask views use it. run_flow_async() drives it on an event
+# loop (asgi.py): LLM calls await the providers' async clients and blocking
+# steps (database work through the usual pools and shard routing) run on a
+# small thread pool, so a chat waiting on a provider holds no thread.
+#
+# A failed call is raised inside the flow at its yield, so the flows' Gemini
+# -> Cohere -> Groq fallbacks read like plain try/except.
+
+_keys = {"gemini": None, "cohere": None, "groq": None}
+_sync_clients = {}
+_async_clients = {"pid": None}
+_executor = {"pool": None, "pid": None, "threads": 8}
+_executor_lock = threading.Lock()
+
+# Flask endpoint name -> flow function, for asgi.py
+flow_views = {}
+
+
+class LLMCall:
+    """One provider request. `depth` overrides its fallback position in /metrics."""
+
+    def __init__(self, provider, operation, depth=None, **kwargs):
+        self.provider = provider
+        self.operation = operation
+        self.depth = depth
+        self.kwargs = kwargs
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            result = _SYNC_CALLS[self.provider, self.operation](**self.kwargs)
+        except Exception:
+            record_llm_call(self.provider, time.perf_counter() - started, False)
+            raise
+        record_llm_call(self.provider, time.perf_counter() - started, True, self.depth)
+        return result
+
+    async def run_async(self):
+        started = time.perf_counter()
+        try:
+            result = await _ASYNC_CALLS[self.provider, self.operation](**self.kwargs)
+        except Exception:
+            record_llm_call(self.provider, time.perf_counter() - started, False)
+            raise
+        record_llm_call(self.provider, time.perf_counter() - started, True, self.depth)
+        return result
+
+
+class Blocking:
+    """A short blocking call, e.g. a database read or write."""
+
+    def __init__(self, function, *args, **kwargs):
+        self.call = partial(function, *args, **kwargs)
+
+    def run(self):
+        return self.call()
+
+    async def run_async(self):
+        # The copied context carries the Flask request context (and session) into the thread
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(_blocking_pool(), context.run, self.call)
+
+
+def gemini_generate(model, prompt):
+    return LLMCall("gemini", "generate", model=model, prompt=prompt)
+
+
+def gemini_chat(model, history, message):
+    return LLMCall("gemini", "chat", model=model, history=history, message=message)
+
+
+def cohere_chat(depth=None, **kwargs):
+    return LLMCall("cohere", "chat", depth=depth, **kwargs)
+
+
+def groq_chat(**kwargs):
+    return LLMCall("groq", "chat", **kwargs)
+
+
+blocking = Blocking
+
+
+def llm_available(provider):
+    """True if `provider` ("gemini", "cohere", "groq") has an API key."""
+    return bool(_keys[provider])
+
+
+# --- Provider Clients ---
+def _async_client(provider):
+    if _async_clients["pid"] != os.getpid():
+        _async_clients.clear()
+        _async_clients["pid"] = os.getpid()
+    if provider not in _async_clients:
+        if provider == "cohere":
+            _async_clients[provider] = cohere.AsyncClient(_keys["cohere"])
+        else:
+            _async_clients[provider] = AsyncGroq(api_key=_keys["groq"])
+    return _async_clients[provider]
+
+
+_SYNC_CALLS = {
+    ("gemini", "generate"): lambda model, prompt: genai.GenerativeModel(model).generate_content(prompt),
+    ("gemini", "chat"): lambda model, history, message:
+        genai.GenerativeModel(model).start_chat(history=history).send_message(message),
+    ("cohere", "chat"): lambda **kwargs: _sync_clients["cohere"].chat(**kwargs),
+    ("groq", "chat"): lambda **kwargs: _sync_clients["groq"].chat.completions.create(**kwargs),
+}
+
+_ASYNC_CALLS = {
+    ("gemini", "generate"): lambda model, prompt: genai.GenerativeModel(model).generate_content_async(prompt),
+    ("gemini", "chat"): lambda model, history, message:
+        genai.GenerativeModel(model).start_chat(history=history).send_message_async(message),
+    ("cohere", "chat"): lambda **kwargs: _async_client("cohere").chat(**kwargs),
+    ("groq", "chat"): lambda **kwargs: _async_client("groq").chat.completions.create(**kwargs),
+}
+
+
+def init_llm_clients():
+    """
+    Reads the provider keys and creates the sync Cohere and Groq clients.
+    Their HTTP connection pools must not be shared across fork(), so each
+    worker calls this again after forking. Async clients are created on first
+    use in the process that runs the event loop.
+    """
+    _keys.update(gemini=os.getenv("GOOGLE_GEMINI_API_KEY"), cohere=os.getenv("COHERE_API_KEY"),
+                 groq=os.getenv("GROQ_API_KEY"))
+    if _keys["gemini"]:
+        genai.configure(api_key=_keys["gemini"])
+    _sync_clients.clear()
+    if _keys["cohere"]:
+        _sync_clients["cohere"] = cohere.Client(_keys["cohere"])
+    if _keys["groq"]:
+        _sync_clients["groq"] = Groq(api_key=_keys["groq"])
+    _async_clients.update(pid=None)
+
+
+# --- Drivers ---
+def run_flow(flow):
+    """Runs a flow to completion on this thread and returns its result."""
+    value, error = None, None
+    while True:
+        try:
+            step = flow.throw(error) if error is not None else flow.send(value)
+        except StopIteration as done:
+            return done.value
+        value, error = None, None
+        try:
+            value = step.run()
+        except Exception as e:
+            error = e
+
+
+async def run_flow_async(flow):
+    """Runs a flow to completion on the running event loop and returns its result."""
+    value, error = None, None
+    while True:
+        try:
+            step = flow.throw(error) if error is not None else flow.send(value)
+        except StopIteration as done:
+            return done.value
+        value, error = None, None
+        try:
+            value = await step.run_async()
+        except Exception as e:
+            error = e
+
+
+def flow_route(blueprint, rule, **options):
+    """
+    Registers a flow function as a Flask view on `blueprint` (run with
+    run_flow) and makes it available to asgi.py under the same endpoint.
+    """
+    def decorator(flow_function):
+        def view(**view_args):
+            return run_flow(flow_function(**view_args))
+        view.__name__ = flow_function.__name__
+        view.__doc__ = flow_function.__doc__
+        blueprint.add_url_rule(rule, view_func=view, **options)
+        flow_views[f"{blueprint.name}.{flow_function.__name__}"] = flow_function
+        return flow_function
+    return decorator
+
+
+def _blocking_pool():
+    if _executor["pid"] != os.getpid():
+        with _executor_lock:
+            if _executor["pid"] != os.getpid():
+                _executor.update(pool=ThreadPoolExecutor(max_workers=_executor["threads"],
+                                                         thread_name_prefix="ai-blocking"),
+                                 pid=os.getpid())
+    return _executor["pool"]
+
+
+def init_async_io(config=Config):
+    """Sizes the thread pool that runs blocking steps for run_flow_async()."""
+    _executor.update(threads=max(1, config.AI_ASYNC_THREADS), pid=None)
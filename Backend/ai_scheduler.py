@@ -1,92 +1,75 @@
-import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 import json
 import re
-import requests
 from datetime import datetime, timedelta
 import pytz
-import cohere
+from ai_io import gemini_generate, cohere_chat, groq_chat, llm_available, blocking
+from ai_batch import batched
+from categories import assign_categories
+from placement import place_tasks
+from logs import get_logger
 
 # Configure IST timezone
 IST = pytz.timezone('Asia/Kolkata')
 
+log = get_logger(__name__)
+
 load_dotenv()
 
+
+def _valid_tasks(answer):
+    """Whether a batched task-generation answer is the JSON array of tasks the prompt asks for."""
+    return isinstance(answer, list) and bool(answer) and all(isinstance(task, dict) for task in answer)
+
+
 class AIScheduler:
+    """
+    Turns free text into task suggestions. The provider clients live in
+    ai_io.py; generate_tasks() is a flow run by the AI views.
+    """
+
     def __init__(self):
-        # Gemini API setup
         self.google_gemini_api_key = os.getenv("GOOGLE_GEMINI_API_KEY")
-        if self.google_gemini_api_key:
-            try:
-                genai.configure(api_key=self.google_gemini_api_key)
-                print("Gemini API configured successfully")
-            except Exception as e:
-                print(f"Gemini API configuration failed: {e}")
-                self.google_gemini_api_key = None
-        
         # Groq API setup (third fallback)
         self.groq_api_key = os.getenv("GROQ_API_KEY")
-        self.groq_base_url = "https://api.groq.com/openai/v1"
         self.groq_model = "meta-llama/llama-4-scout-17b-16e-instruct"  # Working fast model
-        
         # Cohere API setup (second fallback)
         self.cohere_api_key = os.getenv("COHERE_API_KEY")
-        if self.cohere_api_key:
-            self.co = cohere.Client(self.cohere_api_key)
-            self.cohere_model = "command-a-03-2025"  # Latest Cohere model
-        else:
-            self.co = None
+        self.cohere_model = "command-a-03-2025"  # Latest Cohere model
         
         if not self.google_gemini_api_key and not self.cohere_api_key and not self.groq_api_key:
-            print("Warning: No AI API keys found in environment variables")
+            log.warning("config.missing_key", key="AI provider keys")
         else:
-            print(f"AIScheduler initialized - Gemini: {'✓' if self.google_gemini_api_key else '✗'}, Cohere: {'✓' if self.cohere_api_key else '✗'}, Groq: {'✓' if self.groq_api_key else '✗'}")
+            log.info("ai_scheduler.initialized", gemini=bool(self.google_gemini_api_key),
+                     cohere=bool(self.cohere_api_key), groq=bool(self.groq_api_key))
     
-    def _call_groq_api(self, prompt):
-        """Fallback function to call Groq API when Gemini fails."""
-        if not self.groq_api_key:
+    def _call_groq_api(self, prompt, max_tokens=1500):
+        """Flow: fallback to the Groq API when Gemini fails."""
+        if not llm_available('groq'):
             raise Exception("Groq API key not configured")
         
-        headers = {
-            "Authorization": f"Bearer {self.groq_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": self.groq_model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1500,
-            "stream": False
-        }
-        
         try:
-            response = requests.post(f"{self.groq_base_url}/chat/completions", 
-                                   headers=headers, 
-                                   json=data,
-                                   timeout=60)  # Increased timeout to 60 seconds
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if 'choices' in result and len(result['choices']) > 0:
-                return result['choices'][0]['message']['content']
-            else:
-                raise Exception("No valid response from Groq API")
-                
-        except requests.exceptions.Timeout:
-            raise Exception("Groq API request timed out after 60 seconds")
-        except requests.exceptions.ConnectionError:
-            raise Exception("Failed to connect to Groq API")
+            result = yield groq_chat(
+                model=self.groq_model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7,
+                max_tokens=max_tokens,
+                timeout=60
+            )
         except Exception as e:
             raise Exception(f"Groq API request failed: {str(e)}")
+        
+        if result.choices:
+            return result.choices[0].message.content
+        else:
+            raise Exception("No valid response from Groq API")
     
-    def _call_cohere_api(self, prompt):
-        """Second fallback function to call Cohere API when Gemini fails."""
-        if not self.cohere_api_key or not self.co:
+    def _call_cohere_api(self, prompt, max_tokens=1000):
+        """Flow: second fallback to the Cohere API when Gemini fails."""
+        if not llm_available('cohere'):
             raise Exception("Cohere API key not configured")
         
         try:
@@ -94,11 +77,11 @@ class AIScheduler:
                 {"role": "user", "content": prompt}
             ]
             
-            response = self.co.chat(
+            response = yield cohere_chat(
                 model=self.cohere_model,
                 messages=messages,
                 temperature=0.7,
-                max_tokens=1000
+                max_tokens=max_tokens
             )
             
             # Extract content from Cohere response
@@ -119,22 +102,38 @@ class AIScheduler:
             else:
                 raise Exception(f"Cohere API request failed: {str(e)}")
     
-    def generate_tasks(self, user_input):
+    def generate_tasks(self, user_input, user_id=None):
+        """
+        Flow (ai_io.py): returns a list of task dicts for `user_input`. Their
+        categories come from the local classifier (categories.py), adapted to
+        `user_id` when given, not from the LLM. With a `user_id` the tasks are
+        also moved into the user's free time (placement.py).
+        """
+        tasks = yield from self._generate_tasks(user_input, user_id)
+        tasks = yield blocking(assign_categories, user_id, tasks)
+        if user_id is None:
+            return tasks
+        return (yield blocking(place_tasks, user_id, tasks, user_input))
+
+    def _tasks_prompt(self, request_line):
+        """The task-generation prompt; `request_line` introduces the user's input (or a batch of them)."""
         current_datetime = datetime.now(IST).strftime("%Y-%m-%d %H:%M")
         
-        prompt = f"""
+        return f"""
         Analyze the following user input and generate a list of tasks with specific details.
         Current Time: {current_datetime}
-        The user said: "{user_input}"
+        {request_line}
         
         Return ONLY a JSON array with tasks in this exact format:
         [
             {{
                 "title": "Task title",
                 "description": "Generate a helpful, detailed description that includes context, purpose, or actionable details. Make it useful for the user when they see this task later.",
-                "category": "Choose from: work, home, sports, fun, health, fitness, personal, learning, finance, errands, cleaning, gardening, cooking, pets, meeting, commute, networking, admin, social, entertainment, travel, hobby, volunteering, important, to-do, later, family",
                 "date": "YYYY-MM-DD",
                 "time": "HH:MM",
+                "duration_minutes": 60,
+                "window": "morning",
+                "fixed": false,
                 "reminder_setting": "15 minutes"
             }}
         ]
@@ -147,6 +146,12 @@ class AIScheduler:
         - Evening activities (cooking, family time): "18:00", "19:00"
         - Study/learning/personal: "20:00", "21:00"
         
+        **Duration, window and fixed:**
+        - "duration_minutes": how long the activity takes (e.g. 30 for a call, 45 for a workout, 60 for a meeting)
+        - "window": the part of the day it belongs in: "morning", "afternoon", "evening" or "any"
+        - "fixed": true only when the user stated the time; otherwise false, and the time may be moved
+          to a free slot in the same window
+        
         **When NO reminder specified, choose smart defaults:**
         - Important meetings/appointments: "30 minutes" or "1 hour"
         - Daily routines (workout, meals): "15 minutes"
@@ -155,18 +160,6 @@ class AIScheduler:
         
         **Available reminder options:** "15 minutes", "30 minutes", "1 hour", "2 hours", "1 day"
         
-        CATEGORY GUIDELINES:
-        - "meeting" for meetings, calls, appointments
-        - "health" for doctor, dentist, medical appointments  
-        - "fitness" for gym, workout, sports activities
-        - "errands" for shopping, banking, errands
-        - "work" for work-related tasks
-        - "family" for family events and activities
-        - "personal" for general personal tasks
-        - "learning" for education, courses, studying
-        - "finance" for financial tasks, budgeting
-        - "entertainment" for movies, games, fun activities
-        
         IMPORTANT FOR DESCRIPTIONS:
         - Create meaningful, context-aware descriptions that add value
         - Include purpose, preparation steps, or important details
@@ -181,82 +174,81 @@ class AIScheduler:
         1. Extract or infer dates and times from the input
         2. If no specific date is mentioned, use today's date: {datetime.now(IST).strftime('%Y-%m-%d')}
         3. If no specific time is mentioned, use a reasonable time like "09:00"
-        4. Choose the most appropriate category from the allowed list
-        5. Generate at least 1 task and at most 5 tasks
-        6. Use "reminder_setting" field with values like "15 minutes", "30 minutes", "1 hour", "2 hours", or "1 day"
-        7. Always create helpful, detailed descriptions that provide context and actionable information
+        4. Generate at least 1 task and at most 5 tasks
+        5. Use "reminder_setting" field with values like "15 minutes", "30 minutes", "1 hour", "2 hours", or "1 day"
+        6. Always create helpful, detailed descriptions that provide context and actionable information
+        7. Always include "duration_minutes", "window" and "fixed"
+        """
+
+    def _complete_tasks(self, prompt, count):
+        """
+        Flow: Gemini first, then Cohere, then Groq as fallbacks, for a prompt
+        answering `count` requests. Raises the Groq error if all fail.
         """
-        
-        response_text = None
-        api_used = "gemini"
-        
-        # Try Gemini first, then Cohere, then Groq as fallbacks
         try:
-            if not self.google_gemini_api_key:
+            if not llm_available('gemini'):
                 raise Exception("Gemini API key not configured")
             
-            # Use faster model to conserve quota
-            model = genai.GenerativeModel('gemini-1.5-pro')  # Working, stable model
-            response = model.generate_content(prompt)
-            response_text = response.text
-            print("Successfully used Gemini API for task generation")
+            response = yield gemini_generate('gemini-1.5-pro', prompt)  # Working, stable model
+            log.debug("llm.generate_tasks", sample=True, provider="gemini")
+            return response.text
             
         except Exception as gemini_error:
-            print(f"Gemini API failed: {gemini_error}")
-            api_used = "cohere"
+            log.warning("llm.failed", provider="gemini", operation="generate_tasks", error=str(gemini_error))
+        
+        # Fallback to Cohere API
+        try:
+            response_text = yield from self._call_cohere_api(prompt, max_tokens=1000 * count)
+            log.debug("llm.generate_tasks", sample=True, provider="cohere")
+            return response_text
             
-            # Fallback to Cohere API
-            try:
-                if not self.cohere_api_key:
-                    raise Exception("Cohere API key not configured")
-                
-                response_text = self._call_cohere_api(prompt)
-                print("Successfully used Cohere API as fallback for task generation")
-                
-            except Exception as cohere_error:
-                print(f"Cohere API failed: {cohere_error}")
-                api_used = "groq"
-                
-                # Second fallback to Groq API
-                try:
-                    if not self.groq_api_key:
-                        raise Exception("Groq API key not configured")
-                    
-                    response_text = self._call_groq_api(prompt)
-                    print("Successfully used Groq API as second fallback for task generation")
-                    
-                except Exception as groq_error:
-                    print(f"All APIs failed. Gemini: {gemini_error}, Cohere: {cohere_error}, Groq: {groq_error}")
-                    # Return a default task with smart time generation
-                    default_time = "09:00"
-                    default_reminder = "15 minutes"
-                    
-                    # Generate smarter defaults based on user input
-                    user_lower = user_input.lower()
-                    if any(word in user_lower for word in ['workout', 'gym', 'exercise', 'jog', 'run']):
-                        default_time = "07:00"
-                        default_reminder = "15 minutes"
-                    elif any(word in user_lower for word in ['meeting', 'appointment', 'call']):
-                        default_time = "10:00"
-                        default_reminder = "30 minutes"
-                    elif any(word in user_lower for word in ['cook', 'dinner', 'lunch', 'meal']):
-                        default_time = "18:00"
-                        default_reminder = "15 minutes"
-                    elif any(word in user_lower for word in ['study', 'learn', 'read']):
-                        default_time = "20:00"
-                        default_reminder = "15 minutes"
-                    elif any(word in user_lower for word in ['shop', 'buy', 'errand']):
-                        default_time = "11:00"
-                        default_reminder = "30 minutes"
-                    
-                    return [{
-                        "title": "Complete your task",
-                        "description": f"Task based on: {user_input}. Complete this activity at the scheduled time.",
-                        "category": "personal",
-                        "date": datetime.now(IST).strftime('%Y-%m-%d'),
-                        "time": default_time,
-                        "reminder_setting": default_reminder
-                    }]
+        except Exception as cohere_error:
+            log.warning("llm.failed", provider="cohere", operation="generate_tasks", error=str(cohere_error))
+        
+        # Second fallback to Groq API
+        response_text = yield from self._call_groq_api(prompt, max_tokens=1500 * count)
+        log.debug("llm.generate_tasks", sample=True, provider="groq")
+        return response_text
+
+    def _generate_tasks(self, user_input, user_id=None):
+        # Concurrent requests may share one call (ai_batch.py)
+        try:
+            response_text = yield batched(
+                "generate_tasks", user_id, self._tasks_prompt("The user inputs are listed under REQUESTS below."),
+                user_input, self._complete_tasks, self._tasks_prompt(f'The user said: "{user_input}"'),
+                _valid_tasks
+            )
+        except Exception as groq_error:
+            log.error("llm.all_failed", operation="generate_tasks", error=str(groq_error))
+            # Return a default task with smart time generation
+            default_time = "09:00"
+            default_reminder = "15 minutes"
+            
+            # Generate smarter defaults based on user input
+            user_lower = user_input.lower()
+            if any(word in user_lower for word in ['workout', 'gym', 'exercise', 'jog', 'run']):
+                default_time = "07:00"
+                default_reminder = "15 minutes"
+            elif any(word in user_lower for word in ['meeting', 'appointment', 'call']):
+                default_time = "10:00"
+                default_reminder = "30 minutes"
+            elif any(word in user_lower for word in ['cook', 'dinner', 'lunch', 'meal']):
+                default_time = "18:00"
+                default_reminder = "15 minutes"
+            elif any(word in user_lower for word in ['study', 'learn', 'read']):
+                default_time = "20:00"
+                default_reminder = "15 minutes"
+            elif any(word in user_lower for word in ['shop', 'buy', 'errand']):
+                default_time = "11:00"
+                default_reminder = "30 minutes"
+            
+            return [{
+                "title": "Complete your task",
+                "description": f"Task based on: {user_input}. Complete this activity at the scheduled time.",
+                "date": datetime.now(IST).strftime('%Y-%m-%d'),
+                "time": default_time,
+                "reminder_setting": default_reminder
+            }]
         
         # Extract JSON from response
         try:
@@ -301,14 +293,13 @@ class AIScheduler:
                 return [{
                     "title": "Complete your task",
                     "description": f"Task based on: {user_input}. Complete this activity at the scheduled time.",
-                    "category": "personal",
                     "date": datetime.now(IST).strftime('%Y-%m-%d'),
                     "time": default_time,
                     "reminder_setting": default_reminder
                 }]
                 
         except Exception as parse_error:
-            print(f"Error parsing JSON response: {parse_error}")
+            log.warning("llm.bad_json", operation="generate_tasks", error=str(parse_error))
             # Return a default task with smart defaults based on user input
             default_time = "09:00"
             default_reminder = "15 minutes"
@@ -334,7 +325,6 @@ class AIScheduler:
             return [{
                 "title": "Complete your task",
                 "description": f"Task based on: {user_input}. Complete this activity at the scheduled time.",
-                "category": "personal",
                 "date": datetime.now(IST).strftime('%Y-%m-%d'),
                 "time": default_time,
                 "reminder": default_reminder
@@ -1,93 +1,154 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
-import mysql.connector
-from mysql.connector import Error
-from user_profile import profile_bp
+from flask import Flask, render_template, redirect, url_for, session
 import os
-from werkzeug.utils import secure_filename
-from bcrypt import hashpw, gensalt, checkpw
-import uuid
-from login_register import auth_bp, init_db
-from collaboration import collaboration_bp
-from ai import ai_bp
-from ai_assistant import ai_assistant_bp
+from user_profile import profile_bp
+from login_register import auth_bp
+from collaboration import collaboration_bp, init_collaboration_cache
+from ai import ai_bp, init_ai_scheduler
+from ai_assistant import ai_assistant_bp, init_ai_clients
+from ai_io import init_async_io
+from ai_batch import init_ai_batching
 from home_routes import home_bp
 from tasks import tasks_bp
 from schedule import schedule_bp
+from calendar_routes import calendar_bp
+from reminders import reminders_bp, init_reminder_hub
+from recurrence import recurrence_bp
+from search import search_bp
+from import_export import import_export_bp
+from metrics import metrics_bp, init_metrics, register_metrics
+from logs import init_logging, register_request_ids
+from slow_queries import init_slow_query_log
 from config import Config
+from database import init_pool
+from replicas import init_replicas
+from shards import init_shards, register_shards
+from archive import init_archiver
+from categories import init_category_model
+from passwords import init_hashing
+from event_cache import init_event_cache
+from schema import ensure_schema
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Validate configuration
-Config.validate_config()
-
-# Create the Flask application instance
-app = Flask(__name__)
-app = Flask(__name__, template_folder='../', static_folder='static')
-app.secret_key = Config.SECRET_KEY or os.urandom(24)
-
-
-
-
-app.register_blueprint(profile_bp)
-app.register_blueprint(auth_bp)
-app.register_blueprint(ai_bp)
-app.register_blueprint(collaboration_bp)
-app.register_blueprint(ai_assistant_bp)
-app.register_blueprint(home_bp)
-app.register_blueprint(tasks_bp)
-app.register_blueprint(schedule_bp)
 
-# --- Database and Uploads Configuration ---
-@app.route("/")
-def home():
-    """Serves the main login/signup page."""
-    return render_template("index.html")
-
-
-@app.route("/profile")
-def profile_page():
-    """Serves the user profile page using session data."""
-    if 'user_id' not in session:
-        return redirect('/')
-    return render_template("profile.html")
-
-
-@app.route("/home")
-def home_page():
-    if 'user_id' not in session: return redirect(url_for('home'))
-    return render_template("home.html")
+def init_worker_resources(config=Config):
+    """
+    Initialises everything that must not be shared between worker processes:
+    the DB connection pool, the password hashing pool, in-process caches and
+    the AI provider clients. Safe to call again in a freshly forked worker.
+    """
+    init_logging(config)
+    init_pool(config)
+    init_replicas(config)
+    init_shards(config)
+    init_metrics(config)
+    init_slow_query_log(config)
+    init_hashing(config)
+    init_collaboration_cache(config)
+    init_event_cache(config)
+    init_reminder_hub(config)
+    init_archiver(config)
+    init_category_model(config)
+    init_ai_scheduler()
+    init_ai_clients()
+    init_async_io(config)
+    init_ai_batching(config)
+
+
+def register_pages(app):
+    """Registers the HTML page routes."""
+
+    # --- Database and Uploads Configuration ---
+    @app.route("/")
+    def home():
+        """Serves the main login/signup page."""
+        return render_template("index.html")
 
-@app.route("/schedule")
-def schedule_page():
-    if 'user_id' not in session: return redirect(url_for('home'))
-    return render_template("schedule.html")
 
-@app.route("/add_event")
-def add_event_page():
-    if 'user_id' not in session: return redirect(url_for('home'))
-    return render_template("add-new-task.html")
+    @app.route("/profile")
+    def profile_page():
+        """Serves the user profile page using session data."""
+        if 'user_id' not in session:
+            return redirect('/')
+        return render_template("profile.html")
+
+
+    @app.route("/home")
+    def home_page():
+        if 'user_id' not in session: return redirect(url_for('home'))
+        return render_template("home.html")
+
+    @app.route("/schedule")
+    def schedule_page():
+        if 'user_id' not in session: return redirect(url_for('home'))
+        return render_template("schedule.html")
+
+    @app.route("/add_event")
+    def add_event_page():
+        if 'user_id' not in session: return redirect(url_for('home'))
+        return render_template("add-new-task.html")
+
+    @app.route("/AI")
+    def ai_page():
+        if 'user_id' not in session:
+            return render_template("index.html")
+        return render_template("AI.html")
+        
+    @app.route("/aiAssistant")
+    def ai_assistant_page():
+        if 'user_id' not in session:
+            return redirect(url_for('home'))
+        return render_template("AiAssistant.html")
+        
+    @app.route("/collaboration")
+    def collaboration_page():
+        if 'user_id' not in session:
+            return redirect(url_for('home'))
+        return render_template("collabration.html")
+
+
+def create_app(config=Config, init_schema=True):
+    """
+    Application factory. `config` is the Config class (or any object with the
+    same attributes). Set init_schema=False when the schema is managed
+    elsewhere (e.g. a one-off migration job).
+    """
+    # Validate configuration
+    config.validate_config()
+
+    # Create the Flask application instance
+    app = Flask(__name__, template_folder='../', static_folder='static')
+    app.config.from_object(config)
+    app.secret_key = config.SECRET_KEY or os.urandom(24)
+
+    app.register_blueprint(profile_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(ai_bp)
+    app.register_blueprint(collaboration_bp)
+    app.register_blueprint(ai_assistant_bp)
+    app.register_blueprint(home_bp)
+    app.register_blueprint(tasks_bp)
+    app.register_blueprint(schedule_bp)
+    app.register_blueprint(calendar_bp)
+    app.register_blueprint(reminders_bp)
+    app.register_blueprint(recurrence_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(import_export_bp)
+    app.register_blueprint(metrics_bp)
+    register_request_ids(app)
+    register_metrics(app)
+    register_shards(app)
+    register_pages(app)
+
+    if init_schema:
+        ensure_schema(config)
+    if not getattr(config, "DEFER_WORKER_INIT", False):
+        init_worker_resources(config)  # Otherwise each worker calls it after fork (gunicorn.conf.py)
+    return app
 
-@app.route("/AI")
-def ai_page():
-    if 'user_id' not in session:
-        return render_template("index.html")
-    return render_template("AI.html")
-    
-@app.route("/aiAssistant")
-def ai_assistant_page():
-    if 'user_id' not in session:
-        return redirect(url_for('home'))
-    return render_template("AiAssistant.html")
-    
-@app.route("/collaboration")
-def collaboration_page():
-    if 'user_id' not in session:
-        return redirect(url_for('home'))
-    return render_template("collabration.html")
 
 # --- Main entry point ---
 if __name__ == "__main__":
-    init_db()  # Re-enable database initialization
-    app.run(debug=True)
-
+    app = create_app()
+    app.run(debug=Config.DEBUG)
@@ -0,0 +1,298 @@
+"""
+Moves completed events out of the hot events table, and back.
+
+    python archive.py run
+    python archive.py restore --since YYYY-MM-DD
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+import pytz
+from mysql.connector import Error
+from config import Config
+import database
+import shards
+from logs import get_logger
+from versioning import bump_data_version
+
+log = get_logger(__name__)
+
+# --- Event Archive ---
+# events holds what users work with: open tasks and recent history. Completed
+# events dated more than ARCHIVE_AFTER_DAYS ago are moved, rows and ids
+# unchanged, to events_archive on the same shard:
+#   - A thread in each worker sweeps every shard once per ARCHIVE_INTERVAL.
+#     It walks events in primary-key order, ARCHIVE_BATCH rows per step, and
+#     moves the old completed ones in a short transaction of their own, so no
+#     step holds locks on more than a batch of rows. On MySQL a named lock
+#     lets only one worker sweep at a time.
+#   - Tasks someone else assigned stay hot: their assigned_tasks row refers to
+#     the event.
+#   - Each step bumps the owners' data versions, so ETags and caches refresh.
+# Reads build their FROM clause with events_source(). A date range starting
+# on or after the cutoff is answered from events alone; one that reaches
+# further back adds the archived rows with UNION ALL. Lists without a range
+# (/api/tasks/all, /api/tasks/own) keep returning the full history; callers
+# that only want hot rows pass ?archived=0.
+# Archived events can be read and deleted but not edited.
+
+LOCK_NAME = "helpscout_archiver"
+IST = pytz.timezone('Asia/Kolkata')
+EVENT_COLUMNS = ("id, user_id, title, description, Category, date, time, done, "
+                 "reminder_setting, reminder_datetime, reminde1, reminde2, reminde3, reminde4")
+
+_settings = {"after_days": 0, "interval": 3600.0, "batch": 500, "pause": 0.05}
+_worker = {"thread": None, "pid": None}
+
+
+def archive_cutoff():
+    """Events dated before this ('YYYY-MM-DD') may be archived; None while archiving is off."""
+    if _settings["after_days"] <= 0:
+        return None
+    return (datetime.now(IST).date() - timedelta(days=_settings["after_days"])).isoformat()
+
+
+def needs_archive(start_date):
+    """
+    True if a date range beginning at `start_date` ('YYYY-MM-DD', None for
+    no lower bound) can contain archived events. With archiving off every
+    range can: rows archived earlier stay where they are.
+    """
+    cutoff = archive_cutoff()
+    return cutoff is None or start_date is None or start_date < cutoff
+
+
+def include_archived(args):
+    """True unless the request opted out of archived rows (?archived=0)."""
+    return args.get('archived', '').lower() not in ('0', 'false', 'no')
+
+
+def events_source(where, params, start_date=None, archived=None, columns=EVENT_COLUMNS):
+    """
+    Returns (sql, params) for a derived table of the events matching `where`,
+    to be used as f"FROM {sql} e". The archive is added when `archived` is
+    True, or when it is None and the range from `start_date` reaches it.
+    """
+    if archived is None:
+        archived = needs_archive(start_date)
+    sql = f"SELECT {columns} FROM events WHERE {where}"
+    if archived:
+        sql += f" UNION ALL SELECT {columns} FROM events_archive WHERE {where}"
+        params = tuple(params) * 2
+    return f"({sql})", tuple(params)
+
+
+# --- Archiver ---
+def _move(conn, cursor, ids, cutoff):
+    """Moves the still-eligible events among `ids` in one transaction."""
+    conn.start_transaction()
+    try:
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(
+            f"SELECT id, user_id FROM events e WHERE id IN ({placeholders}) AND done = TRUE AND date < %s "
+            "AND NOT EXISTS (SELECT 1 FROM assigned_tasks a WHERE a.event_id = e.id) FOR UPDATE",
+            (*ids, cutoff)
+        )
+        rows = cursor.fetchall()
+        if rows:
+            ids = [row[0] for row in rows]
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(
+                f"INSERT INTO events_archive ({EVENT_COLUMNS}) "
+                f"SELECT {EVENT_COLUMNS} FROM events WHERE id IN ({placeholders})",
+                ids
+            )
+            cursor.execute(f"DELETE FROM events WHERE id IN ({placeholders})", ids)
+            bump_data_version(cursor, *(row[1] for row in rows))
+        conn.commit()
+        return len(rows)
+    except Error:
+        conn.rollback()
+        raise
+
+
+def archive_shard(index, cutoff):
+    """Sweeps shard `index` once. Returns the number of events archived."""
+    conn = shards.connect_shard(index)
+    if not conn:
+        log.warning("archive.shard_unavailable", shard=index)
+        return 0
+    moved, last_id = 0, 0
+    try:
+        cursor = conn.cursor()
+        while True:
+            # Read past rows by primary key only; the candidates are re-checked under lock
+            cursor.execute(
+                "SELECT id, done, date FROM events WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, _settings["batch"])
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            ids = [row[0] for row in rows if row[1] and row[2] < cutoff]
+            if ids:
+                moved += _move(conn, cursor, ids, cutoff)
+            time.sleep(_settings["pause"])
+        cursor.close()
+    finally:
+        conn.close()
+    return moved
+
+
+def _acquire_lock():
+    """The connection holding the archiver lock, True where none is needed, or None."""
+    if database.backend() == "sqlite":
+        return True  # Writers are serialised; a second sweep finds nothing left to move
+    conn = database.get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    cursor.execute("SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+    acquired = cursor.fetchone()[0] == 1
+    cursor.close()
+    if not acquired:
+        conn.close()
+        return None
+    return conn
+
+
+def _release_lock(conn):
+    if conn is True:
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def archive_pass():
+    """
+    Sweeps every shard once, unless another process is already sweeping.
+    Returns the number of events archived, or None if skipped.
+    """
+    cutoff = archive_cutoff()
+    if cutoff is None:
+        return None
+    lock = _acquire_lock()
+    if not lock:
+        return None
+    try:
+        started = time.monotonic()
+        moved = sum(archive_shard(index, cutoff) for index in shards.shard_indexes())
+        log.info("archive.pass", cutoff=cutoff, moved=moved, seconds=round(time.monotonic() - started, 2))
+        return moved
+    finally:
+        _release_lock(lock)
+
+
+def _archiver_loop():
+    while True:
+        try:
+            archive_pass()
+        except Exception:
+            log.exception("archive.pass_failed")
+        time.sleep(_settings["interval"])
+
+
+def restore_since(since):
+    """
+    Moves archived events dated `since` or later back into events, e.g.
+    after raising ARCHIVE_AFTER_DAYS. Returns the number restored.
+    """
+    restored = 0
+    for index in shards.shard_indexes():
+        conn = shards.connect_shard(index)
+        if not conn:
+            raise RuntimeError(f"shard {index} is unreachable")
+        try:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute(
+                    "SELECT id, user_id FROM events_archive WHERE date >= %s ORDER BY id LIMIT %s",
+                    (since, _settings["batch"])
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                conn.start_transaction()
+                try:
+                    ids = [row[0] for row in rows]
+                    placeholders = ", ".join(["%s"] * len(ids))
+                    # Rows keep their ids, except one above this shard's range (archived on
+                    # another shard before a bucket move), which would push this shard's id
+                    # counter into the next shard's range, or one taken again in events
+                    # (MySQL before 8.0 resets the counter to the highest id on restart).
+                    cursor.execute(f"SELECT id FROM events WHERE id IN ({placeholders})", ids)
+                    taken = {row[0] for row in cursor.fetchall()}
+                    limit = (index + 1) * shards.ID_STRIDE
+                    renumbered = [i for i in ids if i >= limit or i in taken]
+                    for group, columns in (([i for i in ids if i < limit and i not in taken], EVENT_COLUMNS),
+                                           (renumbered, EVENT_COLUMNS.replace("id, ", "", 1))):
+                        if group:
+                            cursor.execute(
+                                f"INSERT INTO events ({columns}) SELECT {columns} FROM events_archive "
+                                f"WHERE id IN ({', '.join(['%s'] * len(group))}) ORDER BY id",
+                                group
+                            )
+                    if renumbered:
+                        log.warning("archive.restore_renumbered", shard=index, renumbered=len(renumbered))
+                    cursor.execute(f"DELETE FROM events_archive WHERE id IN ({placeholders})", ids)
+                    bump_data_version(cursor, *(row[1] for row in rows))
+                    conn.commit()
+                except Error:
+                    conn.rollback()
+                    raise
+                restored += len(rows)
+            cursor.close()
+        finally:
+            conn.close()
+    return restored
+
+
+def init_archiver(config=Config):
+    """Per-worker setup: starts the archiver thread when ARCHIVE_AFTER_DAYS is set."""
+    _settings.update(after_days=config.ARCHIVE_AFTER_DAYS, interval=config.ARCHIVE_INTERVAL,
+                     batch=max(1, config.ARCHIVE_BATCH), pause=config.ARCHIVE_PAUSE)
+    if _settings["after_days"] <= 0 or _settings["interval"] <= 0:
+        return
+    thread = _worker["thread"]
+    if thread is None or not thread.is_alive() or _worker["pid"] != os.getpid():
+        thread = threading.Thread(target=_archiver_loop, name="event-archiver", daemon=True)
+        thread.start()
+        _worker.update(thread=thread, pid=os.getpid())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Event archive maintenance.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="Archive old completed events now")
+    restore = commands.add_parser("restore", help="Move archived events back into events")
+    restore.add_argument("--since", required=True, help="Restore events dated on or after YYYY-MM-DD")
+    args = parser.parse_args(argv)
+
+    database.init_pool(Config)
+    shards.init_shards(Config)
+    _settings.update(after_days=Config.ARCHIVE_AFTER_DAYS, batch=max(1, Config.ARCHIVE_BATCH), pause=0)
+    try:
+        if args.command == "run":
+            if archive_cutoff() is None:
+                parser.error("ARCHIVE_AFTER_DAYS is not set")
+            moved = archive_pass()
+            print("another process is archiving" if moved is None else f"archived {moved} events")
+        else:
+            print(f"restored {restore_since(args.since)} events")
+    except (Error, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
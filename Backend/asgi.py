@@ -0,0 +1,202 @@
+"""
+ASGI entry point for the AI endpoints (/api/ai/chat, /api/ai/generate-schedule,
+/api/ai/test), which spend nearly all their time waiting on LLM providers, and
+for the reminder stream (/api/stream/reminders), which mostly sits idle:
+
+    cd Backend
+    uvicorn asgi:app --host 127.0.0.1 --port 8001 --workers 4
+
+Each request runs the same flow as the Flask view (ai_io.py), but on an event
+loop, so one worker holds hundreds of chats in flight. Requests still go
+through the Flask app: its session cookie, before/after-request hooks,
+error handlers and JSON responses. A reminder stream costs a coroutine
+instead of a request thread. Every other path answers 404; route only these
+endpoints here (see DEPLOYMENT.md).
+"""
+import asyncio
+import io
+import sys
+from flask import jsonify, request, session
+from werkzeug.exceptions import NotFound
+from config import Config
+from app import create_app
+from ai_io import flow_views, run_flow_async
+import reminders
+from logs import get_logger
+
+log = get_logger(__name__)
+
+flask_app = create_app()
+_inflight = {"count": 0, "max": Config.AI_ASYNC_MAX_INFLIGHT}
+
+STREAM_PATH = "/api/stream/reminders"
+
+
+def _environ(scope, body):
+    """A WSGI environ for `scope`, so Flask can parse the request."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        value = value.decode("latin-1")
+        environ[key] = f"{environ[key]},{value}" if key in environ and key.startswith("HTTP_") else value
+    return environ
+
+
+async def _dispatch():
+    """Runs the matched flow inside the pushed request context; returns the view's return value."""
+    if request.routing_exception is not None:
+        raise request.routing_exception
+    flow = flow_views.get(request.endpoint)
+    if flow is None:
+        raise NotFound()
+    return await run_flow_async(flow(**request.view_args))
+
+
+async def _respond(environ):
+    # The request context is task-local (contextvars), so concurrent requests never see each other's
+    with flask_app.request_context(environ):
+        try:
+            rv = flask_app.preprocess_request()
+            if rv is None:
+                rv = await _dispatch()
+            response = flask_app.make_response(rv)
+        except Exception as e:
+            try:
+                response = flask_app.make_response(flask_app.handle_user_exception(e))
+            except Exception as unhandled:
+                response = flask_app.make_response(flask_app.handle_exception(unhandled))
+        return flask_app.process_response(response)
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send_response(send, status, headers, body):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# --- Reminder Stream ---
+
+class _LoopQueue:
+    """Hands reminders from the hub's dispatcher thread to a stream on the event loop."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self.queue = asyncio.Queue()
+
+    def put(self, payload):
+        self._loop.call_soon_threadsafe(self.queue.put_nowait, payload)
+
+
+def _stream_user(environ):
+    """(user_id, None) for a logged-in stream request, else (None, the response refusing it)."""
+    with flask_app.request_context(environ):
+        try:
+            rv = flask_app.preprocess_request()
+            if rv is None and 'user_id' in session:
+                return session['user_id'], None
+            if rv is None:
+                rv = jsonify({"error": "Unauthorized"}), 401
+            response = flask_app.make_response(rv)
+        except Exception as e:
+            response = flask_app.make_response(flask_app.handle_user_exception(e))
+        return None, flask_app.process_response(response)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _stream_reminders(environ, receive, send):
+    user_id, refused = _stream_user(environ)
+    if refused is not None:
+        return await _send_response(send, refused.status_code, refused.headers.to_wsgi_list(), refused.get_data())
+
+    hub = reminders.hub
+    sink = _LoopQueue(asyncio.get_running_loop())
+    hub.subscribe(user_id, sink)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        headers = [("Content-Type", "text/event-stream"), *reminders.STREAM_HEADERS.items()]
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]})
+        chunk = reminders.STREAM_PREAMBLE
+        while not disconnected.done():
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+            getter = asyncio.ensure_future(sink.queue.get())
+            await asyncio.wait({getter, disconnected}, timeout=Config.REMINDER_HEARTBEAT,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                chunk = reminders.reminder_message(getter.result())
+            else:
+                getter.cancel()
+                chunk = reminders.STREAM_KEEPALIVE
+    finally:
+        hub.unsubscribe(user_id, sink)
+        disconnected.cancel()
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    body = await _read_body(receive)
+    if body is None:
+        return
+    if scope["path"] == STREAM_PATH and scope["method"] == "GET":
+        return await _stream_reminders(_environ(scope, body), receive, send)
+    if _inflight["count"] >= _inflight["max"]:
+        log.warning("asgi.overloaded", inflight=_inflight["count"])
+        return await _send_response(send, 503, [("Content-Type", "application/json"), ("Retry-After", "1")],
+                                    b'{"error": "Too many AI requests in flight, please retry shortly."}')
+    _inflight["count"] += 1
+    try:
+        response = await _respond(_environ(scope, body))
+    finally:
+        _inflight["count"] -= 1
+    await _send_response(send, response.status_code, response.headers.to_wsgi_list(), response.get_data())
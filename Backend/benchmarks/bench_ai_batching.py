@@ -0,0 +1,120 @@
+"""
+LLM micro-batching (ai_batch.py) against one call per request. Requests
+arrive at --rate per second (Poisson) on one event loop, as in an asgi.py
+worker, and each runs the event-extraction step of /api/ai/chat (or, with
+--operation generate_tasks, the task generation of generate-schedule).
+Requests come from --users users in turn.
+Providers are stubbed (loadtest/stub_providers.py): every call takes
+--latency seconds plus --item-latency per answer it returns, and at most
+--provider-concurrency calls run at once, like a rate limit.
+
+For each batching window it prints the provider calls, the requests
+answered per call, prompt kilobytes sent, throughput and p50/p95/p99
+latency:
+
+    cd Backend
+    python benchmarks/bench_ai_batching.py --rate 40 --requests 400 --windows 0 10 25 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from loadtest import stub_providers  # noqa: E402
+
+MESSAGES = [
+    "I have a dentist appointment on 14 at 3pm",
+    "Team meeting tomorrow at 10am and lunch with Priya at 1pm",
+    "Gym every weekday at 7am",
+    "Call the bank on 22 at 11",
+    "Dinner with parents on Saturday at 8pm",
+]
+
+
+def _percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+
+def _extraction_flow(message, user_id):
+    from ai_assistant import _extraction_prompt, _complete_extraction, _valid_extraction
+    from ai_batch import batched
+    return (yield batched("extraction", user_id,
+                          _extraction_prompt("The user messages are listed under REQUESTS below."),
+                          message, _complete_extraction, _extraction_prompt(f'User message: "{message}"'),
+                          _valid_extraction))
+
+
+def _tasks_flow(message, user_id):
+    from ai import ai_scheduler
+    return (yield from ai_scheduler._generate_tasks(message, user_id))
+
+
+async def _run(flow, rate, requests, users):
+    from ai_io import run_flow_async
+
+    latencies, failures = [], 0
+
+    async def one(message, user_id):
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            await run_flow_async(flow(message, user_id))
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(requests):
+        tasks.append(asyncio.ensure_future(one(MESSAGES[i % len(MESSAGES)], f"bench-user-{i % users}")))
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operation", choices=["extraction", "generate_tasks"], default="extraction")
+    parser.add_argument("--rate", type=float, default=40, help="requests per second")
+    parser.add_argument("--requests", type=int, default=400, help="requests per window setting")
+    parser.add_argument("--users", type=int, default=100, help="users the requests come from")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 10, 25, 50], help="AI_BATCH_WINDOW_MS values")
+    parser.add_argument("--max-size", type=int, default=8, help="AI_BATCH_MAX_SIZE")
+    parser.add_argument("--latency", type=float, default=0.8, help="seconds per stubbed provider call")
+    parser.add_argument("--item-latency", type=float, default=0.15, help="extra seconds per answer in a call")
+    parser.add_argument("--provider-concurrency", type=int, default=16, help="provider calls in flight at once")
+    args = parser.parse_args()
+
+    os.environ.update(LOADTEST_LLM_LATENCY=str(args.latency), LOADTEST_LLM_JITTER=str(args.latency / 10),
+                      LOADTEST_LLM_ITEM_LATENCY=str(args.item_latency),
+                      LOADTEST_LLM_CONCURRENCY=str(args.provider_concurrency))
+    stub_providers.install_from_env()
+    from ai_batch import init_ai_batching
+
+    flow = _extraction_flow if args.operation == "extraction" else _tasks_flow
+    print(f"{args.operation}: rate={args.rate}/s users={args.users} latency={args.latency}s+{args.item_latency}s/answer "
+          f"provider_concurrency={args.provider_concurrency} max_size={args.max_size}")
+    print(f"{'window ms':>9} {'calls':>6} {'req/call':>8} {'prompt KB':>9} {'req/s':>7} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'failed':>6}")
+    for window in args.windows:
+        init_ai_batching(SimpleNamespace(AI_BATCH_WINDOW_MS=window, AI_BATCH_MAX_SIZE=args.max_size))
+        before = stub_providers.calls()
+        elapsed, latencies, failures = asyncio.run(_run(flow, args.rate, args.requests, args.users))
+        after = stub_providers.calls()
+        calls = after["count"] - before["count"]
+        kilobytes = (after["prompt_chars"] - before["prompt_chars"]) / 1024
+        p50, p95, p99 = _percentiles(latencies)
+        print(f"{window:>9.0f} {calls:>6} {args.requests / max(calls, 1):>8.2f} {kilobytes:>9.0f} "
+              f"{args.requests / elapsed:>7.1f} {p50:>7.0f} {p95:>7.0f} {p99:>7.0f} {failures:>6}")
+
+
+if __name__ == "__main__":
+    main()
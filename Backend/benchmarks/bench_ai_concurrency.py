@@ -0,0 +1,134 @@
+"""
+Concurrent /api/ai/chat throughput of one worker: the threaded Flask path
+(a gthread worker with --threads request threads) against the async path
+(asgi.py, one event loop). LLM providers are stubbed with --latency seconds
+per call (loadtest/stub_providers.py), so the numbers show how many chats a
+worker keeps in flight, not provider speed. Prints chats/second and
+p50/p95/p99 latency (from the moment all chats of a run are sent, so
+queueing for a free thread counts) for each path and concurrency level.
+
+    cd Backend
+    DB_BACKEND=sqlite SQLITE_PATH=/tmp/bench-ai.sqlite3 \\
+        python benchmarks/bench_ai_concurrency.py --concurrency 8 100 400 --latency 0.5
+
+A chat makes three provider calls (detection, extraction or reply) and a few
+database steps; the async path runs the latter on AI_ASYNC_THREADS threads.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from loadtest import stub_providers  # noqa: E402
+
+MESSAGES = [
+    "What should I focus on today?",
+    "Give me tips to plan my week",
+    "I have a dentist appointment on 14 at 3pm",
+]
+
+
+def _percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+
+def run_threaded(flask_app, cookie, chats, threads):
+    """Every chat submitted at once to `threads` request threads, as gthread would queue them."""
+    name, value = cookie.split("=", 1)
+    started = time.perf_counter()
+
+    def chat(index):
+        client = flask_app.test_client()
+        client.set_cookie(name, value)
+        response = client.post("/api/ai/chat", json={"message": MESSAGES[index % len(MESSAGES)]})
+        return time.perf_counter() - started, response.status_code
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(chat, range(chats)))
+    return time.perf_counter() - started, results
+
+
+async def _asgi_chat(app, cookie, message, started):
+    body = json.dumps({"message": message}).encode()
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/ai/chat", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"cookie", cookie.encode())],
+        "server": ("127.0.0.1", 8001), "client": ("127.0.0.1", 50000),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return time.perf_counter() - started, sent[0]["status"]
+
+
+async def _run_async(app, cookie, chats, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def chat(index):
+        async with limit:
+            return await _asgi_chat(app, cookie, MESSAGES[index % len(MESSAGES)], started)
+
+    results = await asyncio.gather(*(chat(i) for i in range(chats)))
+    return time.perf_counter() - started, results
+
+
+def _login(flask_app):
+    client = flask_app.test_client()
+    email = f"bench-ai-{os.getpid()}-{int(time.time())}@example.com"
+    client.post("/register", json=dict(username="bench", email=email, phone=str(time.time_ns())[-10:],
+                                       password="bench-password"))
+    response = client.post("/login", json=dict(email=email, password="bench-password"))
+    if response.status_code != 200:
+        sys.exit(f"login failed: {response.status_code} {response.get_data(as_text=True)}")
+    return response.headers["Set-Cookie"].split(";", 1)[0]
+
+
+def _report(path, concurrency, elapsed, results):
+    latencies = [seconds for seconds, _ in results]
+    errors = sum(1 for _, status in results if status >= 400)
+    p50, p95, p99 = _percentiles(latencies)
+    print(f"{path:>8} {concurrency:>11} {len(results) / elapsed:>9.1f} {p50:>8.0f} {p95:>8.0f} {p99:>8.0f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 100, 400],
+                        help="chats in flight at once")
+    parser.add_argument("--chats", type=int, default=0, help="chats per run (default 2 x concurrency)")
+    parser.add_argument("--threads", type=int, default=8, help="request threads of the threaded worker")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stubbed provider call")
+    args = parser.parse_args()
+
+    os.environ.update(LOADTEST_LLM_LATENCY=str(args.latency), LOADTEST_LLM_JITTER=str(args.latency / 10))
+    stub_providers.install_from_env()
+    import asgi  # Creates the Flask app as well
+    from config import Config
+
+    cookie = _login(asgi.flask_app)
+    print(f"latency={args.latency}s threads={args.threads} AI_ASYNC_THREADS={Config.AI_ASYNC_THREADS}")
+    print(f"{'path':>8} {'concurrency':>11} {'chats/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in args.concurrency:
+        chats = args.chats or 2 * concurrency
+        _report("threaded", concurrency, *run_threaded(asgi.flask_app, cookie, chats, args.threads))
+        _report("async", concurrency, *asyncio.run(_run_async(asgi.app, cookie, chats, concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Login throughput benchmark for the bcrypt process pool.
+
+Simulates a login storm: many request threads all calling verify_password()
+at once. Reports logins/second overall and per core, for each cost factor.
+
+    cd Backend
+    python benchmarks/bench_password_hashing.py --rounds 10 12 --threads 32 --logins 200
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passwords  # noqa: E402
+from bcrypt import hashpw, gensalt  # noqa: E402
+
+
+class BenchConfig:
+    BCRYPT_ROUNDS = 12
+    PASSWORD_HASH_WORKERS = os.cpu_count() or 1
+    PASSWORD_HASH_QUEUE = 64
+    PASSWORD_HASH_WAIT = 60
+
+
+def run(rounds, workers, threads, logins):
+    BenchConfig.BCRYPT_ROUNDS = rounds
+    BenchConfig.PASSWORD_HASH_WORKERS = workers
+    passwords.init_hashing(BenchConfig)
+
+    stored = hashpw(b"correct horse battery staple", gensalt(rounds)).decode('utf-8')
+    passwords.verify_password("warm-up", stored)  # Start the pool processes
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda _: passwords.verify_password("correct horse battery staple", stored), range(logins)))
+    elapsed = time.perf_counter() - start
+
+    assert all(results)
+    cores_used = max(1, min(workers, os.cpu_count() or 1)) if workers > 0 else 1
+    return logins / elapsed, logins / elapsed / cores_used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="hash processes (0 = inline)")
+    parser.add_argument("--threads", type=int, default=32, help="concurrent request threads")
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"cores={os.cpu_count()} workers={args.workers} threads={args.threads} logins={args.logins}")
+    print(f"{'rounds':>6} {'mode':>7} {'logins/s':>10} {'per core':>10}")
+    for rounds in args.rounds:
+        for mode, workers in (("inline", 0), ("pool", args.workers)):
+            total, per_core = run(rounds, workers, args.threads, args.logins)
+            print(f"{rounds:>6} {mode:>7} {total:>10.1f} {per_core:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
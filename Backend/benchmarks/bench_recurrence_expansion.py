@@ -0,0 +1,59 @@
+"""
+Cost of expanding recurring events on read: a month view over many rules,
+some of which started years ago, versus the rows that materialising every
+occurrence up front would have written.
+
+    cd Backend
+    python benchmarks/bench_recurrence_expansion.py --rules 20 200 --years 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recurrence import expand_rule  # noqa: E402
+
+WINDOWS = {
+    'month': (date(2026, 3, 1), date(2026, 3, 31)),
+    'year': (date(2026, 1, 1), date(2026, 12, 31)),
+}
+
+
+def make_rules(n, years):
+    rules = []
+    for _ in range(n):
+        start = date(2026, 1, 1) - timedelta(days=random.randint(0, 365 * years))
+        freq = random.choice(['daily', 'weekly', 'monthly'])
+        weekdays = random.randint(1, 127) if freq == 'weekly' else 0
+        rules.append((freq, random.randint(1, 3), weekdays, start.isoformat(), None))
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--years", type=int, default=5, help="how far back rule start dates go")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    horizon = date(2027, 12, 31)
+    for n in args.rules:
+        rules = make_rules(n, args.years)
+        materialised = sum(
+            sum(1 for _ in expand_rule(*rule, rule[3], horizon)) for rule in rules
+        )
+        print(f"{n} rules (materialising through {horizon} would write {materialised} rows):")
+        for label, (start, end) in WINDOWS.items():
+            began = time.perf_counter()
+            for _ in range(args.repeat):
+                count = sum(sum(1 for _ in expand_rule(*rule, start, end)) for rule in rules)
+            elapsed = (time.perf_counter() - began) * 1000 / args.repeat
+            print(f"  {label:<6} {count:>7} occurrences {elapsed:>8.3f} ms per expansion")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Payload size and serialisation time for task lists: the old `SELECT e.*`
+list-of-dicts versus the default projection and the columnar format.
+
+    cd Backend
+    python benchmarks/bench_task_payloads.py --rows 10000 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payloads import DEFAULT_TASK_FIELDS, encode_columnar  # noqa: E402
+
+FULL_ROW_FIELDS = ['id', 'user_id', 'title', 'description', 'Category', 'date', 'time', 'done',
+                   'reminder_setting', 'reminder_datetime', 'reminde1', 'reminde2', 'reminde3', 'reminde4']
+CATEGORIES = ['work', 'home', 'fitness', 'meeting', 'personal', 'learning', 'errands', 'family']
+
+
+def make_rows(n):
+    start = date(2023, 1, 1)
+    user_id = "8620b861-ea55-478a-b1b4-f266cb6a999d"
+    rows = []
+    for i in range(n):
+        d = (start + timedelta(days=i // 4)).isoformat()
+        t = f"{random.randint(6, 21):02d}:{random.choice(['00', '30'])}"
+        rows.append((i + 1, user_id, f"Task {i}", "Weekly grocery shopping - check pantry",
+                     random.choice(CATEGORIES), d, t, random.randint(0, 1), "15 minutes",
+                     f"{d} {t}:00", 0, 0, 0, 0))
+    return rows
+
+
+def measure(label, build):
+    start = time.perf_counter()
+    body = json.dumps(build(), separators=(',', ':'))
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  {label:<22} {len(body) / 1024:>10.1f} KiB {elapsed:>9.1f} ms")
+    return len(body), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000])
+    args = parser.parse_args()
+
+    for n in args.rows:
+        rows = make_rows(n)
+        projected_index = [FULL_ROW_FIELDS.index('Category' if f == 'category' else f) for f in DEFAULT_TASK_FIELDS]
+        projected = [tuple(row[i] for i in projected_index) for row in rows]
+
+        print(f"{n} rows:")
+        base_size, base_ms = measure("select e.* (dicts)", lambda: [dict(zip(FULL_ROW_FIELDS, r)) for r in rows])
+        measure("projected (dicts)", lambda: [dict(zip(DEFAULT_TASK_FIELDS, r)) for r in projected])
+        size, ms = measure("projected columnar", lambda: encode_columnar(projected, DEFAULT_TASK_FIELDS))
+        print(f"  columnar vs e.*: {base_size / size:.1f}x smaller, {base_ms / ms:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Task placement (placement.py) for plans of hundreds of generated tasks
+against a schedule of --events-per-day events over --days days. Compares
+the interval index with the straightforward approach: for every task, try
+starts 5 minutes apart outwards from the requested time and check each one
+against every busy interval and every task placed so far.
+
+Runs in memory, without a database. Prints milliseconds per plan and
+microseconds per task, and checks that no placed task overlaps:
+
+    cd Backend
+    python benchmarks/bench_task_placement.py --tasks 100 300 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from free_slots import parse_hhmm  # noqa: E402
+from placement import WINDOWS, place  # noqa: E402
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+def _schedule(now, days, per_day, event_minutes):
+    busy = {}
+    for offset in range(days):
+        day = (now.date() + timedelta(days=offset)).isoformat()
+        starts = random.sample(range(7 * 60, 22 * 60, 15), per_day)
+        busy[day] = [(s, s + event_minutes) for s in starts]
+    return busy
+
+
+def _plan(now, count, days):
+    tasks = []
+    for i in range(count):
+        window = random.choice(list(WINDOWS))
+        start, end = WINDOWS[window]
+        tasks.append({
+            "title": f"Task {i}",
+            "date": (now.date() + timedelta(days=random.randrange(days))).isoformat(),
+            "time": f"{random.randrange(start, end, 30) // 60:02d}:{random.choice(['00', '30'])}",
+            "duration_minutes": random.choice([15, 30, 45, 60, 90]),
+            "window": window,
+            "fixed": random.random() < 0.1,
+        })
+    return tasks
+
+
+def naive_place(tasks, busy, now, search_days):
+    """Reference: linear overlap checks at every 5-minute candidate."""
+    taken = {day: list(intervals) for day, intervals in busy.items()}
+    floor = now.hour * 60 + now.minute
+
+    def free(day, start, end):
+        if day == now.date().isoformat() and start < floor:
+            return False
+        return all(end <= s or start >= e for s, e in taken.get(day, ()))
+
+    for task in tasks:
+        start, minutes = parse_hhmm(task["time"]), task["duration_minutes"]
+        if task["fixed"]:
+            taken.setdefault(task["date"], []).append((start, start + minutes))
+    for task in sorted((t for t in tasks if not t["fixed"]), key=lambda t: (t["date"], t["time"])):
+        start, minutes = parse_hhmm(task["time"]), task["duration_minutes"]
+        first = datetime.strptime(task["date"], "%Y-%m-%d").date()
+        found = None
+        for offset in range(search_days + 1):
+            day = (first + timedelta(days=offset)).isoformat()
+            for window_start, window_end in (WINDOWS[task["window"]], WINDOWS["any"]):
+                for distance in range(0, 24 * 60, 5):
+                    for candidate in (start - distance, start + distance):
+                        if window_start <= candidate and candidate + minutes <= window_end \
+                                and free(day, candidate, candidate + minutes):
+                            found = day, candidate
+                            break
+                    if found:
+                        break
+                if found:
+                    break
+            if found:
+                break
+        if found:
+            taken.setdefault(found[0], []).append((found[1], found[1] + minutes))
+    return tasks
+
+
+def _overlaps(tasks, busy):
+    by_day = {day: list(intervals) for day, intervals in busy.items()}
+    overlaps = 0
+    for task in tasks:
+        if task.get("conflict") or task["fixed"]:
+            continue
+        start = parse_hhmm(task["time"])
+        end = start + task["duration_minutes"]
+        intervals = by_day.setdefault(task["date"], [])
+        overlaps += any(start < e and s < end for s, e in intervals)
+        intervals.append((start, end))
+    return overlaps
+
+
+def _time(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[100, 300, 1000], help="tasks per plan")
+    parser.add_argument("--days", type=int, default=14, help="days the plan and schedule span")
+    parser.add_argument("--events-per-day", type=int, default=12)
+    parser.add_argument("--search-days", type=int, default=7, help="TASK_PLACEMENT_DAYS")
+    parser.add_argument("--runs", type=int, default=5, help="plans timed per size (median reported)")
+    parser.add_argument("--skip-naive", action="store_true", help="time only the interval index")
+    args = parser.parse_args()
+
+    random.seed(1)
+    now = IST.localize(datetime.now().replace(hour=6, minute=0, second=0, microsecond=0))
+    busy = _schedule(now, args.days + args.search_days, args.events_per_day, 60)
+    print(f"days={args.days} events/day={args.events_per_day} search_days={args.search_days}")
+    print(f"{'tasks':>6} {'index ms':>9} {'us/task':>8} {'naive ms':>9} {'speedup':>8} {'moved':>6} "
+          f"{'unplaced':>8} {'overlaps':>8}")
+    for count in args.tasks:
+        plan = _plan(now, count, args.days)
+        index_seconds = _time(lambda: place([dict(t) for t in plan], busy, now, search_days=args.search_days),
+                              args.runs)
+        placed = place([dict(t) for t in plan], busy, now, search_days=args.search_days)
+        moved = sum(1 for t in placed if "requested_time" in t)
+        unplaced = sum(1 for t in placed if t.get("conflict") and not t["fixed"])
+        if args.skip_naive:
+            naive = "-", "-"
+        else:
+            naive_seconds = _time(lambda: naive_place([dict(t) for t in plan], busy, now, args.search_days), 1)
+            naive = f"{naive_seconds * 1000:.1f}", f"{naive_seconds / index_seconds:.0f}x"
+        print(f"{count:>6} {index_seconds * 1000:>9.2f} {index_seconds / count * 1e6:>8.1f} {naive[0]:>9} "
+              f"{naive[1]:>8} {moved:>6} {unplaced:>8} {_overlaps(placed, busy):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Latency of /api/tasks/search queries against a real database. Seeds a
+throwaway user with --events tasks (plus --noise tasks for other users, so
+the full-text index is shared as in production), runs typical queries and
+prints p50/p95/p99. The seeded users are deleted afterwards unless --keep.
+
+    cd Backend
+    python benchmarks/bench_task_search.py --events 1000000 --noise 1000000
+
+Seeding a million rows takes a few minutes; pass --reuse to run against
+users kept by an earlier --keep run.
+
+With DB_BACKEND=sqlite (and SQLITE_PATH=:memory:) it runs against the
+embedded driver instead, with no database server.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection  # noqa: E402
+from payloads import DEFAULT_TASK_FIELDS, TASK_COLUMNS  # noqa: E402
+from schema import ensure_schema  # noqa: E402
+from search import build_search_query  # noqa: E402
+
+BENCH_USER = "bench-search-user"
+NOISE_USER = "bench-search-noise"
+BATCH = 5000
+CATEGORIES = ['work', 'home', 'fitness', 'meeting', 'personal', 'learning', 'errands', 'family']
+WORDS = ("groceries dentist standup review report invoice gym yoga run call mom dad project deadline "
+         "budget meeting lunch dinner flight hotel passport renew insurance taxes laundry plumber "
+         "birthday gift cake presentation slides client design sprint retro interview homework "
+         "exam library recipe garden paint repair bike car service vet walk dog cat").split()
+
+QUERIES = {
+    'prefix "gr"': dict(text="gr"),
+    'prefix "groc"': dict(text="groc"),
+    'two words': dict(text="client presentation"),
+    'word + category': dict(text="meeting", categories=['work']),
+    'pending in range': dict(text="review", done=False, date_from="2024-01-01", date_to="2024-12-31"),
+    'deep page (p50)': dict(text="call", offset=50 * 20),
+}
+
+
+def seed(cursor, conn, user_id, n):
+    cursor.execute(
+        "INSERT IGNORE INTO users (user_id, username, email, phone, password) VALUES (%s, %s, %s, %s, %s)",
+        (user_id, user_id, f"{user_id}@bench.invalid", user_id[-20:], "x")
+    )
+    start = date(2020, 1, 1)
+    sql = ("INSERT INTO events (user_id, title, description, Category, date, time, done, reminder_setting) "
+           "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)")
+    for offset in range(0, n, BATCH):
+        rows = []
+        for i in range(offset, min(n, offset + BATCH)):
+            title = " ".join(random.sample(WORDS, 3)).capitalize()
+            description = " ".join(random.choices(WORDS, k=12))
+            rows.append((user_id, title, description, random.choice(CATEGORIES),
+                         (start + timedelta(days=random.randint(0, 2500))).isoformat(),
+                         f"{random.randint(6, 21):02d}:00", random.random() < 0.6, "15 minutes"))
+        cursor.executemany(sql, rows)
+        conn.commit()
+        print(f"  seeded {min(n, offset + BATCH)}/{n} for {user_id}", end="\r")
+    print()
+
+
+def percentile(samples, pct):
+    return statistics.quantiles(samples, n=100)[pct - 1] if len(samples) > 1 else samples[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--noise", type=int, default=0, help="events for a second user")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--reuse", action="store_true", help="skip seeding")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded users")
+    args = parser.parse_args()
+
+    if not ensure_schema():
+        sys.exit("Database is not reachable")
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if not args.reuse:
+            seed(cursor, conn, BENCH_USER, args.events)
+            if args.noise:
+                seed(cursor, conn, NOISE_USER, args.noise)
+
+        select_sql = ", ".join(f"{TASK_COLUMNS[f]} AS {f}" for f in DEFAULT_TASK_FIELDS)
+        print(f"{'query':<20} {'rows':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for label, options in QUERIES.items():
+            sql, params = build_search_query(BENCH_USER, select_sql, limit=21, **options)
+            samples = []
+            for _ in range(args.repeat):
+                began = time.perf_counter()
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+                samples.append((time.perf_counter() - began) * 1000)
+            print(f"{label:<20} {len(rows):>5} {percentile(samples, 50):>9.2f} "
+                  f"{percentile(samples, 95):>9.2f} {percentile(samples, 99):>9.2f}")
+    finally:
+        if not args.keep:
+            cursor.execute("DELETE FROM users WHERE user_id IN (%s, %s)", (BENCH_USER, NOISE_USER))
+            conn.commit()
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+from flask import Blueprint, jsonify, session, request
+from shards import get_shard_read_connection
+from archive import events_source
+from mysql.connector import Error
+from datetime import datetime, date
+from versioning import conditional_get
+from recurrence import get_occurrences
+import pytz
+
+# Configure IST timezone
+IST = pytz.timezone('Asia/Kolkata')
+
+calendar_bp = Blueprint('calendar', __name__)
+
+MAX_RANGE_MONTHS = 60
+
+
+def _parse_range(args):
+    """Returns (start, end) dates from ?start=&end= or ?year=, defaulting to this year."""
+    if args.get('start') or args.get('end'):
+        start = datetime.strptime(args['start'], '%Y-%m-%d').date()
+        end = datetime.strptime(args['end'], '%Y-%m-%d').date()
+    else:
+        year = int(args.get('year', datetime.now(IST).year))
+        start, end = date(year, 1, 1), date(year, 12, 31)
+    if end < start:
+        raise ValueError("end must not be before start")
+    if (end.year - start.year) * 12 + end.month - start.month + 1 > MAX_RANGE_MONTHS:
+        raise ValueError(f"Range may span at most {MAX_RANGE_MONTHS} months")
+    return start, end
+
+
+def _month_keys(start, end):
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield f"{year}-{month:02d}"
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def encode_month_masks(rows, start, end):
+    """
+    Packs (date, has_pending, has_completed) rows into per-month bitmasks.
+    Bit (day - 1) of the first mask is set when that day has a pending task,
+    of the second mask when it has a completed one.
+    """
+    months = {key: [0, 0] for key in _month_keys(start, end)}
+    for event_date, has_pending, has_completed in rows:
+        masks = months.get(event_date[:7])
+        if masks is None:
+            continue
+        bit = 1 << (int(event_date[8:10]) - 1)
+        if has_pending:
+            masks[0] |= bit
+        if has_completed:
+            masks[1] |= bit
+    return months
+
+
+@calendar_bp.route("/api/calendar/year")
+@conditional_get()
+def get_calendar_year():
+    """
+    Returns pending/completed day bitmasks for every month in a range with a
+    single grouped query. Accepts ?year=YYYY or ?start=YYYY-MM-DD&end=YYYY-MM-DD.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    user_id = session['user_id']
+    try:
+        start, end = _parse_range(request.args)
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid date range: {e}"}), 400
+
+    conn = get_shard_read_connection(user_id)
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Dates are stored as 'YYYY-MM-DD' strings, so a string range on the
+        # (user_id, date) index selects the window without STR_TO_DATE.
+        source, params = events_source("user_id = %s AND date BETWEEN %s AND %s",
+                                       (user_id, start.isoformat(), end.isoformat()),
+                                       start.isoformat(), columns="date, done")
+        query = f"""
+            SELECT date, MAX(done = FALSE) AS has_pending, MAX(done = TRUE) AS has_completed
+            FROM {source} e
+            GROUP BY date
+        """
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        rows += [
+            (o['date'], not o['done'], o['done'])
+            for o in get_occurrences(user_id, start.isoformat(), end.isoformat(), cursor=cursor)
+        ]
+        months = encode_month_masks(rows, start, end)
+        return jsonify({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "months": months
+        })
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
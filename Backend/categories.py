@@ -0,0 +1,387 @@
+"""
+Assigns task categories locally, from the words of the title.
+
+    python categories.py evaluate
+"""
+import argparse
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from mysql.connector import Error
+from config import Config
+import database
+import shards
+from logs import get_logger
+from versioning import get_data_version, on_data_version_bump
+
+log = get_logger(__name__)
+
+# --- Category Classifier ---
+# The LLM prompts no longer list the categories; every task an AI endpoint or
+# the pattern fallback creates without one is classified here instead. It is
+# a multinomial naive Bayes over the title's words and word pairs:
+#   - The global model is trained on the newest CATEGORY_TRAIN_ROWS events of
+#     each shard, on top of a small built-in keyword list so a fresh install
+#     still answers sensibly. A thread in each worker retrains it every
+#     CATEGORY_RETRAIN_INTERVAL and swaps it in whole.
+#   - Each user's own labelled events are counted into a per-user model,
+#     weighted CATEGORY_USER_WEIGHT times the global counts, so "standup"
+#     becomes "work" for one user and "fun" for another. These are cached
+#     per worker (LRU, CATEGORY_USER_MODELS users) and tagged with the user's
+#     data version, checked like the upcoming-events cache (event_cache.py):
+#     any write reloads them, so a corrected category counts on the next
+#     classification.
+# Classifying a title is a few dozen dictionary lookups, well under a
+# millisecond; only a per-user model miss touches the database.
+
+CATEGORIES = (
+    "work", "home", "sports", "fun", "health", "fitness", "personal", "learning", "finance", "errands",
+    "cleaning", "gardening", "cooking", "pets", "meeting", "commute", "networking", "admin", "social",
+    "entertainment", "travel", "hobby", "volunteering", "important", "to-do", "later", "family",
+)
+DEFAULT_CATEGORY = "personal"
+
+# Cold-start vocabulary; real titles outweigh it after a handful of events
+SEED_KEYWORDS = {
+    "work": "work report deadline project email presentation office client review slides",
+    "home": "home repair plumber electrician furniture rent move fix",
+    "sports": "football cricket tennis basketball badminton match game practice swim",
+    "fun": "fun picnic outing beach park",
+    "health": "doctor dentist medical checkup hospital medicine clinic therapy pharmacy",
+    "fitness": "gym workout exercise run jog yoga training cardio walk",
+    "personal": "haircut meditation journal self care",
+    "learning": "study class course lecture exam homework school learn read tutorial",
+    "finance": "budget bills tax bank invoice pay salary insurance",
+    "errands": "shopping groceries buy store pickup post",
+    "cleaning": "clean laundry vacuum dishes tidy wash",
+    "gardening": "garden plants lawn mow seeds",
+    "cooking": "cook dinner lunch breakfast recipe bake meal",
+    "pets": "dog cat vet pet feed",
+    "meeting": "meeting call appointment standup sync interview discussion",
+    "commute": "commute drive bus train ride",
+    "networking": "networking meetup conference linkedin",
+    "admin": "paperwork forms renew passport documents application",
+    "social": "party friends birthday drinks hangout wedding",
+    "entertainment": "movie film concert show netflix series",
+    "travel": "flight trip hotel airport travel vacation pack",
+    "hobby": "painting guitar music photography knitting drawing",
+    "volunteering": "volunteer charity donate ngo",
+    "important": "important urgent",
+    "to-do": "todo checklist",
+    "later": "later someday",
+    "family": "family mom dad parents kids children grandma",
+}
+
+STOPWORDS = frozenset(
+    "a an and at by for from i in is it me my of on or our the to with this that next".split()
+)
+_WORD = re.compile(r"[a-z0-9]+")
+
+USER_ROWS = 500  # Newest events counted into a user's model
+
+_settings = {"train_rows": 20000, "interval": 3600.0, "user_weight": 5.0, "revalidate": 1.0}
+_worker = {"thread": None, "pid": None}
+
+
+def tokenize(text):
+    """Lower-cased words of `text` (plural 's' dropped, stopwords removed) and adjacent word pairs."""
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+             for w in _WORD.findall((text or "").lower()) if w not in STOPWORDS]
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def normalize_category(category):
+    """`category` lower-cased if it is one of CATEGORIES, else None."""
+    category = (category or "").strip().lower()
+    return category if category in CATEGORIES else None
+
+
+class Counts:
+    """Token counts per category: the sufficient statistics of a naive Bayes model."""
+    __slots__ = ("docs", "tokens", "totals")
+
+    def __init__(self):
+        self.docs = Counter()
+        self.tokens = {}
+        self.totals = Counter()
+
+    def __bool__(self):
+        return bool(self.docs)
+
+    def add(self, title, category, weight=1):
+        category = normalize_category(category)
+        tokens = tokenize(title)
+        if not category or not tokens:
+            return
+        self.docs[category] += weight
+        counts = self.tokens.setdefault(category, Counter())
+        for token in tokens:
+            counts[token] += weight
+        self.totals[category] += weight * len(tokens)
+
+    def vocabulary(self):
+        return set().union(*self.tokens.values()) if self.tokens else set()
+
+
+def _seed_counts():
+    counts = Counts()
+    for category, words in SEED_KEYWORDS.items():
+        for word in words.split():
+            counts.add(word, category)
+    return counts
+
+
+class Model:
+    """A trained global model; immutable once built."""
+
+    def __init__(self, counts, rows=0):
+        self.counts = counts
+        self.rows = rows
+        self.known = counts.vocabulary()
+        self.vocabulary_size = max(1, len(self.known))
+        self.empty = {}
+
+    def classify(self, tokens, user=None, user_weight=0.0, user_known=frozenset()):
+        """
+        The most likely category for `tokens`, or None if none of them is
+        known to the global model or to the user's (`user_known`).
+        """
+        tokens = [t for t in tokens if t in self.known or t in user_known]
+        if not tokens:
+            return None
+        counts, empty = self.counts, self.empty
+        if not user:
+            user, user_weight = counts, 0.0  # Contributes nothing
+        best, best_score = None, -math.inf
+        for category in CATEGORIES:
+            global_tokens = counts.tokens.get(category, empty)
+            user_tokens = user.tokens.get(category, empty)
+            total = counts.totals[category] + user_weight * user.totals[category] + self.vocabulary_size
+            # log P(category) up to a constant, plus log P(token | category) with add-one smoothing
+            score = math.log(counts.docs[category] + user_weight * user.docs[category] + 1) \
+                - len(tokens) * math.log(total)
+            for token in tokens:
+                score += math.log(global_tokens.get(token, 0) + user_weight * user_tokens.get(token, 0) + 1)
+            if score > best_score:
+                best, best_score = category, score
+        return best
+
+
+_model = {"current": Model(_seed_counts())}
+
+
+# --- Per-User Models ---
+class _UserEntry:
+    __slots__ = ("version", "checked_at", "counts", "known", "usual")
+
+    def __init__(self, version, counts):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.counts = counts
+        self.known = counts.vocabulary()
+        self.usual = counts.docs.most_common(1)[0][0] if counts.docs else None
+
+
+class UserModels:
+    """Each recent user's category counts, LRU-bounded and checked against their data version."""
+
+    def __init__(self, max_users):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, user_id):
+        version = get_data_version(user_id)
+        if version is None:
+            return None
+        conn = shards.get_shard_connection(user_id, write=False)
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT title, Category FROM events WHERE user_id = %s ORDER BY id DESC LIMIT %s",
+                (user_id, USER_ROWS)
+            )
+            counts = Counts()
+            for title, category in cursor.fetchall():
+                counts.add(title, category)
+        except Error as e:
+            log.error("categories.user_load_failed", user_id=user_id, error=str(e))
+            return None
+        finally:
+            if conn and conn.is_connected():
+                cursor.close()
+                conn.close()
+        entry = _UserEntry(version, counts)
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get(self, user_id):
+        """The user's entry, or None if it cannot be loaded."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry:
+                self._entries.move_to_end(user_id)
+        if entry:
+            fresh = time.monotonic() - entry.checked_at < _settings["revalidate"]
+            if fresh or get_data_version(user_id) == entry.version:
+                entry.checked_at = time.monotonic()
+                return entry
+        return self._load(user_id)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_models = UserModels(Config.CATEGORY_USER_MODELS)
+
+# A write in this worker reloads the user's model at once; other workers notice the new version
+on_data_version_bump(lambda user_ids: user_models.invalidate(*user_ids))
+
+
+# --- Public API ---
+def classify(title, user_id=None, description=None):
+    """
+    The category for a task titled `title`, adapted to `user_id`'s own
+    labelling when given. Falls back to the description's words, then to the
+    user's most used category, then to DEFAULT_CATEGORY.
+    """
+    model = _model["current"]
+    entry = user_models.get(user_id) if user_id else None
+    user = (entry.counts, _settings["user_weight"], entry.known) if entry else ()
+    category = model.classify(tokenize(title), *user)
+    if category is None and description:
+        category = model.classify(tokenize(description), *user)
+    return category or (entry and entry.usual) or DEFAULT_CATEGORY
+
+
+def assign_categories(user_id, items):
+    """
+    Sets 'category' on every dict in `items` (tasks or events with 'title'
+    and optionally 'description') that has no valid one. Returns `items`.
+    """
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        category = normalize_category(item.get('category'))
+        item['category'] = category or classify(item.get('title'), user_id, item.get('description'))
+    return items
+
+
+# --- Training ---
+def _training_rows(limit):
+    """(title, category) of the newest `limit` labelled events of each shard."""
+    for index in shards.shard_indexes():
+        conn = shards.connect_shard(index)
+        if not conn:
+            log.warning("categories.shard_unavailable", shard=index)
+            continue
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT title, Category FROM events WHERE Category IS NOT NULL AND Category <> '' "
+                "ORDER BY id DESC LIMIT %s",
+                (limit,)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+        yield from rows
+
+
+def train(rows):
+    """A Model from (title, category) rows on top of the seed keywords."""
+    counts, used = _seed_counts(), 0
+    for title, category in rows:
+        if normalize_category(category) and tokenize(title):
+            counts.add(title, category)
+            used += 1
+    return Model(counts, used)
+
+
+def retrain():
+    """Rebuilds the global model from the database and swaps it in."""
+    started = time.monotonic()
+    model = train(_training_rows(_settings["train_rows"]))
+    _model["current"] = model
+    log.info("categories.trained", rows=model.rows, vocabulary=model.vocabulary_size,
+             seconds=round(time.monotonic() - started, 2))
+    return model
+
+
+def _trainer_loop():
+    while True:
+        try:
+            retrain()
+        except Exception:
+            log.exception("categories.train_failed")
+        if _settings["interval"] <= 0:
+            return
+        time.sleep(_settings["interval"])
+
+
+def init_category_model(config=Config):
+    """Per-worker setup: clears the user models and starts training the global model in the background."""
+    _settings.update(train_rows=max(0, config.CATEGORY_TRAIN_ROWS), interval=config.CATEGORY_RETRAIN_INTERVAL,
+                     user_weight=config.CATEGORY_USER_WEIGHT, revalidate=config.UPCOMING_CACHE_REVALIDATE)
+    user_models.max_users = max(1, config.CATEGORY_USER_MODELS)
+    user_models.clear()
+    if _settings["train_rows"] == 0:
+        return  # Seed keywords and per-user models only
+    thread = _worker["thread"]
+    if thread is None or not thread.is_alive() or _worker["pid"] != os.getpid():
+        thread = threading.Thread(target=_trainer_loop, name="category-trainer", daemon=True)
+        thread.start()
+        _worker.update(thread=thread, pid=os.getpid())
+
+
+def evaluate(rows, holdout=5):
+    """Trains on all but every `holdout`-th row and returns (accuracy, microseconds per title, tested)."""
+    rows = [(t, normalize_category(c)) for t, c in rows if normalize_category(c) and tokenize(t)]
+    test = rows[::holdout]
+    model = train(row for i, row in enumerate(rows) if i % holdout)
+    started = time.perf_counter()
+    correct = sum(1 for title, category in test if (model.classify(tokenize(title)) or DEFAULT_CATEGORY) == category)
+    elapsed = time.perf_counter() - started
+    return (correct / len(test) if test else None), (elapsed / len(test) * 1e6 if test else None), len(test)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Task category classifier.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    check = commands.add_parser("evaluate", help="Hold-out accuracy and speed on the stored events")
+    check.add_argument("--rows", type=int, default=Config.CATEGORY_TRAIN_ROWS, help="Newest events per shard")
+    args = parser.parse_args(argv)
+
+    database.init_pool(Config)
+    shards.init_shards(Config)
+    try:
+        accuracy, micros, tested = evaluate(list(_training_rows(args.rows)))
+    except (Error, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if not tested:
+        print("no labelled events to evaluate")
+        return 0
+    print(f"accuracy {accuracy:.1%} on {tested} held-out titles, {micros:.0f} us per title")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,71 @@
 from flask import Blueprint, request, jsonify, session
 from database import get_db_connection
+from replicas import get_read_connection
 from mysql.connector import Error
+from collections import OrderedDict
+from config import Config
+from versioning import bump_data_version, conditional_get
+from payloads import select_task_fields, task_list_response
+from recurrence import month_day_states
+from shards import (get_shard_connection, get_shard_read_connection, connect_shard, shard_for, shard_indexes,
+                    ensure_writable, group_by_shard, query_owned_rows, resolve_user_column)
+from archive import events_source, include_archived
+from categories import classify
+import threading
+import time
 
 collaboration_bp = Blueprint('collaboration', __name__)
 
+# --- Collaborator Adjacency Cache ---
+class AdjacencyCache:
+    """
+    Per-worker LRU cache of each user's accepted collaborators. Entries are
+    dropped explicitly when an edge changes and expire after `ttl` seconds,
+    which bounds staleness for changes made in other worker processes.
+    """
+
+    def __init__(self, ttl, max_users):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if not entry:
+                return None
+            expires_at, collaborators = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return collaborators
+
+    def put(self, user_id, collaborators):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, collaborators)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+adjacency_cache = AdjacencyCache(Config.COLLABORATOR_CACHE_TTL, Config.COLLABORATOR_CACHE_SIZE)
+
+def init_collaboration_cache(config=Config):
+    """Applies cache settings and starts each worker with an empty cache."""
+    adjacency_cache.ttl = config.COLLABORATOR_CACHE_TTL
+    adjacency_cache.max_users = config.COLLABORATOR_CACHE_SIZE
+    adjacency_cache.clear()
+
 # --- Collaboration Endpoints ---
 
 @collaboration_bp.route("/api/collaboration/invite", methods=['POST'])
@@ -21,21 +83,30 @@ def invite_collaborator():
         if not invitee: return jsonify({"error": "User with that email not found"}), 404
         invitee_id = invitee['user_id']
         if inviter_id == invitee_id: return jsonify({"error": "You cannot invite yourself"}), 400
-        cursor.execute("SELECT id FROM collaborations WHERE (inviter_id = %s AND invitee_id = %s) OR (inviter_id = %s AND invitee_id = %s)", (inviter_id, invitee_id, invitee_id, inviter_id))
+        cursor.execute("SELECT collaboration_id FROM collaboration_edges WHERE user_id = %s AND peer_id = %s", (inviter_id, invitee_id))
         if cursor.fetchone(): return jsonify({"error": "An invitation already exists or you are already collaborators."}), 409
+        conn.start_transaction()
         cursor.execute("INSERT INTO collaborations (inviter_id, invitee_id) VALUES (%s, %s)", (inviter_id, invitee_id))
+        collaboration_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO collaboration_edges (user_id, peer_id, collaboration_id, status) VALUES (%s, %s, %s, 'pending')",
+            [(inviter_id, invitee_id, collaboration_id), (invitee_id, inviter_id, collaboration_id)]
+        )
+        bump_data_version(cursor, inviter_id, invitee_id)
         conn.commit()
         return jsonify({"message": "Invitation sent successfully!"}), 201
     except Error as e:
+        if conn and conn.is_connected(): conn.rollback()
         return jsonify({"error": f"An internal error occurred: {e}"}), 500
     finally:
         if conn and conn.is_connected(): cursor.close(); conn.close()
 
 @collaboration_bp.route("/api/collaboration/requests")
+@conditional_get()
 def get_collaboration_requests():
     if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
     current_user_id = session['user_id']
-    conn = get_db_connection()
+    conn = get_read_connection()
     if not conn: return jsonify({"error": "Database connection failed"}), 500
     try:
         cursor = conn.cursor(dictionary=True)
@@ -58,26 +129,41 @@ def respond_to_request(request_id):
     if not conn: return jsonify({"error": "Database connection failed"}), 500
     try:
         cursor = conn.cursor()
-        cursor.execute("UPDATE collaborations SET status = %s WHERE id = %s AND invitee_id = %s", (new_status, request_id, current_user_id))
-        if cursor.rowcount == 0: return jsonify({"error": "Request not found or you are not authorized to respond."}), 404
+        conn.start_transaction()
+        cursor.execute("SELECT inviter_id FROM collaborations WHERE id = %s AND invitee_id = %s FOR UPDATE", (request_id, current_user_id))
+        row = cursor.fetchone()
+        if not row:
+            conn.rollback()
+            return jsonify({"error": "Request not found or you are not authorized to respond."}), 404
+        inviter_id = row[0]
+        cursor.execute("UPDATE collaborations SET status = %s WHERE id = %s", (new_status, request_id))
+        cursor.execute("UPDATE collaboration_edges SET status = %s WHERE collaboration_id = %s", (new_status, request_id))
+        bump_data_version(cursor, current_user_id, inviter_id)
         conn.commit()
+        adjacency_cache.invalidate(current_user_id, inviter_id)
         return jsonify({"message": f"Invitation {action}ed."}), 200
     except Error as e:
+        if conn and conn.is_connected(): conn.rollback()
         return jsonify({"error": f"An internal error occurred: {e}"}), 500
     finally:
         if conn and conn.is_connected(): cursor.close(); conn.close()
 
 @collaboration_bp.route("/api/collaborators")
+@conditional_get()
 def get_collaborators():
     if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
     user_id = session['user_id']
-    conn = get_db_connection()
+    collaborators = adjacency_cache.get(user_id)
+    if collaborators is not None:
+        return jsonify(collaborators), 200
+    conn = get_read_connection()
     if not conn: return jsonify({"error": "Database connection failed"}), 500
     try:
         cursor = conn.cursor(dictionary=True)
-        query = "SELECT u.user_id, u.username, u.photo_url, u.profile_bio FROM users u JOIN collaborations c ON u.user_id = IF(c.inviter_id = %s, c.invitee_id, c.inviter_id) WHERE (c.inviter_id = %s OR c.invitee_id = %s) AND c.status = 'accepted'"
-        cursor.execute(query, (user_id, user_id, user_id))
+        query = "SELECT u.user_id, u.username, u.photo_url, u.profile_bio FROM collaboration_edges ce JOIN users u ON u.user_id = ce.peer_id WHERE ce.user_id = %s AND ce.status = 'accepted'"
+        cursor.execute(query, (user_id,))
         collaborators = cursor.fetchall()
+        adjacency_cache.put(user_id, collaborators)
         return jsonify(collaborators), 200
     except Error as e:
         return jsonify({"error": f"An internal error occurred: {e}"}), 500
@@ -93,67 +179,78 @@ def remove_collaborator():
     if not conn: return jsonify({"error": "Database connection failed"}), 500
     try:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM collaborations WHERE (inviter_id = %s AND invitee_id = %s) OR (inviter_id = %s AND invitee_id = %s)", (user_id, collaborator_id, collaborator_id, user_id))
-        conn.commit()
-        if cursor.rowcount > 0:
-            return jsonify({"message": "Collaborator removed successfully"}), 200
-        else:
+        conn.start_transaction()
+        cursor.execute("SELECT collaboration_id FROM collaboration_edges WHERE user_id = %s AND peer_id = %s FOR UPDATE", (user_id, collaborator_id))
+        row = cursor.fetchone()
+        if not row:
+            conn.rollback()
             return jsonify({"error": "Collaboration not found"}), 404
+        cursor.execute("DELETE FROM collaboration_edges WHERE collaboration_id = %s", (row[0],))
+        cursor.execute("DELETE FROM collaborations WHERE id = %s", (row[0],))
+        bump_data_version(cursor, user_id, collaborator_id)
+        conn.commit()
+        adjacency_cache.invalidate(user_id, collaborator_id)
+        return jsonify({"message": "Collaborator removed successfully"}), 200
     except Error as e:
+        if conn and conn.is_connected(): conn.rollback()
         return jsonify({"error": f"An internal error occurred: {e}"}), 500
     finally:
         if conn and conn.is_connected(): cursor.close(); conn.close()
 
 # --- Task Viewing Endpoints ---
 @collaboration_bp.route("/api/tasks/personal")
+@conditional_get()
 def get_personal_tasks():
     if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
     user_id = session['user_id']
-    conn = get_db_connection()
+    try:
+        fields, select_sql = select_task_fields({'assigner_email': 'at.assigner_id'})  # Resolved on the primary
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    conn = get_shard_read_connection(user_id)
     if not conn: return jsonify({"error": "Database error"}), 500
     
     try:
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
         # UPDATED QUERY: Only return tasks that were assigned TO the user by others (not self-created tasks)
-        query = """
+        query = f"""
             SELECT
-                e.*,
-                assigner.email as assigner_email
+                {select_sql}
             FROM
                 events e
             INNER JOIN
                 assigned_tasks at ON e.id = at.event_id
-            INNER JOIN
-                users assigner ON at.assigner_id = assigner.user_id
             WHERE
                 e.user_id = %s AND at.assignee_id = %s AND at.assigner_id != %s
             ORDER BY
                 e.date, e.time
         """
         cursor.execute(query, (user_id, user_id, user_id))
-        tasks = cursor.fetchall()
-        return jsonify(tasks), 200
+        rows = resolve_user_column(cursor.fetchall(), fields, 'assigner_email', 'email')
+        return task_list_response(rows, fields), 200
     except Error as e:
         return jsonify({"error": str(e)}), 500
     finally:
         if conn.is_connected(): cursor.close(); conn.close()
 
 @collaboration_bp.route("/api/tasks/assigned-by-me")
+@conditional_get()
 def get_assigned_tasks():
     if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
     user_id = session['user_id']
-    conn = get_db_connection()
-    if not conn: return jsonify({"error": "Database error"}), 500
     try:
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT e.*, u.username as assignee_name FROM events e JOIN assigned_tasks at ON e.id = at.event_id JOIN users u ON at.assignee_id = u.user_id WHERE at.assigner_id = %s ORDER BY e.date, e.time"
-        cursor.execute(query, (user_id,))
-        tasks = cursor.fetchall()
-        return jsonify(tasks), 200
+        fields, select_sql = select_task_fields({'assignee_name': 'at.assignee_id'})  # Resolved on the primary
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        # The tasks live on their assignees' shards; owner and sort keys follow the fields
+        query = f"SELECT {select_sql}, e.user_id, e.date, e.time FROM events e JOIN assigned_tasks at ON e.id = at.event_id WHERE at.assigner_id = %s"
+        rows = query_owned_rows(query, (user_id,), owner_column=len(fields))
+        rows.sort(key=lambda row: (row[-2], row[-1] or ''))
+        rows = resolve_user_column([row[:len(fields)] for row in rows], fields, 'assignee_name', 'username')
+        return task_list_response(rows, fields), 200
     except Error as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        if conn.is_connected(): cursor.close(); conn.close()
 
 # --- Task Assignment & Action Endpoints ---
 @collaboration_bp.route('/api/task/create_and_assign', methods=['POST'])
@@ -162,8 +259,9 @@ def create_and_assign_task():
     assigner_id = session['user_id']
     data = request.json
     assignee_id, title, description, category, event_date, event_time = data.get('assignee_id'), data.get('title'), data.get('description'), data.get('category'), data.get('date'), data.get('time')
-    if not all([assignee_id, title, category, event_date, event_time]): return jsonify({"error": "Missing required fields"}), 400
-    conn = get_db_connection()
+    if not all([assignee_id, title, event_date, event_time]): return jsonify({"error": "Missing required fields"}), 400
+    category = category or classify(title, assigner_id, description)  # Optional; picked like the assigner would
+    conn = get_shard_connection(assignee_id)  # The task is the assignee's event
     if not conn: return jsonify({"error": "Database connection failed"}), 500
     try:
         cursor = conn.cursor()
@@ -174,6 +272,7 @@ def create_and_assign_task():
         new_event_id = cursor.lastrowid
         assignment_query = "INSERT INTO assigned_tasks (assigner_id, assignee_id, event_id) VALUES (%s, %s, %s)"
         cursor.execute(assignment_query, (assigner_id, assignee_id, new_event_id))
+        bump_data_version(cursor, assigner_id, assignee_id)
         conn.commit()
         return jsonify({"message": "Task created and assigned successfully", "event_id": new_event_id}), 201
     except Error as e:
@@ -182,17 +281,102 @@ def create_and_assign_task():
     finally:
         if conn and conn.is_connected(): cursor.close(); conn.close()
 
+MAX_ASSIGNEES_PER_REQUEST = 100
+
+def _insert_assigned_copies(shard, assigner_id, assignee_ids, task):
+    """
+    Inserts one copy of `task` (title, description, category, date, time) per
+    assignee on one shard, in one transaction. Returns the new event ids.
+    """
+    conn = connect_shard(shard)
+    if not conn: raise Error("Database connection failed")
+    try:
+        cursor = conn.cursor()
+        conn.start_transaction()
+        event_query = "INSERT INTO events (user_id, title, description, category, date, time, done, reminder_setting, reminder_datetime, reminde1, reminde2, reminde3, reminde4) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)"
+        cursor.executemany(event_query, [
+            (assignee_id, *task, False, 'none', None, False, False, False, False)
+            for assignee_id in assignee_ids
+        ])
+        # A multi-row INSERT gets consecutive ids starting at LAST_INSERT_ID(),
+        # spaced by auto_increment_increment.
+        first_event_id = cursor.lastrowid
+        cursor.execute("SELECT @@auto_increment_increment")
+        step = cursor.fetchone()[0]
+        event_ids = [first_event_id + i * step for i in range(len(assignee_ids))]
+        assignment_query = "INSERT INTO assigned_tasks (assigner_id, assignee_id, event_id) VALUES (%s, %s, %s)"
+        cursor.executemany(assignment_query, [(assigner_id, assignee_id, event_id) for assignee_id, event_id in zip(assignee_ids, event_ids)])
+        bump_data_version(cursor, assigner_id, *assignee_ids)
+        conn.commit()
+        return event_ids
+    except Error:
+        if conn.is_connected(): conn.rollback()
+        raise
+    finally:
+        if conn.is_connected(): cursor.close(); conn.close()
+
+@collaboration_bp.route('/api/task/create_and_assign_many', methods=['POST'])
+def create_and_assign_task_many():
+    """
+    Creates one copy of a task for each id in `assignee_ids`. Every assignee
+    must be an accepted collaborator (or the assigner). Without a `category`,
+    one is picked from the title (categories.py). Returns the new event
+    id per assignee. The copies on one shard are created in one transaction;
+    if a shard fails, the assignments already made are returned with the
+    assignee ids that were not.
+    """
+    if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
+    assigner_id = session['user_id']
+    data = request.json
+    assignee_ids, title, description, category, event_date, event_time = data.get('assignee_ids'), data.get('title'), data.get('description'), data.get('category'), data.get('date'), data.get('time')
+    if not all([assignee_ids, title, event_date, event_time]): return jsonify({"error": "Missing required fields"}), 400
+    if not isinstance(assignee_ids, list): return jsonify({"error": "assignee_ids must be a list"}), 400
+    assignee_ids = list(dict.fromkeys(assignee_ids))  # De-duplicate, keep order
+    if len(assignee_ids) > MAX_ASSIGNEES_PER_REQUEST: return jsonify({"error": f"At most {MAX_ASSIGNEES_PER_REQUEST} assignees per request"}), 400
+    conn = get_db_connection()
+    if not conn: return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        # Verify every collaboration edge with one indexed lookup
+        others = [a for a in assignee_ids if a != assigner_id]
+        if others:
+            placeholders = ", ".join(["%s"] * len(others))
+            cursor.execute(f"SELECT peer_id FROM collaboration_edges WHERE user_id = %s AND status = 'accepted' AND peer_id IN ({placeholders})", (assigner_id, *others))
+            allowed = {row[0] for row in cursor.fetchall()}
+            not_allowed = [a for a in others if a not in allowed]
+            if not_allowed: return jsonify({"error": "Some assignees are not your collaborators", "assignee_ids": not_allowed}), 403
+        groups = group_by_shard(assignee_ids)
+    except Error as e:
+        return jsonify({"error": f"An internal error occurred: {e}"}), 500
+    finally:
+        if conn and conn.is_connected(): cursor.close(); conn.close()
+
+    task = (title, description, category or classify(title, assigner_id, description), event_date, event_time)
+    created = {}
+    for shard, shard_assignee_ids in groups.items():
+        try:
+            created.update(zip(shard_assignee_ids, _insert_assigned_copies(shard, assigner_id, shard_assignee_ids, task)))
+        except Error as e:
+            assignments = [{"assignee_id": a, "event_id": created[a]} for a in assignee_ids if a in created]
+            failed = [a for a in assignee_ids if a not in created]
+            return jsonify({"error": f"An internal error occurred: {e}", "assignments": assignments, "failed_assignee_ids": failed}), 500
+    assignments = [{"assignee_id": assignee_id, "event_id": created[assignee_id]} for assignee_id in assignee_ids]
+    return jsonify({"message": f"Task created and assigned to {len(assignments)} collaborator(s)", "assignments": assignments}), 201
+
 @collaboration_bp.route('/api/task/<int:task_id>/toggle_done', methods=['POST'])
 def toggle_task_done(task_id):
     if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
     user_id = session['user_id']
-    conn = get_db_connection()
+    conn = get_shard_connection(user_id)
     if not conn: return jsonify({"error": "Database connection failed"}), 500
     try:
         cursor = conn.cursor()
         query = "UPDATE events SET done = NOT done WHERE id = %s AND user_id = %s"
         cursor.execute(query, (task_id, user_id))
         if cursor.rowcount == 0: return jsonify({"error": "Task not found or you don't have permission."}), 404
+        # The assigner's "assigned by me" view shows the done flag too
+        cursor.execute("SELECT assigner_id FROM assigned_tasks WHERE event_id = %s", (task_id,))
+        bump_data_version(cursor, user_id, *[row[0] for row in cursor.fetchall()])
         conn.commit()
         return jsonify({"message": "Task status updated."}), 200
     except Error as e:
@@ -202,22 +386,57 @@ def toggle_task_done(task_id):
 
 @collaboration_bp.route('/api/task/<int:task_id>', methods=['DELETE'])
 def delete_task(task_id):
+    """
+    Deletes a task for its owner or its assigner. A task you assigned lives
+    on the assignee's shard, so the other shards are tried after your own.
+    """
     if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
     current_user_id = session['user_id']
-    conn = get_db_connection()
+    try:
+        own_shard = shard_for(current_user_id)
+    except Error as e:
+        return jsonify({"error": f"An internal error occurred: {e}"}), 500
+    perm_query = "SELECT e.user_id, at.assigner_id FROM events e LEFT JOIN assigned_tasks at ON e.id = at.event_id WHERE e.id = %s"
+    for shard in sorted(shard_indexes(), key=lambda index: index != own_shard):
+        conn = connect_shard(shard)
+        if not conn: return jsonify({"error": "Database connection failed"}), 500
+        try:
+            cursor = conn.cursor(dictionary=True)
+            conn.start_transaction()
+            cursor.execute(perm_query, (task_id,))
+            task_info = cursor.fetchone()
+            if not task_info or shard_for(task_info['user_id']) != shard:
+                conn.rollback()
+                continue  # Not here, or a copy left behind by a bucket move
+            is_owner = task_info.get('user_id') == current_user_id
+            is_assigner = task_info.get('assigner_id') == current_user_id
+            if not (is_owner or is_assigner): return jsonify({"error": "You do not have permission to delete this task."}), 403
+            ensure_writable(task_info['user_id'])
+            cursor.execute("DELETE FROM assigned_tasks WHERE event_id = %s", (task_id,))
+            cursor.execute("DELETE FROM events WHERE id = %s", (task_id,))
+            bump_data_version(cursor, task_info.get('user_id'), task_info.get('assigner_id'))
+            conn.commit()
+            return jsonify({"message": "Task successfully deleted."}), 200
+        except Error as e:
+            if conn and conn.is_connected(): conn.rollback()
+            return jsonify({"error": f"An internal error occurred: {e}"}), 500
+        finally:
+            if conn and conn.is_connected(): cursor.close(); conn.close()
+    return _delete_archived_task(task_id, current_user_id, own_shard)
+
+def _delete_archived_task(task_id, user_id, shard):
+    """Archived tasks (archive.py) are never assigned ones, so only the owner's shard can hold them."""
+    conn = connect_shard(shard)
     if not conn: return jsonify({"error": "Database connection failed"}), 500
     try:
-        cursor = conn.cursor(dictionary=True)
+        cursor = conn.cursor()
+        ensure_writable(user_id)
         conn.start_transaction()
-        perm_query = "SELECT e.user_id, at.assigner_id FROM events e LEFT JOIN assigned_tasks at ON e.id = at.event_id WHERE e.id = %s"
-        cursor.execute(perm_query, (task_id,))
-        task_info = cursor.fetchone()
-        if not task_info: return jsonify({"error": "Task not found."}), 404
-        is_owner = task_info.get('user_id') == current_user_id
-        is_assigner = task_info.get('assigner_id') == current_user_id
-        if not (is_owner or is_assigner): return jsonify({"error": "You do not have permission to delete this task."}), 403
-        cursor.execute("DELETE FROM assigned_tasks WHERE event_id = %s", (task_id,))
-        cursor.execute("DELETE FROM events WHERE id = %s", (task_id,))
+        cursor.execute("DELETE FROM events_archive WHERE id = %s AND user_id = %s", (task_id, user_id))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return jsonify({"error": "Task not found."}), 404
+        bump_data_version(cursor, user_id)
         conn.commit()
         return jsonify({"message": "Task successfully deleted."}), 200
     except Error as e:
@@ -227,32 +446,39 @@ def delete_task(task_id):
         if conn and conn.is_connected(): cursor.close(); conn.close()
 
 @collaboration_bp.route("/api/tasks/own")
+@conditional_get()
 def get_own_tasks():
     """Get tasks created by the user themselves (not assigned by others)"""
     if 'user_id' not in session: return jsonify({"error": "Unauthorized"}), 401
     user_id = session['user_id']
-    conn = get_db_connection()
+    try:
+        fields, select_sql = select_task_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    conn = get_shard_read_connection(user_id)
     if not conn: return jsonify({"error": "Database error"}), 500
     
     try:
-        cursor = conn.cursor(dictionary=True)
-        # Get tasks that belong to the user but are NOT assigned by others
-        query = """
-            SELECT e.*
-            FROM events e
+        cursor = conn.cursor()
+        # Get tasks that belong to the user but are NOT assigned by others;
+        # ?archived=0 skips the archive
+        source, params = events_source("user_id = %s", (user_id,), archived=include_archived(request.args))
+        query = f"""
+            SELECT {select_sql}
+            FROM {source} e
             LEFT JOIN assigned_tasks at ON e.id = at.event_id
-            WHERE e.user_id = %s AND (at.event_id IS NULL OR at.assigner_id = %s)
+            WHERE at.event_id IS NULL OR at.assigner_id = %s
             ORDER BY e.date, e.time
         """
-        cursor.execute(query, (user_id, user_id))
-        tasks = cursor.fetchall()
-        return jsonify(tasks), 200
+        cursor.execute(query, (*params, user_id))
+        return task_list_response(cursor.fetchall(), fields), 200
     except Error as e:
         return jsonify({"error": str(e)}), 500
     finally:
         if conn.is_connected(): cursor.close(); conn.close()
 
 @collaboration_bp.route("/api/collaboration/events/month_view")
+@conditional_get()
 def get_events_for_month():
     """
     Fetches days with pending tasks and days with only completed tasks 
@@ -268,14 +494,16 @@ def get_events_for_month():
     if not year or not month:
         return jsonify({"error": "Year and month parameters are required"}), 400
 
-    conn = get_db_connection()
+    conn = get_shard_read_connection(user_id)
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
         cursor = conn.cursor(dictionary=True)
         date_pattern = f"{year}-{int(month):02d}-%"
-        cursor.execute("SELECT date, done FROM events WHERE user_id = %s AND date LIKE %s", (user_id, date_pattern))
+        source, params = events_source("user_id = %s AND date LIKE %s", (user_id, date_pattern),
+                                       f"{year}-{int(month):02d}-01", columns="date, done")
+        cursor.execute(f"SELECT date, done FROM {source} e", params)
         events = cursor.fetchall()
 
         events_by_day = {}
@@ -288,6 +516,11 @@ def get_events_for_month():
             else:
                 events_by_day[day]['hasPending'] = True
 
+        for day, (has_pending, has_completed) in month_day_states(user_id, year, month, cursor).items():
+            state = events_by_day.setdefault(day, {'hasPending': False, 'hasCompleted': False})
+            state['hasPending'] |= has_pending
+            state['hasCompleted'] |= has_completed
+
         return jsonify(events_by_day)
     except Exception as err:
         return jsonify({"error": str(err)}), 500
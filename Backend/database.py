@@ -1,10 +1,18 @@
 import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
 import os
+import threading
+import time
 from datetime import datetime
 from dotenv import load_dotenv
+from logs import get_logger
+import sqlite_backend
 
 load_dotenv()
 
+log = get_logger(__name__)
+
 # Database configuration details from environment variables
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
@@ -14,17 +22,226 @@ DB_CONFIG = {
     "use_pure": bool(os.getenv("USE_PURE", True))
 }
 
+# --- Per-Process Connection Pool ---
+# The pool is created lazily inside each worker process. A pool inherited
+# through fork() would share sockets with the parent, so it is dropped in
+# the child and rebuilt on first use.
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pool_settings = {
+    "name": "helpscout",
+    "size": 8,
+    "backend": os.getenv("DB_BACKEND", "mysql").lower(),  # mysql | sqlite
+    "sqlite_path": os.getenv("SQLITE_PATH", "helpscout.sqlite3"),
+    "sqlite_busy_timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", "5")),
+}
+# Times get_db_connection() found the pool exhausted / opened a direct connection
+pool_counters = {"exhausted": 0, "direct": 0}
+
+
+def init_pool(config=None):
+    """
+    Applies pool settings from `config` (the Config class or an object with
+    the same attributes). The pool itself is opened lazily on first use so
+    a pre-fork master never holds connections its workers would inherit.
+    """
+    if config is not None:
+        DB_CONFIG.update(config.DB_CONFIG)
+        _pool_settings["name"] = getattr(config, "DB_POOL_NAME", _pool_settings["name"])
+        _pool_settings["size"] = getattr(config, "DB_POOL_SIZE", _pool_settings["size"])
+        _pool_settings["backend"] = getattr(config, "DB_BACKEND", _pool_settings["backend"]).lower()
+        _pool_settings["sqlite_path"] = getattr(config, "SQLITE_PATH", _pool_settings["sqlite_path"])
+        _pool_settings["sqlite_busy_timeout"] = getattr(config, "SQLITE_BUSY_TIMEOUT", _pool_settings["sqlite_busy_timeout"])
+    reset_pool()
+
+
+def _open_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool_pid == os.getpid():
+            return _pool  # Another thread got here first
+        _pool = None
+        if _pool_settings["size"] > 0:  # 0 disables pooling
+            try:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name=f"{_pool_settings['name']}-{os.getpid()}",
+                    pool_size=min(_pool_settings["size"], pooling.CNX_POOL_MAXSIZE),
+                    pool_reset_session=True,
+                    **DB_CONFIG
+                )
+            except mysql.connector.Error as e:
+                log.error("db.pool_failed", error=str(e))
+        _pool_pid = os.getpid()
+        return _pool
+
+
+def reset_pool():
+    """Forgets the current pool; called in a child process right after fork()."""
+    global _pool, _pool_pid
+    _pool = None
+    _pool_pid = None
+
+
+def _get_pool():
+    if _pool_pid != os.getpid():
+        return _open_pool()
+    return _pool
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_pool)
+
+
+def backend():
+    """The configured storage driver: "mysql" or "sqlite"."""
+    return _pool_settings["backend"]
+
+
+def _sqlite_engine():
+    return sqlite_backend.engine(_pool_settings["sqlite_path"], _pool_settings["size"],
+                                 _pool_settings["sqlite_busy_timeout"])
+
+
+def pool_stats():
+    """Size and idle connections of this process's pool (None if there is none)."""
+    if backend() == "sqlite":
+        return _sqlite_engine().stats()
+    pool = _pool if _pool_pid == os.getpid() else None
+    if pool is None:
+        return None
+    return {"size": pool.pool_size, "idle": pool._cnx_queue.qsize()}
+
+
+# --- Query Observers ---
+# Modules that need per-query timings (metrics.py, slow_queries.py) register
+# an observer; connections are only wrapped while at least one is
+# registered, so the plain path has no overhead.
+_query_observers = []
+
+
+def on_query(observer):
+    """
+    Registers `observer(statement, seconds, params)`, called after every
+    execute()/executemany(). `params` is None for executemany().
+    """
+    _query_observers.append(observer)
+    return observer
+
+
+def _notify(statement, seconds, params=None):
+    for observer in _query_observers:
+        try:
+            observer(statement, seconds, params)
+        except Exception:
+            log.exception("db.query_observer_failed")
+
+
+class _Cursor:
+    """Cursor proxy that lets callers defer work until its connection commits."""
+    __slots__ = ("_cursor", "_conn")
+
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+
+    def after_commit(self, callback):
+        """Runs `callback()` once this connection's current transaction commits; dropped on rollback."""
+        self._conn.after_commit(callback)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _ObservedCursor(_Cursor):
+    """Cursor proxy that also reports the duration of each statement."""
+    __slots__ = ()
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            _notify(operation, time.perf_counter() - started, params)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            _notify(operation, time.perf_counter() - started)
+
+
+class _Connection:
+    """
+    Connection proxy. Its cursors are _ObservedCursors while query observers
+    are registered, and callbacks registered with after_commit() run right
+    after a successful commit().
+    """
+    __slots__ = ("_conn", "_after_commit")
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._after_commit = []
+
+    def cursor(self, *args, **kwargs):
+        cursor_class = _ObservedCursor if _query_observers else _Cursor
+        return cursor_class(self._conn.cursor(*args, **kwargs), self)
+
+    def after_commit(self, callback):
+        self._after_commit.append(callback)
+
+    def commit(self):
+        self._conn.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                log.exception("db.after_commit_failed")
+
+    def rollback(self):
+        self._after_commit = []
+        return self._conn.rollback()
+
+    def close(self):
+        self._after_commit = []
+        return self._conn.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _wrap(conn):
+    return _Connection(conn)
+
+
 def get_db_connection():
     """
     Establishes and returns a new database connection.
     This function is now available to be imported by other modules.
+    Connections come from the per-process pool when one is available;
+    calling close() on them returns them to the pool. With DB_BACKEND=sqlite
+    they are sqlite_backend connections with the same interface.
     """
     try:
+        if backend() == "sqlite":
+            return _wrap(sqlite_backend.connect(_sqlite_engine()))
+        pool = _get_pool()
+        if pool is not None:
+            try:
+                return _wrap(pool.get_connection())
+            except PoolError:
+                pool_counters["exhausted"] += 1  # Fall back to a one-off connection
         conn = mysql.connector.connect(**DB_CONFIG)
-        print("Database connection successfully created.")
-        return conn
+        pool_counters["direct"] += 1
+        log.debug("db.direct_connection", sample=True)
+        return _wrap(conn)
     except mysql.connector.Error as e:
-        print(f"Database connection failed: {e}")
+        log.error("db.connect_failed", error=str(e))
         return None
 
 class Database:
@@ -38,12 +255,12 @@ class Database:
         try:
             # The ping=True argument attempts to reconnect if the connection is lost.
             if not self.connection or not self.connection.is_connected():
-                 print("Reconnecting to the database...")
+                 log.info("db.reconnecting")
                  self.connection = get_db_connection()
             if not self.connection:
                 raise Exception("Failed to re-establish database connection.")
         except mysql.connector.Error as e:
-            print(f"Connection check failed, attempting to reconnect: {e}")
+            log.warning("db.connection_check_failed", error=str(e))
             self.connection = get_db_connection()
             if not self.connection:
                  raise Exception("Failed to re-establish database connection after ping failure.")
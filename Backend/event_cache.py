@@ -0,0 +1,188 @@
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime
+import pytz
+from flask import g, has_request_context
+from mysql.connector import Error
+from config import Config
+from shards import get_shard_connection
+from logs import get_logger
+from versioning import get_data_version, on_data_version_bump
+
+# Configure IST timezone
+IST = pytz.timezone('Asia/Kolkata')
+log = get_logger(__name__)
+
+# --- Upcoming Events Cache ---
+# Home, chat, deletion and conflict checks all need the same set: the user's
+# pending events from today onward. Each worker keeps that set per active
+# user as a date-sorted list, so date ranges are two bisects away.
+#
+# An entry is tagged with the user's data version (versioning.py). It is
+# reused without a DB round trip for `revalidate_after` seconds, then checked
+# against the current version with one primary-key lookup; any write in any
+# worker changes the version and forces a reload. A request that has already
+# read the version for its ETag (versioning.conditional_get) never gets an
+# entry older than that version, so a body always matches its ETag.
+
+UPCOMING_COLUMNS = ('id', 'title', 'description', 'category', 'date', 'time')
+_ROW_OVERHEAD = sys.getsizeof(()) + 8 * len(UPCOMING_COLUMNS)
+
+
+def _request_version(user_id):
+    """The version this request already read for `user_id` (conditional_get), if any."""
+    if not has_request_context():
+        return None
+    data_version = g.get('data_version')
+    if data_version and data_version[0] == user_id:
+        return data_version[1]
+    return None
+
+
+class _Entry:
+    __slots__ = ('version', 'today', 'checked_at', 'dates', 'rows', 'size')
+
+    def __init__(self, version, today, rows):
+        self.version = version
+        self.today = today
+        self.checked_at = time.monotonic()
+        self.rows = rows
+        self.dates = [row[4] for row in rows]
+        self.size = sum(_ROW_OVERHEAD + sum(len(v) if isinstance(v, str) else 8 for v in row) for row in rows)
+
+
+class UpcomingEventsCache:
+    def __init__(self, max_bytes, revalidate_after):
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # --- internal helpers ---
+    def _drop(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry:
+            self._bytes -= entry.size
+
+    def _store(self, user_id, entry):
+        with self._lock:
+            self._drop(user_id)
+            if entry.size > self.max_bytes:
+                return  # Too big to cache at all
+            self._entries[user_id] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                evicted_id, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def _load(self, user_id, today):
+        version = get_data_version(user_id)
+        if version is None:
+            return None
+        conn = get_shard_connection(user_id, write=False)
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, title, description, Category, date, time FROM events "
+                "WHERE user_id = %s AND date >= %s AND done = FALSE ORDER BY date, time",
+                (user_id, today)
+            )
+            entry = _Entry(version, today, [tuple(row) for row in cursor.fetchall()])
+        except Error as e:
+            log.error("event_cache.load_failed", user_id=user_id, error=str(e))
+            return None
+        finally:
+            if conn and conn.is_connected():
+                cursor.close()
+                conn.close()
+        self._store(user_id, entry)
+        return entry
+
+    def _get_entry(self, user_id):
+        today = datetime.now(IST).strftime('%Y-%m-%d')
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry.today == today:
+                self._entries.move_to_end(user_id)
+        if entry and entry.today == today:
+            known = _request_version(user_id)
+            if known is not None:
+                current = entry.version >= known
+            else:
+                current = (time.monotonic() - entry.checked_at < self.revalidate_after
+                           or get_data_version(user_id) == entry.version)
+            if current:
+                entry.checked_at = time.monotonic()
+                with self._lock:
+                    self.hits += 1
+                return entry
+        with self._lock:
+            self.misses += 1
+        return self._load(user_id, today)
+
+    # --- public API ---
+    def get_range(self, user_id, start_date=None, end_date=None):
+        """
+        Returns the user's pending events with start_date <= date <= end_date
+        (both 'YYYY-MM-DD', inclusive, either may be None) as dicts ordered by
+        date and time. Only today onward is cached. Returns None when the
+        database is unavailable.
+        """
+        entry = self._get_entry(user_id)
+        if entry is None:
+            return None
+        lo = bisect_left(entry.dates, start_date) if start_date else 0
+        hi = bisect_right(entry.dates, end_date) if end_date else len(entry.rows)
+        return [dict(zip(UPCOMING_COLUMNS, row)) for row in entry.rows[lo:hi]]
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._drop(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters and memory use of this worker's cache (exported at /metrics)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+            }
+
+
+upcoming_cache = UpcomingEventsCache(Config.UPCOMING_CACHE_MAX_BYTES, Config.UPCOMING_CACHE_REVALIDATE)
+
+# Drop entries as soon as this worker writes; other workers notice the new version
+on_data_version_bump(lambda user_ids: upcoming_cache.invalidate(*user_ids))
+
+
+def init_event_cache(config=Config):
+    """Applies cache settings and starts each worker with an empty cache."""
+    upcoming_cache.max_bytes = config.UPCOMING_CACHE_MAX_BYTES
+    upcoming_cache.revalidate_after = config.UPCOMING_CACHE_REVALIDATE
+    upcoming_cache.clear()
+
+
+def get_upcoming_events(user_id, start_date=None, end_date=None):
+    """Shortcut for upcoming_cache.get_range()."""
+    return upcoming_cache.get_range(user_id, start_date, end_date)
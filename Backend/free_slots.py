@@ -0,0 +1,104 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import chain
+import pytz
+from config import Config
+from event_cache import get_upcoming_events
+from recurrence import get_occurrences
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# --- Free Slots ---
+# Events store a start time but no length, so each pending event and each
+# recurring occurrence is taken to block EVENT_DURATION_MINUTES from its
+# start; untimed ones block nothing. For every day the busy intervals of all
+# requested users are sorted by start and swept once: the sweep keeps the
+# end of the busy time merged so far, and every gap of at least `min_minutes`
+# inside working hours is a free slot. The intervals come from the
+# upcoming-events cache (event_cache.py), so even a dense month costs a
+# bisect and a sort per day. Days before today have no free time.
+
+MAX_DAYS = 62
+
+
+def parse_hhmm(value):
+    """Minutes after midnight for 'HH:MM' (24:00 allowed), or None."""
+    try:
+        hours, minutes = (int(part) for part in str(value).split(':')[:2])
+    except (TypeError, ValueError):
+        return None
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > 24 * 60:
+        return None
+    return hours * 60 + minutes
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def busy_intervals(user_id, start_date, end_date, event_minutes=None):
+    """
+    {'YYYY-MM-DD': [(start, end), ...]} in minutes after midnight, for the
+    user's pending events and recurring occurrences between the two dates
+    (inclusive, today onward). None if the schedule can't be read.
+    """
+    event_minutes = event_minutes or Config.EVENT_DURATION_MINUTES
+    events = get_upcoming_events(user_id, start_date, end_date)
+    if events is None:
+        return None
+    busy = defaultdict(list)
+    for event in chain(events, get_occurrences(user_id, start_date, end_date, include_done=False)):
+        start = parse_hhmm(event['time'])
+        if start is not None:
+            busy[event['date']].append((start, min(start + event_minutes, 24 * 60)))
+    return busy
+
+
+def sweep(intervals, day_start, day_end, min_minutes):
+    """The gaps of at least `min_minutes` in [day_start, day_end) not covered by `intervals` (any order)."""
+    gaps, covered_until = [], day_start
+    for start, end in sorted(intervals):
+        if start >= day_end:
+            break
+        if start - covered_until >= min_minutes:
+            gaps.append((covered_until, start))
+        covered_until = max(covered_until, end)
+    if day_end - covered_until >= min_minutes:
+        gaps.append((covered_until, day_end))
+    return gaps
+
+
+def find_free_slots(user_ids, start_date, end_date, work_start, work_end, min_minutes, now=None):
+    """
+    Free slots common to all `user_ids` between the 'YYYY-MM-DD' dates
+    (inclusive), within working hours (minutes after midnight), as dicts
+    with date, start, end ('HH:MM') and minutes. None if any user's
+    schedule can't be read.
+    """
+    now = now or datetime.now(IST)
+    first = max(date.fromisoformat(start_date), now.date())
+    last = date.fromisoformat(end_date)
+    if first > last:
+        return []
+    first_str, last_str = first.isoformat(), last.isoformat()
+
+    busy = defaultdict(list)
+    for user_id in user_ids:
+        intervals = busy_intervals(user_id, first_str, last_str)
+        if intervals is None:
+            return None
+        for day, day_intervals in intervals.items():
+            busy[day].extend(day_intervals)
+
+    slots = []
+    day = first
+    while day <= last:
+        day_str = day.isoformat()
+        day_start = work_start
+        if day == now.date():
+            day_start = max(work_start, now.hour * 60 + now.minute + (1 if now.second else 0))
+        for start, end in sweep(busy.get(day_str, ()), day_start, work_end, min_minutes):
+            slots.append({'date': day_str, 'start': format_minutes(start), 'end': format_minutes(end),
+                          'minutes': end - start})
+        day += timedelta(days=1)
+    return slots
@@ -0,0 +1,45 @@
+"""
+Gunicorn settings for HelpScout. Values can be overridden with the usual
+environment variables (WEB_CONCURRENCY, GUNICORN_THREADS, PORT).
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# One process per core (plus one, to cover a worker stalled on I/O) for CPU
+# work such as JSON encoding; threads inside each worker overlap DB and LLM
+# waits. Not 2 * cores + 1: bcrypt runs in each worker's spawn pool
+# (passwords.py), so a login burst keeps workers * PASSWORD_HASH_WORKERS
+# processes busy while the waiting workers sit idle. One hashing process per
+# worker keeps that at cores + 1 instead of oversubscribing the CPU.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() + 1))
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "1")
+# The reminder stream is served by asgi.py, not by these threads (see DEPLOYMENT.md).
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = 120  # LLM calls can take up to a minute
+keepalive = 5
+
+# Import the app once in the master so workers fork with the code loaded.
+# create_app() then runs schema setup a single time, before any fork, but
+# leaves the per-worker resources (pools, caches, background threads such as
+# the log listener, archiver and category trainer) to post_fork: threads do
+# not survive fork() and may leave their locks held in the child.
+preload_app = True
+os.environ.setdefault("DEFER_WORKER_INIT", "true")
+
+# Each worker opens its own pool; keep it at least as big as `threads`.
+os.environ.setdefault("DB_POOL_SIZE", str(threads))
+
+
+def post_fork(server, worker):
+    """Starts per-process resources (DB pool, caches, threads, AI clients) in every worker."""
+    from app import init_worker_resources
+    init_worker_resources()
+
+
+def on_starting(server):
+    """Drops metric snapshots left over from a previous run (see metrics.py)."""
+    from metrics import clear_metrics_dir
+    clear_metrics_dir()
@@ -1,6 +1,10 @@
 from flask import Blueprint , jsonify, session, request
-from database import get_db_connection
+from shards import get_shard_read_connection
+from archive import events_source
 from mysql.connector import Error
+from versioning import conditional_get
+from event_cache import get_upcoming_events
+from recurrence import get_occurrences, month_day_states
 from datetime import datetime
 import pytz
 
@@ -11,6 +15,7 @@ IST = pytz.timezone('Asia/Kolkata')
 home_bp = Blueprint('home', __name__)
 
 @home_bp.route("/api/tasks/today")
+@conditional_get(extra=lambda: datetime.now(IST).strftime('%Y-%m-%d'))
 def get_today_tasks():
     """Fetches tasks scheduled for the current date for the logged-in user."""
     if 'user_id' not in session:
@@ -19,29 +24,21 @@ def get_today_tasks():
     user_id = session['user_id']
     today_date = datetime.now(IST).strftime('%Y-%m-%d')
     
-    conn = get_db_connection()
-    if not conn:
+    # Served from the shared upcoming-events cache (event_cache.py)
+    tasks = get_upcoming_events(user_id, today_date, today_date)
+    if tasks is None:
         return jsonify({"error": "Database connection failed"}), 500
-        
-    try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT title, description, time 
-            FROM events 
-            WHERE user_id = %s AND date = %s AND done = FALSE 
-            ORDER BY time
-        """
-        cursor.execute(query, (user_id, today_date))
-        tasks = cursor.fetchall()
-        return jsonify(tasks)
-    except Error as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+    tasks = sorted(
+        tasks + get_occurrences(user_id, today_date, today_date, include_done=False),
+        key=lambda task: task['time'] or ''
+    )
+    return jsonify([
+        {'title': task['title'], 'description': task['description'], 'time': task['time']}
+        for task in tasks
+    ])
 
 @home_bp.route("/api/events/month_view")
+@conditional_get()
 def get_events_for_month():
     """Fetches the days with pending and/or completed tasks for a given month and year."""
     if 'user_id' not in session:
@@ -54,14 +51,16 @@ def get_events_for_month():
     if not year or not month:
         return jsonify({"error": "Year and month parameters are required"}), 400
 
-    conn = get_db_connection()
+    conn = get_shard_read_connection(user_id)
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
         cursor = conn.cursor(dictionary=True)
         date_pattern = f"{year}-{int(month):02d}-%"
-        cursor.execute("SELECT date, done FROM events WHERE user_id = %s AND date LIKE %s", (user_id, date_pattern))
+        source, params = events_source("user_id = %s AND date LIKE %s", (user_id, date_pattern),
+                                       f"{year}-{int(month):02d}-01", columns="date, done")
+        cursor.execute(f"SELECT date, done FROM {source} e", params)
         events = cursor.fetchall()
 
         events_by_day = {}
@@ -74,6 +73,11 @@ def get_events_for_month():
             else:
                 events_by_day[day]['hasPending'] = True
 
+        for day, (has_pending, has_completed) in month_day_states(user_id, year, month, cursor).items():
+            state = events_by_day.setdefault(day, {'hasPending': False, 'hasCompleted': False})
+            state['hasPending'] |= has_pending
+            state['hasCompleted'] |= has_completed
+
         return jsonify(events_by_day)
     except Exception as err:
         return jsonify({"error": str(err)}), 500
@@ -0,0 +1 @@
+"""HTTP load tests for the Flask app. See loadtest/run.py."""
@@ -0,0 +1,90 @@
+"""
+Builds, prints and compares load-test reports.
+
+    python -m loadtest.report old.json new.json
+"""
+import json
+import math
+import sys
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def summarise(samples, errors, elapsed):
+    ordered = sorted(samples)
+    summary = {
+        "count": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 2) if elapsed else None,
+        "mean_ms": round(1000 * sum(ordered) / len(ordered), 2) if ordered else None,
+        "max_ms": round(1000 * ordered[-1], 2) if ordered else None,
+    }
+    for pct in PERCENTILES:
+        value = percentile(ordered, pct)
+        summary[f"p{pct}_ms"] = round(1000 * value, 2) if value is not None else None
+    return summary
+
+
+def build_report(samples, errors, elapsed, meta=None):
+    """Report dict: meta, overall totals and one summary per endpoint name."""
+    everything = [s for per_endpoint in samples.values() for s in per_endpoint]
+    return {
+        "meta": meta or {},
+        "elapsed_s": round(elapsed, 2),
+        "totals": summarise(everything, sum(errors.values()), elapsed),
+        "endpoints": {name: summarise(samples[name], errors.get(name, 0), elapsed) for name in sorted(samples)},
+    }
+
+
+def print_report(report):
+    header = f"{'endpoint':<46} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["totals"])]
+    for name, s in rows:
+        print(f"{name:<46} {s['count']:>7} {s['errors']:>5} {s['rps'] or 0:>8.1f} "
+              f"{s['p50_ms'] or 0:>8.1f} {s['p95_ms'] or 0:>8.1f} {s['p99_ms'] or 0:>8.1f}")
+
+
+def _delta(old, new):
+    if not old or new is None:
+        return "    n/a"
+    return f"{100 * (new - old) / old:>+6.1f}%"
+
+
+def print_comparison(old, new):
+    """Per-endpoint change in throughput and tail latency between two reports."""
+    print(f"\nCompared with {old['meta'].get('git_commit') or 'baseline'} "
+          f"({old['meta'].get('timestamp', '?')}):")
+    print(f"{'endpoint':<46} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    names = sorted(set(old["endpoints"]) | set(new["endpoints"]))
+    for name, before, after in [(n, old["endpoints"].get(n), new["endpoints"].get(n)) for n in names] + \
+            [("TOTAL", old["totals"], new["totals"])]:
+        if not before or not after:
+            print(f"{name:<46} {'only in ' + ('new' if after else 'old'):>8}")
+            continue
+        print(f"{name:<46} {_delta(before['rps'], after['rps']):>8} {_delta(before['p50_ms'], after['p50_ms']):>8} "
+              f"{_delta(before['p95_ms'], after['p95_ms']):>8} {_delta(before['p99_ms'], after['p99_ms']):>8}")
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1]) as f:
+        old = json.load(f)
+    with open(sys.argv[2]) as f:
+        new = json.load(f)
+    print_report(new)
+    print_comparison(old, new)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+HTTP load test: registers and logs in synthetic users, pairs them up as
+collaborators, then drives a weighted mix of API calls for a fixed duration
+and writes throughput and p50/p95/p99 latency per endpoint as JSON.
+
+Start the app with stubbed LLM providers (see loadtest/stub_app.py), then:
+
+    cd Backend
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --users 50 --duration 120 \\
+        --out loadtest-results.json --baseline previous-results.json
+
+Reports from different commits can also be compared later with
+`python -m loadtest.report old.json new.json`.
+"""
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import requests
+
+from loadtest.report import build_report, print_comparison, print_report
+
+# Relative weights of each action in a user's session
+DEFAULT_MIX = {
+    "today": 25,
+    "month_view": 20,
+    "add_task": 12,
+    "all_tasks": 8,
+    "collaborators": 8,
+    "personal_tasks": 5,
+    "assign_task": 4,
+    "calendar_year": 4,
+    "search": 4,
+    "ai_chat": 5,
+}
+
+MONTH_VIEWS = [
+    "/api/events/month_view",
+    "/api/tasks/events/month_view",
+    "/api/schedule/events/month_view",
+    "/api/collaboration/events/month_view",
+    "/api/events",
+]
+
+CHAT_MESSAGES = [
+    "I have a dentist appointment on 14 at 3pm",
+    "Schedule a team sync tomorrow at 11",
+    "What should I focus on today?",
+    "Give me tips to plan my week",
+]
+
+SEARCH_TERMS = ["task", "meet", "load", "gro", "review"]
+
+
+class Recorder:
+    """Thread-safe store of (latency, status) samples per endpoint name."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, status):
+        with self._lock:
+            self.samples[name].append(seconds)
+            if status is None or status >= 400:
+                self.errors[name] += 1
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, index, run_id, use_etags=True):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.session = requests.Session()
+        self.use_etags = use_etags
+        self.etags = {}
+        self.email = f"loadtest-{run_id}-{index}@example.invalid"
+        self.phone = f"9{run_id[:4]}{index:05d}"
+        self.password = f"LoadTest!{index}"
+        self.user_id = None
+        self.partner = None
+
+    def request(self, name, method, path, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if method == "GET" and self.use_etags and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, headers=headers, timeout=60, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(name, time.perf_counter() - started, None)
+            return None
+        self.recorder.record(name, time.perf_counter() - started, response.status_code)
+        if method == "GET" and response.headers.get("ETag"):
+            self.etags[path] = response.headers["ETag"]
+        return response
+
+    # --- Setup ---
+    def sign_up(self):
+        self.request("POST /register", "POST", "/register", json={
+            "username": self.email.split("@")[0], "email": self.email,
+            "phone": self.phone, "password": self.password,
+        })
+        response = self.request("POST /login", "POST", "/login", json={"email": self.email, "password": self.password})
+        return response is not None and response.status_code == 200
+
+    def invite(self, other):
+        self.request("POST /api/collaboration/invite", "POST", "/api/collaboration/invite", json={"email": other.email})
+
+    def accept_invites(self):
+        response = self.request("GET /api/collaboration/requests", "GET", "/api/collaboration/requests")
+        if response is None or response.status_code != 200:
+            return
+        for invite in response.json():
+            self.request("POST /api/collaboration/requests/<id>", "POST",
+                         f"/api/collaboration/requests/{invite['id']}", json={"action": "accept"})
+
+    def load_partner_id(self):
+        response = self.request("GET /api/collaborators", "GET", "/api/collaborators")
+        if response is not None and response.status_code == 200 and response.json():
+            self.partner = response.json()[0]["user_id"]
+
+    # --- Actions ---
+    def _random_day(self):
+        return (datetime.now() + timedelta(days=random.randint(-30, 60))).strftime("%Y-%m-%d")
+
+    def today(self):
+        self.request("GET /api/tasks/today", "GET", "/api/tasks/today")
+
+    def month_view(self):
+        path = random.choice(MONTH_VIEWS)
+        now = datetime.now()
+        self.request(f"GET {path}", "GET", f"{path}?year={now.year}&month={now.month}")
+
+    def add_task(self):
+        self.request("POST /api/tasks/add", "POST", "/api/tasks/add", json={
+            "title": f"Load test task {random.randint(1, 10**6)}",
+            "description": "Created by loadtest/run.py",
+            "category": random.choice(["work", "home", "fitness", "meeting"]),
+            "date": self._random_day(),
+            "time": f"{random.randint(7, 20):02d}:{random.choice(['00', '30'])}",
+            "reminder_setting": "15 minutes",
+        })
+
+    def all_tasks(self):
+        self.request("GET /api/tasks/all", "GET", "/api/tasks/all")
+
+    def collaborators(self):
+        self.request("GET /api/collaborators", "GET", "/api/collaborators")
+
+    def personal_tasks(self):
+        self.request("GET /api/tasks/personal", "GET", "/api/tasks/personal")
+
+    def assign_task(self):
+        if not self.partner:
+            return self.collaborators()
+        self.request("POST /api/task/create_and_assign", "POST", "/api/task/create_and_assign", json={
+            "assignee_id": self.partner, "title": "Review load test numbers", "description": "",
+            "category": "work", "date": self._random_day(), "time": "10:00",
+        })
+
+    def calendar_year(self):
+        self.request("GET /api/calendar/year", "GET", "/api/calendar/year")
+
+    def search(self):
+        self.request("GET /api/tasks/search", "GET", f"/api/tasks/search?q={random.choice(SEARCH_TERMS)}")
+
+    def ai_chat(self):
+        self.request("POST /api/ai/chat", "POST", "/api/ai/chat", json={"message": random.choice(CHAT_MESSAGES)})
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    mix = dict(DEFAULT_MIX)
+    for override in args.mix or []:
+        name, _, weight = override.partition("=")
+        if name not in mix:
+            raise SystemExit(f"Unknown action in --mix: {name}")
+        mix[name] = int(weight)
+    actions, weights = zip(*[(name, w) for name, w in mix.items() if w > 0])
+
+    users = [VirtualUser(args.base_url, recorder, i, run_id, not args.no_etags) for i in range(args.users)]
+    print(f"Signing up {len(users)} users...")
+    users = [user for user in users if user.sign_up()]
+    if not users:
+        raise SystemExit("No user could log in; is the app running?")
+    for a, b in zip(users[::2], users[1::2]):
+        a.invite(b)
+        b.accept_invites()
+    for user in users:
+        user.load_partner_id()
+    setup_samples = {name: list(samples) for name, samples in recorder.samples.items()}
+    setup_errors = dict(recorder.errors)
+    recorder.samples.clear()
+    recorder.errors.clear()
+
+    print(f"Running {len(users)} users for {args.duration}s (think time {args.think}s)...")
+    deadline = time.monotonic() + args.ramp_up + args.duration
+
+    def session_loop(user, delay):
+        time.sleep(delay)
+        rng = random.Random()
+        while time.monotonic() < deadline:
+            getattr(user, rng.choices(actions, weights)[0])()
+            if args.think:
+                time.sleep(rng.expovariate(1 / args.think))
+
+    threads = [
+        threading.Thread(target=session_loop, args=(user, args.ramp_up * i / len(users)), daemon=True)
+        for i, user in enumerate(users)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    report = build_report(recorder.samples, recorder.errors, elapsed, meta={
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "base_url": args.base_url,
+        "users": len(users),
+        "duration": args.duration,
+        "ramp_up": args.ramp_up,
+        "think": args.think,
+        "etags": not args.no_etags,
+        "mix": mix,
+    })
+    report["setup"] = build_report(setup_samples, setup_errors, elapsed)["endpoints"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of steady load after ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=10)
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between actions in seconds (0 = closed loop)")
+    parser.add_argument("--mix", nargs="*", metavar="ACTION=WEIGHT", help=f"override weights of: {', '.join(DEFAULT_MIX)}")
+    parser.add_argument("--no-etags", action="store_true", help="do not send If-None-Match")
+    parser.add_argument("--out", default="loadtest-results.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\nWrote {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""
+WSGI entry point with stubbed LLM providers, for load tests only:
+
+    cd Backend
+    gunicorn -c gunicorn.conf.py loadtest.stub_app:app
+
+LOADTEST_LLM_LATENCY / LOADTEST_LLM_JITTER set the fake provider latency in
+seconds; LOADTEST_LLM_FAILING is a comma-separated list of providers that
+should fail (e.g. "gemini" to measure the Cohere fallback).
+"""
+from loadtest import stub_providers
+
+stub_providers.install_from_env()
+
+from app import create_app  # noqa: E402
+
+app = create_app()
@@ -0,0 +1,13 @@
+"""
+ASGI entry point (asgi.py) with stubbed LLM providers, for load tests only:
+
+    cd Backend
+    uvicorn loadtest.stub_asgi:app --port 8001 --workers 1
+
+Takes the same LOADTEST_LLM_* settings as loadtest/stub_app.py.
+"""
+from loadtest import stub_providers
+
+stub_providers.install_from_env()
+
+from asgi import app  # noqa: E402,F401
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# --- Stub LLM Providers ---
+# Drop-in fakes for the Gemini, Cohere and Groq clients (sync and async) used
+# by ai_io.py. They sleep for a configurable latency and answer with canned
+# text shaped like what each prompt asks for, so /api/ai/chat runs its full
+# detection -> extraction -> insert -> reply path without network calls.
+#
+# Batched prompts (ai_batch.py) get one answer per request id, and each
+# answer adds `item_latency` seconds, like the extra output tokens would. A
+# `concurrency` above 0 caps the calls in flight per provider, the way a
+# provider's rate limit does.
+
+_settings = {"latency": 0.3, "jitter": 0.1, "item_latency": 0.0, "concurrency": 0, "failing": set()}
+_limits = {}
+_limits_lock = threading.Lock()
+_calls = {"count": 0, "prompt_chars": 0}
+
+
+def _answers(prompt):
+    return max(1, prompt.count('{"id": "r'))
+
+
+def _latency(prompt):
+    _calls["count"] += 1
+    _calls["prompt_chars"] += len(prompt)
+    base = max(0.0, random.gauss(_settings["latency"], _settings["jitter"]))
+    return base + _settings["item_latency"] * _answers(prompt)
+
+
+def _check(provider):
+    if provider in _settings["failing"]:
+        raise RuntimeError(f"{provider} stub configured to fail")
+
+
+def _limit(provider, kind):
+    """A semaphore capping calls to `provider` (one per kind: threads, or the running event loop)."""
+    key = (provider, kind if kind == "sync" else id(asyncio.get_running_loop()))
+    with _limits_lock:
+        if key not in _limits:
+            size = _settings["concurrency"]
+            _limits[key] = threading.BoundedSemaphore(size) if kind == "sync" else asyncio.Semaphore(size)
+        return _limits[key]
+
+
+def _sleep(provider, prompt):
+    if _settings["concurrency"] > 0:
+        with _limit(provider, "sync"):
+            time.sleep(_latency(prompt))
+    else:
+        time.sleep(_latency(prompt))
+    _check(provider)
+
+
+async def _sleep_async(provider, prompt):
+    if _settings["concurrency"] > 0:
+        async with _limit(provider, "async"):
+            await asyncio.sleep(_latency(prompt))
+    else:
+        await asyncio.sleep(_latency(prompt))
+    _check(provider)
+
+
+def calls():
+    """Provider calls made so far and the prompt characters they sent."""
+    return dict(_calls)
+
+
+def _reply_for(prompt):
+    """Canned answer for each of ai_assistant's and ai_scheduler's prompt types."""
+    if "BATCH MODE:" in prompt:
+        instructions = prompt.split("BATCH MODE:", 1)[0]
+        ids = re.findall(r'\{"id": "(r\d+)"', prompt)
+        return json.dumps({request_id: json.loads(_reply_for(instructions)) for request_id in ids})
+    if "Return ONLY a JSON array" in prompt:
+        day = (datetime.now() + timedelta(days=random.randint(0, 7))).strftime('%Y-%m-%d')
+        return ('[{"title": "Load test task", "description": "Created by the load test", '
+                f'"date": "{day}", "time": "{random.randint(8, 18):02d}:00", "duration_minutes": 45, '
+                '"window": "any", "fixed": false, "reminder_setting": "15 minutes"}]')
+    if "EVENTS_FOUND" in prompt:
+        message = re.search(r'User message: "(.*)"', prompt)
+        text = message.group(1).lower() if message else ""
+        if any(word in text for word in ("cancel", "delete", "remove")):
+            return "DELETE_EVENTS"
+        return "EVENTS_FOUND" if re.search(r"\d", text) else "QUESTION"
+    if '"delete_events"' in prompt:
+        return '{"delete_events": []}'
+    if '"events"' in prompt:
+        day = (datetime.now() + timedelta(days=random.randint(1, 30))).strftime('%Y-%m-%d')
+        return ('{"events": [{"title": "Load test meeting", "description": "Created by the load test", '
+                f'"date": "{day}", "time": "{random.randint(8, 18):02d}:00", '
+                '"reminder_setting": "15 minutes"}]}')
+    return "Here is your plan:\n- Focus on the most important task first\n- Take a short break every hour"
+
+
+class StubGenerativeModel:
+    def __init__(self, model_name=None, *args, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, *args, **kwargs):
+        _sleep("gemini", str(prompt))
+        return SimpleNamespace(text=_reply_for(str(prompt)))
+
+    def start_chat(self, history=None, **kwargs):
+        return self
+
+    def send_message(self, message, *args, **kwargs):
+        _sleep("gemini", str(message))
+        return SimpleNamespace(text=_reply_for(str(message)))
+
+    async def generate_content_async(self, prompt, *args, **kwargs):
+        await _sleep_async("gemini", str(prompt))
+        return SimpleNamespace(text=_reply_for(str(prompt)))
+
+    async def send_message_async(self, message, *args, **kwargs):
+        await _sleep_async("gemini", str(message))
+        return SimpleNamespace(text=_reply_for(str(message)))
+
+
+def _cohere_prompt(message, messages):
+    return message or (messages[-1]["content"] if messages else "")
+
+
+def _cohere_reply(prompt):
+    # Both response shapes: .text (chat v1, ai_assistant) and .message.content (v2 messages, ai_scheduler)
+    text = _reply_for(prompt)
+    return SimpleNamespace(text=text, message=SimpleNamespace(content=text))
+
+
+class StubCohereClient:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def chat(self, message="", messages=(), **kwargs):
+        prompt = _cohere_prompt(message, messages)
+        _sleep("cohere", prompt)
+        return _cohere_reply(prompt)
+
+
+class StubAsyncCohereClient:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def chat(self, message="", messages=(), **kwargs):
+        prompt = _cohere_prompt(message, messages)
+        await _sleep_async("cohere", prompt)
+        return _cohere_reply(prompt)
+
+
+def _groq_reply(messages):
+    prompt = messages[-1]["content"] if messages else ""
+    message = SimpleNamespace(content=_reply_for(prompt))
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class StubGroq:
+    def __init__(self, *args, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages=(), **kwargs):
+        _sleep("groq", messages[-1]["content"] if messages else "")
+        return _groq_reply(messages)
+
+
+class StubAsyncGroq(StubGroq):
+    async def _create(self, messages=(), **kwargs):
+        await _sleep_async("groq", messages[-1]["content"] if messages else "")
+        return _groq_reply(messages)
+
+
+def install(latency=0.3, jitter=0.1, failing=(), item_latency=0.0, concurrency=0):
+    """
+    Replaces the provider clients process-wide. `failing` names providers
+    ("gemini", "cohere", "groq") that should raise, to exercise fallbacks.
+    Call before the app creates its clients (or call init_ai_clients again).
+    """
+    import cohere
+    import google.generativeai as genai
+    import ai_io
+    import ai_assistant
+
+    _settings.update(latency=latency, jitter=jitter, failing=set(failing), item_latency=item_latency,
+                     concurrency=concurrency)
+    _limits.clear()
+    genai.GenerativeModel = StubGenerativeModel
+    cohere.Client = StubCohereClient
+    cohere.AsyncClient = StubAsyncCohereClient
+    ai_io.Groq = StubGroq
+    ai_io.AsyncGroq = StubAsyncGroq
+    ai_assistant.init_ai_clients()
+
+
+def install_from_env():
+    """
+    install() configured by LOADTEST_LLM_LATENCY, LOADTEST_LLM_JITTER,
+    LOADTEST_LLM_FAILING, LOADTEST_LLM_ITEM_LATENCY and LOADTEST_LLM_CONCURRENCY.
+    """
+    import os
+
+    # The AI module only enables a provider when its key is set
+    for key in ("GOOGLE_GEMINI_API_KEY", "COHERE_API_KEY", "GROQ_API_KEY"):
+        os.environ.setdefault(key, "loadtest-stub")
+    install(
+        latency=float(os.getenv("LOADTEST_LLM_LATENCY", "0.3")),
+        jitter=float(os.getenv("LOADTEST_LLM_JITTER", "0.1")),
+        failing=[p for p in os.getenv("LOADTEST_LLM_FAILING", "").split(",") if p],
+        item_latency=float(os.getenv("LOADTEST_LLM_ITEM_LATENCY", "0")),
+        concurrency=int(os.getenv("LOADTEST_LLM_CONCURRENCY", "0")),
+    )
@@ -1,79 +1,15 @@
 from flask import Blueprint, request, jsonify, session
 import mysql.connector
 from mysql.connector import Error
-from bcrypt import hashpw, gensalt, checkpw
+from passwords import hash_password, verify_password, needs_rehash, HashingOverloaded
 import uuid
-from config import Config
+from database import get_db_connection
 from dotenv import load_dotenv
 
 load_dotenv()
 
 auth_bp = Blueprint('auth', __name__)
 
-# --- Database Configuration from Environment Variables ---
-DB_HOST = Config.DB_HOST
-DB_USER = Config.DB_USER
-DB_PASSWORD = Config.DB_PASSWORD
-DB_DATABASE = Config.DB_DATABASE
-
-# --- Database Initialization ---
-def init_db():
-    try:
-        conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD)
-        cursor = conn.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_DATABASE}")
-        cursor.close()
-        conn.close()
-
-        conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_DATABASE)
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id varchar(255) not null UNIQUE,
-            photo_url VARCHAR(255),
-            profile_bio VARCHAR(255) DEFAULT 'Productivity enthusiast and UI/UX designer.',
-            username VARCHAR(255) NOT NULL,
-            email VARCHAR(255) UNIQUE NOT NULL,
-            phone VARCHAR(20) UNIQUE NOT NULL,
-            password VARCHAR(255) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        # Updated Events Table Schema
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS events (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id varchar(255),
-            title VARCHAR(255) NOT NULL,
-            description TEXT,
-            Category VARCHAR(255),
-            date VARCHAR(255) NOT NULL,
-            time VARCHAR(50),
-            done BOOLEAN NOT NULL DEFAULT FALSE,
-            reminder_setting VARCHAR(50),
-            reminder_datetime VARCHAR(255),
-            reminde1 boolean,
-            reminde2 boolean,
-            reminde3 boolean,
-            reminde4 boolean,
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-        )
-        """)
-        conn.commit()
-        cursor.close()
-        conn.close()
-        print("✅ DB + Tables ensured.")
-    except Error as e:
-        print(f"❌ DB Init Error: {e}")
-
-def get_db_connection():
-    try:
-        return mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_DATABASE)
-    except Error as e:
-        print(f"❌ DB Connection Error: {e}")
-        return None
-
 # --- Authentication Endpoints ---
 @auth_bp.route('/register', methods=['POST'])
 def register_user():
@@ -93,14 +29,16 @@ def register_user():
             return jsonify({'message': 'User with this email or phone already exists'}), 409
 
         user_id = str(uuid.uuid4())
-        hashed_password = hashpw(password.encode('utf-8'), gensalt())
+        hashed_password = hash_password(password)
         cursor.execute(
             "INSERT INTO users (user_id, username, email, phone, password) VALUES (%s, %s, %s, %s, %s)",
-            (user_id, username, email, phone, hashed_password.decode('utf-8'))
+            (user_id, username, email, phone, hashed_password)
         )
         conn.commit()
         return jsonify({'message': 'User registered successfully!'}), 201
         
+    except HashingOverloaded:
+        return jsonify({'message': 'Server is busy, please try again.'}), 503, {'Retry-After': '1'}
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'message': f'Registration failed: {err}'}), 500
@@ -124,11 +62,17 @@ def login_user():
         cursor.execute("SELECT user_id, password FROM users WHERE email = %s", (email,))
         user = cursor.fetchone()
 
-        if user and checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+        if user and verify_password(password, user['password']):
+            # Transparently upgrade hashes made with an older cost factor
+            if needs_rehash(user['password']):
+                cursor.execute("UPDATE users SET password = %s WHERE user_id = %s", (hash_password(password), user['user_id']))
+                conn.commit()
             session['user_id'] = user['user_id']
             return jsonify({'message': 'Login successful'}), 200
         else:
             return jsonify({'message': 'Invalid email or password.'}), 401
+    except HashingOverloaded:
+        return jsonify({'message': 'Server is busy, please try again.'}), 503, {'Retry-After': '1'}
     except mysql.connector.Error as err:
         return jsonify({'message': f'Login failed: {err}'}), 500
     finally:
@@ -0,0 +1,239 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+from config import Config
+
+# --- Structured Logging ---
+# Modules log events with key/value fields instead of printing:
+#
+#     log = get_logger(__name__)
+#     log.info("event.created", event_id=event_id, date=date)
+#     log.debug("llm.response", sample=True, provider="gemini", response=text)
+#
+# Records go onto a bounded in-memory queue and are formatted and written by
+# a background thread, so a request never waits on stdout. When the queue is
+# full, records are dropped and counted; a worker never blocks on logging.
+#
+# - Levels come from LOG_LEVEL. Calls below it cost one isEnabledFor() check.
+# - `sample=<rate>` (or True for LOG_DEBUG_SAMPLE) keeps only that fraction
+#   of a high-volume event.
+# - Fields named like user text (message, prompt, response, title, ...) are
+#   logged as their length unless LOG_USER_TEXT is on.
+# - Every record made while serving a request carries its request id. The id
+#   comes from the X-Request-ID header or is generated, and is echoed in the
+#   response.
+
+SENSITIVE_FIELDS = frozenset({
+    'message', 'prompt', 'response', 'text', 'title', 'description', 'query',
+    'email', 'phone', 'password', 'events', 'history',
+})
+
+_REQUEST_ID_RE = re.compile(r'^[\w.-]{1,64}$')
+_BASE_LOGGER = "helpscout"
+
+_settings = {"user_text": False, "debug_sample": 0.01, "format": "json"}
+_state = {"listener": None, "dropped": 0, "pid": None}
+
+
+def _redact(key, value):
+    if _settings["user_text"] or key not in SENSITIVE_FIELDS or value is None:
+        return value
+    if isinstance(value, str):
+        return f"<{len(value)} chars>"
+    return "<redacted>"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            "pid": record.process,
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        sample_rate = getattr(record, "sample_rate", None)
+        if sample_rate:
+            entry["sample_rate"] = sample_rate
+        for key, value in getattr(record, "fields", {}).items():
+            entry[key] = _redact(key, value)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development."""
+
+    def format(self, record):
+        fields = " ".join(f"{k}={_redact(k, v)!r}" for k, v in getattr(record, "fields", {}).items())
+        request_id = getattr(record, "request_id", None)
+        line = (f"{datetime.fromtimestamp(record.created).strftime('%H:%M:%S.%f')[:-3]} "
+                f"{record.levelname:<7} {record.name} {record.getMessage()} {fields}".rstrip())
+        if request_id:
+            line += f" [{request_id}]"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _ContextFilter(logging.Filter):
+    """Stamps records with the current request id (runs on the calling thread)."""
+
+    def filter(self, record):
+        record.request_id = g.get("request_id") if has_request_context() else None
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records untouched and drops them when the queue is full."""
+
+    def prepare(self, record):
+        return record  # Formatting happens on the listener thread
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _state["dropped"] += 1
+
+
+class StructuredLogger:
+    """Thin wrapper over a stdlib logger taking an event name and key/value fields."""
+    __slots__ = ("_logger",)
+
+    def __init__(self, logger):
+        self._logger = logger
+
+    def _log(self, level, event, fields, exc_info=False):
+        if not self._logger.isEnabledFor(level):
+            return
+        sample = fields.pop("sample", None)
+        if sample is True:
+            sample = _settings["debug_sample"]
+        if sample is not None and random.random() >= sample:
+            return
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields, "sample_rate": sample})
+
+    def debug(self, event, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event, **fields):
+        """Logs at ERROR with the current exception's traceback."""
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def get_logger(name):
+    """Returns a StructuredLogger for a module (pass __name__)."""
+    return StructuredLogger(logging.getLogger(f"{_BASE_LOGGER}.{name}"))
+
+
+def dropped_count():
+    """Records dropped in this process because the queue was full."""
+    return _state["dropped"]
+
+
+def _formatter():
+    return TextFormatter() if _settings["format"] == "text" else JsonFormatter()
+
+
+def _reset_handlers(base, handler):
+    for old in list(base.handlers):
+        base.removeHandler(old)
+    handler.addFilter(_ContextFilter())
+    base.addHandler(handler)
+
+
+def _stop_listener():
+    listener = _state["listener"]
+    if listener is not None and _state["pid"] == os.getpid():
+        listener.stop()  # Drains the queue
+    _state["listener"] = None
+
+
+def init_logging(config=Config):
+    """
+    Per-process setup: a bounded queue in front of a stdout handler, drained
+    by a listener thread. Safe to call again after fork().
+    """
+    _settings.update(
+        user_text=config.LOG_USER_TEXT,
+        debug_sample=config.LOG_DEBUG_SAMPLE,
+        format=config.LOG_FORMAT,
+    )
+    if _state["pid"] == os.getpid():
+        _stop_listener()
+    _state["listener"] = None  # An inherited listener thread did not survive fork()
+
+    base = logging.getLogger(_BASE_LOGGER)
+    base.setLevel(getattr(logging, config.LOG_LEVEL.upper(), logging.INFO))
+    base.propagate = False
+
+    records = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(_formatter())
+    _reset_handlers(base, _NonBlockingQueueHandler(records))
+
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=False)
+    listener.start()
+    _state.update(listener=listener, pid=os.getpid(), dropped=0)
+
+
+atexit.register(_stop_listener)
+
+
+def _init_default():
+    """Synchronous stderr output until init_logging() runs (CLIs, benchmarks)."""
+    base = logging.getLogger(_BASE_LOGGER)
+    if base.handlers:
+        return
+    base.setLevel(logging.INFO)
+    base.propagate = False
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(TextFormatter())
+    _reset_handlers(base, handler)
+
+
+_init_default()
+
+
+# --- Request Ids ---
+def _assign_request_id():
+    incoming = request.headers.get("X-Request-ID", "")
+    g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex[:16]
+
+
+def _echo_request_id(response):
+    request_id = g.get("request_id")
+    if request_id:
+        response.headers["X-Request-ID"] = request_id
+    return response
+
+
+def register_request_ids(app):
+    """Assigns every request an id that log records and the response carry."""
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
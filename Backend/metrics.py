@@ -0,0 +1,328 @@
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Blueprint, Response, g, request
+from config import Config
+import database
+import event_cache
+import replicas
+from logs import get_logger
+
+metrics_bp = Blueprint('metrics', __name__)
+log = get_logger(__name__)
+
+# --- Metrics ---
+# A small in-process registry of counters and histograms, rendered at
+# /metrics in the Prometheus text format. Recording is a dict lookup and an
+# add under one lock, so it is cheap enough for every request and query.
+#
+# Gunicorn runs several workers, and a scrape only reaches one of them. When
+# METRICS_DIR is set, each worker writes a snapshot there every
+# METRICS_FLUSH_INTERVAL seconds and /metrics adds up all snapshots.
+# Counters from workers that have exited are kept so totals never go down.
+# Gauges come from live workers only: pool usage per worker with a `pid`
+# label, replica lag as the worst any worker measured, the upcoming-events
+# cache's size per worker.
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+BATCH_SIZE_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+
+# Position of each provider in the Gemini -> Cohere -> Groq fallback chain
+LLM_FALLBACK_ORDER = {'gemini': 0, 'cohere': 1, 'groq': 2}
+
+_lock = threading.Lock()
+_registry = {}
+_settings = {"dir": None, "interval": 5, "token": None}
+_flusher = None
+
+
+class _Metric:
+    def __init__(self, name, help_text, kind, label_names, buckets=None):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = label_names
+        self.buckets = buckets
+        self.values = {}
+        _registry[name] = self
+
+
+class Counter(_Metric):
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, 'counter', label_names)
+
+    def inc(self, labels=(), amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Histogram(_Metric):
+    def __init__(self, name, help_text, label_names=(), buckets=HTTP_BUCKETS):
+        super().__init__(name, help_text, 'histogram', label_names, buckets)
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            state = self.values.get(labels)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), then sum
+                state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requests by route and status.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Request latency by route.", ("method", "route"))
+HTTP_DB_QUERIES = Counter("http_request_db_queries_total", "Database statements issued while serving each route.", ("route",))
+HTTP_DB_SECONDS = Counter("http_request_db_seconds_total", "Time spent in database statements per route.", ("route",))
+QUERIES_PER_REQUEST = Histogram("http_request_db_queries", "Database statements per request.", (), QUERY_COUNT_BUCKETS)
+DB_LATENCY = Histogram("db_query_duration_seconds", "Database statement latency by statement type.", ("operation",), DB_BUCKETS)
+DB_POOL_EVENTS = Counter("db_pool_events_total", "Pool exhaustion and direct-connection fallbacks.", ("event",))
+DB_READ_ROUTES = Counter("db_read_routes_total", "Read-only connections by target (replica or primary and why).", ("route",))
+LLM_REQUESTS = Counter("llm_requests_total", "LLM provider calls by outcome.", ("provider", "outcome"))
+LLM_LATENCY = Histogram("llm_request_duration_seconds", "LLM provider call latency.", ("provider",), LLM_BUCKETS)
+LLM_FALLBACK = Counter("llm_fallback_depth_total", "Successful LLM answers by fallback depth (0 = Gemini).", ("depth",))
+LLM_BATCH_SIZE = Histogram("llm_batch_size", "Requests answered by one batched LLM call (ai_batch.py).", ("operation",), BATCH_SIZE_BUCKETS)
+LLM_BATCH_MISSES = Counter("llm_batch_misses_total", "Batched requests that fell back to their own call.", ("operation",))
+UPCOMING_CACHE_LOOKUPS = Counter("upcoming_cache_lookups_total", "Upcoming-events cache lookups (event_cache.py) by result.", ("result",))
+UPCOMING_CACHE_EVICTIONS = Counter("upcoming_cache_evictions_total", "Upcoming-events cache entries evicted to stay under UPCOMING_CACHE_MAX_BYTES.")
+
+
+# --- Recording ---
+def _route_label():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db = [0, 0.0]
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    route = _route_label()
+    HTTP_REQUESTS.inc((request.method, route, str(response.status_code)))
+    HTTP_LATENCY.observe((request.method, route), time.perf_counter() - started)
+    queries, seconds = g.pop('metrics_db', (0, 0.0))
+    QUERIES_PER_REQUEST.observe((), queries)
+    if queries:
+        HTTP_DB_QUERIES.inc((route,), queries)
+        HTTP_DB_SECONDS.inc((route,), seconds)
+    return response
+
+
+def _observe_query(statement, seconds, params=None):
+    operation = statement.lstrip()[:6].upper() if isinstance(statement, str) else "OTHER"
+    if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        operation = "OTHER"
+    DB_LATENCY.observe((operation,), seconds)
+    try:
+        per_request = g.get('metrics_db')
+    except RuntimeError:
+        return  # Outside a request (background threads, CLI)
+    if per_request is not None:
+        per_request[0] += 1
+        per_request[1] += seconds
+
+
+def record_llm_call(provider, seconds, ok, depth=None):
+    """Records one provider call. `depth` overrides the provider's position in the fallback chain."""
+    LLM_REQUESTS.inc((provider, "success" if ok else "failure"))
+    LLM_LATENCY.observe((provider,), seconds)
+    if ok:
+        LLM_FALLBACK.inc((str(LLM_FALLBACK_ORDER.get(provider, 0) if depth is None else depth),))
+
+
+def record_llm_batch(operation, size, missed):
+    """Records one batched call answering `size` requests, `missed` of which must ask again."""
+    LLM_BATCH_SIZE.observe((operation,), size)
+    if missed:
+        LLM_BATCH_MISSES.inc((operation,), missed)
+
+
+# --- Snapshots and Rendering ---
+def _snapshot():
+    """This process's metric values plus current gauges, in a JSON-friendly form."""
+    cache = event_cache.upcoming_cache.stats()
+    with _lock:
+        UPCOMING_CACHE_LOOKUPS.values[("hit",)] = cache["hits"]
+        UPCOMING_CACHE_LOOKUPS.values[("miss",)] = cache["misses"]
+        UPCOMING_CACHE_EVICTIONS.values[()] = cache["evictions"]
+        DB_POOL_EVENTS.values[("exhausted",)] = database.pool_counters["exhausted"]
+        DB_POOL_EVENTS.values[("direct",)] = database.pool_counters["direct"]
+        if replicas.replica_stats():
+            for route, count in replicas.read_counters.items():
+                DB_READ_ROUTES.values[(route,)] = count
+        metrics = {name: {"\x1f".join(labels): (list(value) if isinstance(value, list) else value)
+                          for labels, value in metric.values.items()}
+                   for name, metric in _registry.items()}
+    return {"pid": os.getpid(), "metrics": metrics, "pool": database.pool_stats(),
+            "replicas": replicas.replica_stats(),
+            "upcoming_cache": {"entries": cache["entries"], "bytes": cache["bytes"]}}
+
+
+def flush():
+    """Writes this worker's snapshot to METRICS_DIR (atomic rename)."""
+    directory = _settings["dir"]
+    if not directory:
+        return
+    path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(_snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _collect():
+    """Merges snapshots from all workers (or just this one without METRICS_DIR)."""
+    snapshots = [_snapshot()]
+    if _settings["dir"]:
+        flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(_settings["dir"], "metrics-*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Being replaced right now; the next scrape sees it
+
+    merged = {name: {} for name in _registry}
+    pools, caches = [], []
+    lags = {}
+    for snapshot in snapshots:
+        for name, values in snapshot["metrics"].items():
+            if name not in merged:
+                continue
+            target = merged[name]
+            for labels, value in values.items():
+                if isinstance(value, list):
+                    current = target.setdefault(labels, [0] * len(value))
+                    target[labels] = [a + b for a, b in zip(current, value)]
+                else:
+                    target[labels] = target.get(labels, 0) + value
+        if len(snapshots) > 1 and not _pid_alive(snapshot["pid"]):
+            continue
+        if snapshot.get("pool"):
+            pools.append((snapshot["pid"], snapshot["pool"]))
+        if snapshot.get("upcoming_cache"):
+            caches.append((snapshot["pid"], snapshot["upcoming_cache"]))
+        for replica in snapshot.get("replicas") or ():
+            # Workers measure independently; report the worst
+            known = lags.get(replica["name"], -1.0)
+            lags[replica["name"]] = None if replica["lag"] is None or known is None else max(known, replica["lag"])
+    return merged, pools, lags, caches
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render():
+    """Prometheus text exposition of all metrics."""
+    merged, pools, lags, caches = _collect()
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(merged[name].items()):
+            labels = tuple(key.split("\x1f")) if metric.label_names else ()
+            if metric.kind == 'counter':
+                lines.append(f"{name}{_format_labels(metric.label_names, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric.buckets) + ["+Inf"], value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(metric.label_names, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(metric.label_names, labels)} {value[-1]}")
+            lines.append(f"{name}_count{_format_labels(metric.label_names, labels)} {cumulative}")
+
+    lines.append("# HELP db_pool_size Connections in each worker's pool.")
+    lines.append("# TYPE db_pool_size gauge")
+    lines.extend(f'db_pool_size{{pid="{pid}"}} {pool["size"]}' for pid, pool in pools)
+    lines.append("# HELP db_pool_in_use Pooled connections currently checked out.")
+    lines.append("# TYPE db_pool_in_use gauge")
+    lines.extend(f'db_pool_in_use{{pid="{pid}"}} {pool["size"] - pool["idle"]}' for pid, pool in pools)
+    lines.append("# HELP upcoming_cache_bytes Approximate memory held by each worker's upcoming-events cache.")
+    lines.append("# TYPE upcoming_cache_bytes gauge")
+    lines.extend(f'upcoming_cache_bytes{{pid="{pid}"}} {cache["bytes"]}' for pid, cache in caches)
+    lines.append("# HELP upcoming_cache_entries Users with an entry in each worker's upcoming-events cache.")
+    lines.append("# TYPE upcoming_cache_entries gauge")
+    lines.extend(f'upcoming_cache_entries{{pid="{pid}"}} {cache["entries"]}' for pid, cache in caches)
+    if lags:
+        lines.append("# HELP db_replica_lag_seconds Replication lag measured by the heartbeat (NaN = unreachable).")
+        lines.append("# TYPE db_replica_lag_seconds gauge")
+        lines.extend(f'db_replica_lag_seconds{{replica="{_escape(name)}"}} {"NaN" if lag is None else round(lag, 3)}'
+                     for name, lag in sorted(lags.items()))
+    return "\n".join(lines) + "\n"
+
+
+def _flush_loop():
+    while True:
+        time.sleep(_settings["interval"])
+        try:
+            flush()
+        except OSError as e:
+            log.warning("metrics.flush_failed", error=str(e))
+
+
+# --- Setup ---
+def register_metrics(app):
+    """Installs the request hooks on `app`."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def init_metrics(config=Config):
+    """Per-worker setup: query observer and, with METRICS_DIR, the snapshot thread."""
+    global _flusher
+    _settings.update(dir=config.METRICS_DIR or None, interval=config.METRICS_FLUSH_INTERVAL,
+                     token=config.METRICS_TOKEN or None)
+    if _observe_query not in database._query_observers:
+        database.on_query(_observe_query)
+    if _settings["dir"]:
+        os.makedirs(_settings["dir"], exist_ok=True)
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+            _flusher.start()
+
+
+def clear_metrics_dir(config=Config):
+    """Removes old worker snapshots; run once in the master before forking."""
+    if not config.METRICS_DIR:
+        return
+    for path in glob.glob(os.path.join(config.METRICS_DIR or "", "metrics-*.json*")):
+        os.remove(path)
+
+
+@metrics_bp.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint. Requires `Authorization: Bearer <METRICS_TOKEN>` when a token is set."""
+    if _settings["token"] and request.headers.get("Authorization") != f"Bearer {_settings['token']}":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
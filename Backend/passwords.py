@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from bcrypt import hashpw, gensalt, checkpw
+from config import Config
+
+# --- Password Hashing Off the Request Threads ---
+# bcrypt is deliberately CPU-heavy. Running it inline lets a burst of logins
+# pin every request thread, so hashes run in a small process pool instead.
+# A semaphore bounds how many hashes may be queued; callers that cannot get
+# a slot in time get HashingOverloaded and should answer 503.
+
+
+class HashingOverloaded(Exception):
+    """Raised when too many password hashes are already in flight."""
+
+
+_settings = {
+    "rounds": Config.BCRYPT_ROUNDS,
+    "workers": Config.PASSWORD_HASH_WORKERS,
+    "queue": Config.PASSWORD_HASH_QUEUE,
+    "wait": Config.PASSWORD_HASH_WAIT,
+}
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(_settings["queue"])
+
+
+def _hash_in_worker(password, rounds):
+    return hashpw(password, gensalt(rounds))
+
+
+def _check_in_worker(password, hashed):
+    return checkpw(password, hashed)
+
+
+def init_hashing(config=Config):
+    """Applies hashing settings and discards any pool from a parent process."""
+    global _slots
+    _settings.update(
+        rounds=config.BCRYPT_ROUNDS,
+        workers=config.PASSWORD_HASH_WORKERS,
+        queue=config.PASSWORD_HASH_QUEUE,
+        wait=config.PASSWORD_HASH_WAIT,
+    )
+    _slots = threading.BoundedSemaphore(max(1, _settings["queue"]))
+    reset_hashing()
+
+
+def reset_hashing():
+    """Forgets the process pool; the inherited one is unusable after fork()."""
+    global _executor, _executor_pid
+    _executor = None
+    _executor_pid = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_hashing)
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    if _settings["workers"] <= 0:
+        return None
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                # spawn, not fork: forking a multi-threaded web worker is unsafe
+                _executor = ProcessPoolExecutor(
+                    max_workers=_settings["workers"],
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=_settings["wait"]):
+        raise HashingOverloaded("Password hashing is at capacity")
+    try:
+        executor = _get_executor()
+        if executor is None:
+            return fn(*args)
+        return executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    """Returns the bcrypt hash of `password` (str) as a str."""
+    hashed = _run(_hash_in_worker, password.encode('utf-8'), _settings["rounds"])
+    return hashed.decode('utf-8')
+
+
+def verify_password(password, hashed):
+    """Checks `password` against a stored bcrypt hash (both str)."""
+    return _run(_check_in_worker, password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def get_cost(hashed):
+    """Returns the cost factor encoded in a bcrypt hash like '$2b$12$...'."""
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    """True when a stored hash was made with a different cost than configured."""
+    return get_cost(hashed) != _settings["rounds"]
@@ -0,0 +1,75 @@
+from flask import request, jsonify
+
+# --- Task List Payloads ---
+# Task endpoints accept two optional query parameters:
+#   fields=id,title,date   only these columns are selected from the database
+#   format=columnar        one array per field instead of one object per row
+#
+# Columnar responses look like:
+#   {"format": "columnar", "count": 3, "fields": ["id", "category"],
+#    "columns": {"id": [1, 2, 3],
+#                "category": {"values": ["work", "home"], "codes": [0, 1, 0]}}}
+# Low-cardinality fields (categories, dates, ...) are dictionary-encoded:
+# row i's value is values[codes[i]].
+
+TASK_COLUMNS = {
+    'id': 'e.id',
+    'user_id': 'e.user_id',
+    'title': 'e.title',
+    'description': 'e.description',
+    'category': 'e.Category',
+    'date': 'e.date',
+    'time': 'e.time',
+    'done': 'e.done',
+    'reminder_setting': 'e.reminder_setting',
+    'reminder_datetime': 'e.reminder_datetime',
+}
+
+# What the frontends actually read; internal reminder columns are opt-in
+DEFAULT_TASK_FIELDS = ['id', 'title', 'description', 'category', 'date', 'time', 'done', 'reminder_setting']
+
+DICTIONARY_FIELDS = {'category', 'date', 'time', 'reminder_setting', 'user_id', 'assignee_name', 'assigner_email'}
+
+
+def select_task_fields(extra_columns=None):
+    """
+    Resolves ?fields= against the allowed columns. Returns (fields, select_sql)
+    where select_sql is ready to drop into a SELECT list. `extra_columns` maps
+    endpoint-specific field names to SQL expressions and is included by default.
+    Raises ValueError for unknown fields.
+    """
+    extra_columns = extra_columns or {}
+    columns = {**TASK_COLUMNS, **extra_columns}
+
+    requested = request.args.get('fields')
+    if requested:
+        fields = list(dict.fromkeys(f.strip() for f in requested.split(',') if f.strip()))
+        unknown = [f for f in fields if f not in columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    else:
+        fields = DEFAULT_TASK_FIELDS + list(extra_columns)
+
+    select_sql = ", ".join(f"{columns[f]} AS {f}" for f in fields)
+    return fields, select_sql
+
+
+def encode_columnar(rows, fields):
+    """Transposes tuple rows into per-field arrays, dictionary-encoding where useful."""
+    columns = {}
+    transposed = list(zip(*rows)) if rows else [() for _ in fields]
+    for field, values in zip(fields, transposed):
+        if field in DICTIONARY_FIELDS:
+            lookup = {}
+            codes = [lookup.setdefault(value, len(lookup)) for value in values]
+            columns[field] = {'values': list(lookup), 'codes': codes}
+        else:
+            columns[field] = list(values)
+    return {'format': 'columnar', 'count': len(rows), 'fields': fields, 'columns': columns}
+
+
+def task_list_response(rows, fields):
+    """Serialises tuple rows from a task query in the requested format."""
+    if request.args.get('format') == 'columnar':
+        return jsonify(encode_columnar(rows, fields))
+    return jsonify([dict(zip(fields, row)) for row in rows])
@@ -0,0 +1,214 @@
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+import re
+import pytz
+from config import Config
+from free_slots import MAX_DAYS, busy_intervals, sweep, parse_hhmm, format_minutes
+from logs import get_logger
+
+IST = pytz.timezone('Asia/Kolkata')
+
+log = get_logger(__name__)
+
+# --- Task Placement ---
+# Generated tasks used to keep the LLM's guessed time ("09:00", "07:00" for
+# workouts) whatever the calendar held. place_tasks() fits them into the
+# user's free time instead, in one pass over the plan:
+#
+# 1. The user's busy intervals (free_slots.busy_intervals) become, per day, a
+#    FreeIndex: the free gaps as two sorted lists of starts and ends.
+# 2. Tasks whose time the user stated ("dentist at 3pm", `fixed`) keep it and
+#    are reserved first; one that overlaps something is marked `conflict`.
+# 3. Every other task, in date and time order, takes the free start closest
+#    to its requested time inside its window (morning, afternoon, evening or
+#    any), found by bisecting to the requested time and walking outwards.
+#    If its window is full it may use any time of that day, then the next
+#    days, up to TASK_PLACEMENT_DAYS later. Placing it splits the gap, so
+#    later tasks of the same plan avoid it too.
+#
+# A task that finds no room keeps its time and is marked `conflict`. A moved
+# task carries its `requested_date` and `requested_time`.
+
+WINDOWS = {
+    'morning': (6 * 60, 12 * 60),
+    'afternoon': (12 * 60, 17 * 60),
+    'evening': (17 * 60, 22 * 60),
+    'any': (7 * 60, 22 * 60),
+}
+MIN_MINUTES, MAX_MINUTES = 5, 12 * 60
+STEP_MINUTES = 5  # Today's placements start on this grid after the current time
+
+EXPLICIT_TIME = re.compile(r'\b\d{1,2}(:\d{2})?\s*(am|pm)\b|\b\d{1,2}[:.]\d{2}\b|\bnoon\b|\bmidnight\b',
+                           re.IGNORECASE)
+
+
+class FreeIndex:
+    """A user's free time per day, as sorted disjoint gaps in minutes after midnight."""
+
+    def __init__(self, busy, now):
+        self._busy = busy
+        self._today = now.date().isoformat()
+        minutes = now.hour * 60 + now.minute + (1 if now.second else 0)
+        self._today_floor = -(-minutes // STEP_MINUTES) * STEP_MINUTES
+        self._days = {}
+
+    def _gaps(self, day):
+        gaps = self._days.get(day)
+        if gaps is None:
+            floor = 0 if day > self._today else self._today_floor if day == self._today else 24 * 60
+            pairs = sweep(self._busy.get(day, ()), floor, 24 * 60, 1)
+            gaps = self._days[day] = ([s for s, _ in pairs], [e for _, e in pairs])
+        return gaps
+
+    def is_free(self, day, start, end):
+        starts, ends = self._gaps(day)
+        i = bisect_right(starts, start) - 1
+        return i >= 0 and ends[i] >= end
+
+    def reserve(self, day, start, end):
+        """Takes [start, end) out of the free time of `day` (whatever part of it is free)."""
+        starts, ends = self._gaps(day)
+        i = j = bisect_right(ends, start)
+        kept_starts, kept_ends = [], []
+        while j < len(starts) and starts[j] < end:
+            if starts[j] < start:
+                kept_starts.append(starts[j])
+                kept_ends.append(start)
+            if ends[j] > end:
+                kept_starts.append(end)
+                kept_ends.append(ends[j])
+            j += 1
+        starts[i:j] = kept_starts
+        ends[i:j] = kept_ends
+
+    def nearest(self, day, preferred, minutes, window):
+        """The free start closest to `preferred` for `minutes` inside `window`, or None."""
+        starts, ends = self._gaps(day)
+        window_start, window_end = window
+        if window_end - minutes < window_start:
+            return None
+        preferred = min(max(preferred, window_start), window_end - minutes)
+
+        def closest(j):
+            """The start in gap j closest to `preferred`, or None if the task doesn't fit in it."""
+            lowest, highest = max(starts[j], window_start), min(ends[j], window_end) - minutes
+            return min(max(preferred, lowest), highest) if highest >= lowest else None
+
+        # Gaps before i end at or before the preferred time, gaps after it
+        # start after it; gap i itself may offer a start on either side
+        i = bisect_right(ends, preferred)
+        earlier = None
+        for j in range(min(i, len(starts) - 1), -1, -1):
+            if ends[j] <= window_start:
+                break
+            candidate = closest(j)
+            if candidate is not None and candidate <= preferred:
+                earlier = candidate
+                break
+
+        for j in range(i, len(starts)):
+            if starts[j] >= window_end or (earlier is not None and starts[j] - preferred >= preferred - earlier):
+                break
+            candidate = closest(j)
+            if candidate is not None and candidate >= preferred:
+                if earlier is None or candidate - preferred < preferred - earlier:
+                    return candidate
+                break
+        return earlier
+
+
+def _minutes(task):
+    try:
+        minutes = int(task.get('duration_minutes') or Config.EVENT_DURATION_MINUTES)
+    except (TypeError, ValueError):
+        minutes = Config.EVENT_DURATION_MINUTES
+    return min(max(minutes, MIN_MINUTES), MAX_MINUTES)
+
+
+def _window(task, start):
+    window = str(task.get('window') or '').lower()
+    if window in WINDOWS:
+        return window
+    return 'morning' if start < 12 * 60 else 'afternoon' if start < 17 * 60 else 'evening'
+
+
+def place(tasks, busy, now, stated_time=False, search_days=None):
+    """
+    Fits `tasks` (dicts with date and time) into the free time left by
+    `busy` ({'YYYY-MM-DD': [(start, end), ...]}), in place. `stated_time` is
+    the default for tasks without a `fixed` flag. Returns `tasks`.
+    """
+    search_days = Config.TASK_PLACEMENT_DAYS if search_days is None else search_days
+    index = FreeIndex(busy, now)
+    today = now.date()
+    flexible = []
+    for task in tasks:
+        start = parse_hhmm(task.get('time'))
+        try:
+            day = date.fromisoformat(str(task.get('date')))
+        except ValueError:
+            continue
+        if start is None or start >= 24 * 60:
+            continue
+        minutes = _minutes(task)
+        task['duration_minutes'] = minutes
+        task['window'] = _window(task, start)
+        task['fixed'] = task['fixed'] if isinstance(task.get('fixed'), bool) else stated_time
+        if task['fixed']:
+            end = min(start + minutes, 24 * 60)
+            if day >= today and not index.is_free(day.isoformat(), start, end):
+                task['conflict'] = True
+            index.reserve(day.isoformat(), start, end)
+        else:
+            flexible.append((day, start, minutes, task))
+
+    flexible.sort(key=lambda item: (item[0], item[1], -item[2]))
+    for day, start, minutes, task in flexible:
+        window = WINDOWS[task['window']]
+        first = max(day, today)
+        found = None
+        for offset in range(search_days + 1):
+            candidate_day = (first + timedelta(days=offset)).isoformat()
+            for candidate_window in (window, WINDOWS['any']) if window != WINDOWS['any'] else (window,):
+                candidate = index.nearest(candidate_day, start, minutes, candidate_window)
+                if candidate is not None:
+                    found = candidate_day, candidate
+                    break
+            if found:
+                break
+        if found is None:
+            task['conflict'] = True
+            continue
+        found_day, found_start = found
+        index.reserve(found_day, found_start, found_start + minutes)
+        if (found_day, found_start) != (day.isoformat(), start):
+            task['requested_date'], task['requested_time'] = task['date'], task['time']
+            task['date'], task['time'] = found_day, format_minutes(found_start)
+    return tasks
+
+
+def place_tasks(user_id, tasks, user_input=''):
+    """
+    Fits generated tasks into `user_id`'s schedule (see place()). Whether
+    `user_input` names a time decides which tasks without a `fixed` flag
+    stay put. Leaves the tasks as they are if the schedule can't be read.
+    """
+    if Config.TASK_PLACEMENT_DAYS < 0 or not tasks:
+        return tasks
+    now = datetime.now(IST)
+    dates = []
+    for task in tasks:
+        try:
+            dates.append(date.fromisoformat(str(task.get('date'))))
+        except ValueError:
+            pass
+    if not dates:
+        return tasks
+    first = max(min(dates), now.date())
+    last = min(max(max(dates), first) + timedelta(days=Config.TASK_PLACEMENT_DAYS),
+               first + timedelta(days=MAX_DAYS - 1))
+    busy = busy_intervals(user_id, first.isoformat(), last.isoformat())
+    if busy is None:
+        log.warning("placement.schedule_unavailable", user_id=user_id)
+        return tasks
+    return place(tasks, busy, now, stated_time=bool(EXPLICIT_TIME.search(user_input or '')))
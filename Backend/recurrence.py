@@ -0,0 +1,373 @@
+from calendar import monthrange
+from datetime import datetime, date, timedelta
+from flask import Blueprint, request, jsonify, session
+from mysql.connector import Error
+from shards import get_shard_connection, get_shard_read_connection
+from logs import get_logger
+from versioning import bump_data_version
+
+recurrence_bp = Blueprint('recurrence', __name__)
+log = get_logger(__name__)
+
+# --- Recurring Events ---
+# A habit like "gym every weekday at 7am" is stored once in recurring_events
+# and expanded only for the window a reader asks for. Completion, cancellation
+# and edits of single occurrences live in recurring_event_overrides, one row
+# per touched occurrence.
+#
+# Recurrence spec accepted by the API (and by AI extraction):
+#   {"freq": "daily" | "weekly" | "monthly", "interval": 1,
+#    "weekdays": ["mon", "wed"], "until": "YYYY-MM-DD"}
+# weekdays only applies to weekly rules and defaults to the start date's day;
+# monthly rules repeat on the start date's day of month (skipping short months).
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+WEEKDAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+RULE_COLUMNS = "id, title, description, Category, time, reminder_setting, freq, interval_n, weekdays, start_date, until_date"
+
+
+def _to_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if isinstance(value, str) else value
+
+
+def parse_recurrence(spec, start_date):
+    """
+    Validates a recurrence spec and returns the rule columns
+    (freq, interval_n, weekdays, until_date). Raises ValueError.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("recurrence must be an object")
+    freq = str(spec.get('freq', '')).lower()
+    if freq not in FREQUENCIES:
+        raise ValueError(f"freq must be one of {', '.join(FREQUENCIES)}")
+    interval = int(spec.get('interval', 1))
+    if not 1 <= interval <= 365:
+        raise ValueError("interval must be between 1 and 365")
+
+    start = _to_date(start_date)
+    weekdays = 0
+    if freq == 'weekly':
+        names = spec.get('weekdays') or [WEEKDAY_NAMES[start.weekday()]]
+        for name in names:
+            key = str(name).lower()[:3]
+            if key not in WEEKDAY_NAMES:
+                raise ValueError(f"Unknown weekday: {name}")
+            weekdays |= 1 << WEEKDAY_NAMES.index(key)
+
+    until = spec.get('until')
+    if until:
+        if _to_date(until) < start:
+            raise ValueError("until must not be before the start date")
+        until = _to_date(until).isoformat()
+    return freq, interval, weekdays, until
+
+
+def expand_rule(freq, interval, weekdays, start_date, until_date, window_start, window_end):
+    """
+    Yields the occurrence dates of a rule inside [window_start, window_end].
+    Jumps straight to the first occurrence in the window, so the cost depends
+    on the number of occurrences returned, not on how old the rule is.
+    """
+    rule_start = _to_date(start_date)
+    first = max(rule_start, _to_date(window_start))
+    last = _to_date(window_end)
+    if until_date:
+        last = min(last, _to_date(until_date))
+    if first > last:
+        return
+
+    if freq == 'daily':
+        offset = (first - rule_start).days
+        offset += (-offset) % interval
+        current = rule_start + timedelta(days=offset)
+        step = timedelta(days=interval)
+        while current <= last:
+            yield current
+            current += step
+
+    elif freq == 'weekly':
+        days = [i for i in range(7) if weekdays & (1 << i)]
+        anchor = rule_start - timedelta(days=rule_start.weekday())  # Monday of the first week
+        week = (first - anchor).days // 7
+        week += (-week) % interval
+        while True:
+            monday = anchor + timedelta(weeks=week)
+            if monday > last:
+                return
+            for day in days:
+                current = monday + timedelta(days=day)
+                if first <= current <= last:
+                    yield current
+            week += interval
+
+    elif freq == 'monthly':
+        months = (first.year - rule_start.year) * 12 + first.month - rule_start.month
+        months += (-months) % interval
+        while True:
+            year, month = divmod(rule_start.month - 1 + months, 12)
+            year += rule_start.year
+            month += 1
+            if date(year, month, 1) > last:
+                return
+            if rule_start.day <= monthrange(year, month)[1]:
+                current = date(year, month, rule_start.day)
+                if first <= current <= last:
+                    yield current
+            months += interval
+
+
+def get_occurrences(user_id, window_start, window_end, include_done=True, cursor=None):
+    """
+    Expands the user's recurring events over [window_start, window_end]
+    ('YYYY-MM-DD' strings, inclusive) and applies overrides. Returns dicts
+    shaped like event rows, ordered by date and time. Pass `cursor` to reuse
+    an open connection. Returns [] if the database is unavailable.
+    """
+    own_conn = None
+    if cursor is None:
+        own_conn = get_shard_connection(user_id, write=False)
+        if not own_conn:
+            return []
+        cursor = own_conn.cursor()
+    try:
+        cursor.execute(
+            f"SELECT {RULE_COLUMNS} FROM recurring_events "
+            "WHERE user_id = %s AND start_date <= %s AND (until_date IS NULL OR until_date >= %s)",
+            (user_id, window_end, window_start)
+        )
+        rules = [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in cursor.fetchall()]
+        if not rules:
+            return []
+
+        placeholders = ", ".join(["%s"] * len(rules))
+        cursor.execute(
+            f"SELECT recurring_id, occurrence_date, done, cancelled, title, time FROM recurring_event_overrides "
+            f"WHERE recurring_id IN ({placeholders}) AND occurrence_date BETWEEN %s AND %s",
+            (*[rule[0] for rule in rules], window_start, window_end)
+        )
+        overrides = {}
+        for row in cursor.fetchall():
+            row = tuple(row.values()) if isinstance(row, dict) else tuple(row)
+            overrides[(row[0], row[1])] = row
+
+        occurrences = []
+        for rule_id, title, description, category, event_time, reminder_setting, freq, interval, weekdays, start_date, until_date in rules:
+            for day in expand_rule(freq, interval, weekdays, start_date, until_date, window_start, window_end):
+                day_str = day.isoformat()
+                done = False
+                occurrence_title, occurrence_time = title, event_time
+                override = overrides.get((rule_id, day_str))
+                if override:
+                    if override[3]:
+                        continue  # Cancelled
+                    done = bool(override[2])
+                    occurrence_title = override[4] or title
+                    occurrence_time = override[5] or event_time
+                if done and not include_done:
+                    continue
+                occurrences.append({
+                    'id': f"r{rule_id}:{day_str}",
+                    'recurring_id': rule_id,
+                    'title': occurrence_title,
+                    'description': description,
+                    'category': category,
+                    'date': day_str,
+                    'time': occurrence_time,
+                    'done': done,
+                    'reminder_setting': reminder_setting,
+                })
+        occurrences.sort(key=lambda o: (o['date'], o['time'] or ''))
+        return occurrences
+    except Error as e:
+        log.error("recurrence.expand_failed", user_id=user_id, error=str(e))
+        return []
+    finally:
+        if own_conn and own_conn.is_connected():
+            cursor.close()
+            own_conn.close()
+
+
+def month_bounds(year, month):
+    """Returns the first and last day of a month as 'YYYY-MM-DD' strings."""
+    year, month = int(year), int(month)
+    return f"{year}-{month:02d}-01", f"{year}-{month:02d}-{monthrange(year, month)[1]:02d}"
+
+
+def create_recurring_event(cursor, user_id, event_data, recurrence):
+    """
+    Inserts a recurring event rule using `cursor` (caller commits) and bumps
+    the user's data version. Returns the new rule id. Raises ValueError for
+    an invalid spec.
+    """
+    freq, interval, weekdays, until = parse_recurrence(recurrence, event_data['date'])
+    cursor.execute(
+        "INSERT INTO recurring_events (user_id, title, description, Category, time, reminder_setting, freq, interval_n, weekdays, start_date, until_date) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        (user_id, event_data['title'], event_data.get('description'), event_data.get('category'), event_data.get('time'),
+         event_data.get('reminder_setting'), freq, interval, weekdays, _to_date(event_data['date']).isoformat(), until)
+    )
+    rule_id = cursor.lastrowid
+    bump_data_version(cursor, user_id)
+    return rule_id
+
+
+# --- Recurring Event Endpoints ---
+@recurrence_bp.route("/api/tasks/recurring", methods=['POST'])
+def add_recurring_task():
+    """Creates a recurring task. Body: title, description, category, date (first day), time, reminder_setting, recurrence."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    user_id = session['user_id']
+    data = request.json
+    if not all([data.get('title'), data.get('date'), data.get('time'), data.get('recurrence')]):
+        return jsonify({"error": "title, date, time and recurrence are required"}), 400
+
+    conn = get_shard_connection(user_id)
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        rule_id = create_recurring_event(cursor, user_id, data, data['recurrence'])
+        conn.commit()
+        return jsonify({"message": "Recurring task added successfully!", "recurring_id": rule_id}), 201
+    except ValueError as e:
+        return jsonify({"error": f"Invalid recurrence: {e}"}), 400
+    except Error as e:
+        conn.rollback()
+        return jsonify({"error": f"Database error: {e}"}), 500
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+@recurrence_bp.route("/api/tasks/recurring", methods=['GET'])
+def list_recurring_tasks():
+    """Lists the user's recurrence rules (not expanded)."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    user_id = session['user_id']
+    conn = get_shard_read_connection(user_id)
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT id, title, description, Category AS category, time, reminder_setting, freq, interval_n AS `interval`, "
+            "weekdays, start_date, until_date FROM recurring_events WHERE user_id = %s ORDER BY start_date",
+            (user_id,)
+        )
+        rules = cursor.fetchall()
+        for rule in rules:
+            rule['weekdays'] = [name for i, name in enumerate(WEEKDAY_NAMES) if rule['weekdays'] & (1 << i)]
+        return jsonify(rules)
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+@recurrence_bp.route("/api/tasks/recurring/occurrences")
+def list_occurrences():
+    """Expands recurring tasks for ?start=YYYY-MM-DD&end=YYYY-MM-DD."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    start, end = request.args.get('start'), request.args.get('end')
+    try:
+        if (_to_date(end) - _to_date(start)).days > 366 * 5:
+            return jsonify({"error": "Range may span at most five years"}), 400
+    except (TypeError, ValueError):
+        return jsonify({"error": "start and end (YYYY-MM-DD) are required"}), 400
+    return jsonify(get_occurrences(session['user_id'], start, end))
+
+
+@recurrence_bp.route("/api/tasks/recurring/<int:recurring_id>", methods=['DELETE'])
+def delete_recurring_task(recurring_id):
+    """Deletes a rule and all of its overrides."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    user_id = session['user_id']
+    conn = get_shard_connection(user_id)
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM recurring_events WHERE id = %s AND user_id = %s", (recurring_id, user_id))
+        if cursor.rowcount == 0:
+            return jsonify({"error": "Recurring task not found."}), 404
+        bump_data_version(cursor, user_id)
+        conn.commit()
+        return jsonify({"message": "Recurring task deleted."}), 200
+    except Error as e:
+        conn.rollback()
+        return jsonify({"error": f"Database error: {e}"}), 500
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+@recurrence_bp.route("/api/tasks/recurring/<int:recurring_id>/occurrences/<occurrence_date>", methods=['POST'])
+def update_occurrence(recurring_id, occurrence_date):
+    """
+    Overrides a single occurrence. Body may contain done (bool),
+    cancelled (bool), title and time; fields left out keep their value.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    user_id = session['user_id']
+    data = request.json or {}
+    try:
+        day = _to_date(occurrence_date)
+    except ValueError:
+        return jsonify({"error": "Invalid occurrence date"}), 400
+
+    conn = get_shard_connection(user_id)
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {RULE_COLUMNS} FROM recurring_events WHERE id = %s AND user_id = %s", (recurring_id, user_id))
+        rule = cursor.fetchone()
+        if not rule:
+            return jsonify({"error": "Recurring task not found."}), 404
+        freq, interval, weekdays, start_date, until_date = rule[6:11]
+        if day not in expand_rule(freq, interval, weekdays, start_date, until_date, day, day):
+            return jsonify({"error": "The task does not occur on that date."}), 404
+
+        # Fields the client didn't send keep their current value
+        done = None if data.get('done') is None else bool(data['done'])
+        cancelled = None if data.get('cancelled') is None else bool(data['cancelled'])
+        cursor.execute(
+            "INSERT INTO recurring_event_overrides (recurring_id, occurrence_date, done, cancelled, title, time) "
+            "VALUES (%s, %s, COALESCE(%s, FALSE), COALESCE(%s, FALSE), %s, %s) "
+            "ON DUPLICATE KEY UPDATE done = COALESCE(%s, done), cancelled = COALESCE(%s, cancelled), "
+            "title = COALESCE(VALUES(title), title), time = COALESCE(VALUES(time), time)",
+            (recurring_id, day.isoformat(), done, cancelled, data.get('title'), data.get('time'), done, cancelled)
+        )
+        bump_data_version(cursor, user_id)
+        conn.commit()
+        return jsonify({"message": "Occurrence updated."}), 200
+    except Error as e:
+        conn.rollback()
+        return jsonify({"error": f"Database error: {e}"}), 500
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+def month_day_states(user_id, year, month, cursor=None):
+    """
+    Returns {day: [has_pending, has_completed]} for recurring occurrences in a
+    month, for merging into the month-view endpoints.
+    """
+    start, end = month_bounds(year, month)
+    states = {}
+    for occurrence in get_occurrences(user_id, start, end, cursor=cursor):
+        state = states.setdefault(int(occurrence['date'][8:]), [False, False])
+        state[1 if occurrence['done'] else 0] = True
+    return states
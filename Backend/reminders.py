@@ -0,0 +1,300 @@
+import heapq
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+import pytz
+from flask import Blueprint, Response, jsonify, session, stream_with_context
+from mysql.connector import Error
+from config import Config
+from shards import get_shard_connection, BucketMoving
+from logs import get_logger
+from versioning import on_data_version_bump
+
+# Configure IST timezone
+IST = pytz.timezone('Asia/Kolkata')
+
+reminders_bp = Blueprint('reminders', __name__)
+log = get_logger(__name__)
+
+# --- Reminder Push Hub ---
+# Each worker keeps, for every user with an open /api/stream/reminders
+# connection, a sorted queue of that user's upcoming reminder instants. One
+# dispatcher thread sleeps until the earliest instant across all users, then
+# pushes the notification to that user's connections. Connections only wait
+# on their own queue. asgi.py serves the stream from an event loop, where
+# thousands of idle streams cost a coroutine each, not a thread. The Flask
+# view below would hold a gthread worker's request thread per open tab, so it
+# answers 204 (which tells EventSource not to reconnect) unless
+# REMINDER_STREAM_WSGI is set. Pages then poll POST /api/reminders/due, which
+# claims and returns what is due, until the next page load.
+#
+# Delivery is claimed in the database (reminde1 = TRUE) before pushing, so a
+# reminder is sent once even if the user reconnects or has tabs on several
+# workers.
+
+
+def _parse_reminder(value):
+    """reminder_datetime is stored as an IST 'YYYY-MM-DD HH:MM:SS' string."""
+    if not value:
+        return None
+    try:
+        return IST.localize(datetime.strptime(str(value)[:19], '%Y-%m-%d %H:%M:%S')).timestamp()
+    except ValueError:
+        return None
+
+
+class ReminderHub:
+    def __init__(self, resync_interval, grace):
+        self.resync_interval = resync_interval
+        self.grace = grace
+        self._subscribers = {}   # user_id -> set of queue.Queue
+        self._schedules = {}     # user_id -> sorted list of (instant, event_id, payload)
+        self._generation = {}    # user_id -> int, bumped on every reload
+        self._heap = []          # (instant, user_id, generation)
+        self._dirty = set()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    # --- connection management ---
+    def subscribe(self, user_id, q=None):
+        """Registers a connection; reminders are handed to `q.put` (a new queue.Queue by default)."""
+        q = queue.Queue() if q is None else q
+        with self._cond:
+            first = user_id not in self._subscribers
+            self._subscribers.setdefault(user_id, set()).add(q)
+            if first:
+                self._dirty.add(user_id)
+            self._ensure_thread()
+            self._cond.notify()
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._cond:
+            queues = self._subscribers.get(user_id)
+            if queues is None:
+                return
+            queues.discard(q)
+            if not queues:
+                del self._subscribers[user_id]
+                self._schedules.pop(user_id, None)
+                self._generation.pop(user_id, None)
+                self._cond.notify()  # Lets the dispatcher exit when idle
+
+    def mark_dirty(self, user_ids):
+        """Reload these users' reminders soon (after the current write commits)."""
+        with self._cond:
+            dirty = [u for u in user_ids if u in self._subscribers]
+            if dirty:
+                self._dirty.update(dirty)
+                self._cond.notify()
+
+    def connection_count(self):
+        with self._cond:
+            return sum(len(queues) for queues in self._subscribers.values())
+
+    # --- dispatcher ---
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="reminder-dispatcher", daemon=True)
+            self._thread.start()
+
+    def _load(self, user_id):
+        now = time.time()
+        since = datetime.fromtimestamp(now - self.grace, IST).strftime('%Y-%m-%d %H:%M:%S')
+        conn = get_shard_connection(user_id, write=False)
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, title, date, time, reminder_setting, reminder_datetime FROM events "
+                "WHERE user_id = %s AND done = FALSE AND reminder_datetime >= %s "
+                "AND (reminde1 IS NULL OR reminde1 = FALSE) ORDER BY reminder_datetime LIMIT 500",
+                (user_id, since)
+            )
+            schedule = []
+            for event_id, title, date, event_time, reminder_setting, reminder_datetime in cursor.fetchall():
+                instant = _parse_reminder(reminder_datetime)
+                if instant is not None:
+                    payload = {'id': event_id, 'title': title, 'date': date, 'time': event_time, 'reminder_setting': reminder_setting}
+                    schedule.append((instant, event_id, payload))
+            schedule.sort(key=lambda item: item[0])
+            return schedule
+        except Error as e:
+            log.error("reminders.load_failed", user_id=user_id, error=str(e))
+            return None
+        finally:
+            if conn and conn.is_connected():
+                cursor.close()
+                conn.close()
+
+    def _claim(self, user_id, event_id):
+        """Marks the reminder as delivered; False if another worker already did."""
+        try:
+            conn = get_shard_connection(user_id)
+        except BucketMoving:
+            log.warning("reminders.claim_deferred", event_id=event_id)  # Picked up again by the next resync
+            return False
+        if not conn:
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE events SET reminde1 = TRUE WHERE id = %s AND (reminde1 IS NULL OR reminde1 = FALSE)", (event_id,))
+            conn.commit()
+            return cursor.rowcount == 1
+        except Error as e:
+            log.error("reminders.claim_failed", event_id=event_id, error=str(e))
+            return False
+        finally:
+            if conn and conn.is_connected():
+                cursor.close()
+                conn.close()
+
+    def _install(self, user_id, schedule):
+        with self._cond:
+            if user_id not in self._subscribers:
+                return
+            generation = self._generation.get(user_id, 0) + 1
+            self._generation[user_id] = generation
+            self._schedules[user_id] = schedule
+            if schedule:
+                heapq.heappush(self._heap, (schedule[0][0], user_id, generation))
+
+    def _pop_due(self, now):
+        """Returns [(user_id, event_id, payload)] that are due, keeping the heap consistent."""
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                _, user_id, generation = heapq.heappop(self._heap)
+                if self._generation.get(user_id) != generation:
+                    continue  # Stale entry from before a reload
+                schedule = self._schedules.get(user_id, [])
+                while schedule and schedule[0][0] <= now:
+                    instant, event_id, payload = schedule.pop(0)
+                    due.append((user_id, event_id, payload))
+                if schedule:
+                    heapq.heappush(self._heap, (schedule[0][0], user_id, generation))
+        return due
+
+    def _run(self):
+        last_resync = time.monotonic()
+        while True:
+            with self._cond:
+                if not self._subscribers:
+                    self._heap.clear()
+                    self._dirty.clear()
+                    self._thread = None
+                    return
+                if not self._dirty:
+                    wait = self.resync_interval - (time.monotonic() - last_resync)
+                    if self._heap:
+                        wait = min(wait, self._heap[0][0] - time.time())
+                    if wait > 0:
+                        self._cond.wait(timeout=wait)
+                if time.monotonic() - last_resync >= self.resync_interval:
+                    # Catch writes made through other workers
+                    self._dirty.update(self._subscribers)
+                    last_resync = time.monotonic()
+                dirty, self._dirty = self._dirty, set()
+
+            if dirty:
+                time.sleep(0.2)  # Let the write that marked us dirty commit
+            for user_id in dirty:
+                schedule = self._load(user_id)
+                if schedule is not None:
+                    self._install(user_id, schedule)
+
+            for user_id, event_id, payload in self._pop_due(time.time()):
+                if not self._claim(user_id, event_id):
+                    continue
+                with self._cond:
+                    queues = list(self._subscribers.get(user_id, ()))
+                for q in queues:
+                    q.put(payload)
+
+
+hub = ReminderHub(Config.REMINDER_RESYNC, Config.REMINDER_GRACE)
+
+
+def init_reminder_hub(config=Config):
+    """Starts each worker with a fresh hub; the parent's thread does not survive fork()."""
+    global hub
+    hub = ReminderHub(config.REMINDER_RESYNC, config.REMINDER_GRACE)
+
+
+# Reload a subscriber's reminders whenever their data changes in this worker
+on_data_version_bump(lambda user_ids: hub.mark_dirty(user_ids))
+
+
+STREAM_PREAMBLE = "retry: 5000\n\n"
+STREAM_KEEPALIVE = ": keep-alive\n\n"
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def reminder_message(payload):
+    return f"event: reminder\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+@reminders_bp.route("/api/stream/reminders")
+def stream_reminders():
+    """
+    Server-Sent Events stream of the logged-in user's reminders. Each message
+    is an `event: reminder` with the task as JSON, sent when it is due.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    user_id = session['user_id']
+    if not Config.REMINDER_STREAM_WSGI:
+        return '', 204  # Served by asgi.py
+
+    current_hub = hub
+    heartbeat = Config.REMINDER_HEARTBEAT
+
+    def events():
+        q = current_hub.subscribe(user_id)
+        try:
+            yield STREAM_PREAMBLE
+            while True:
+                try:
+                    payload = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield STREAM_KEEPALIVE
+                    continue
+                yield reminder_message(payload)
+        finally:
+            current_hub.unsubscribe(user_id, q)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers=STREAM_HEADERS
+    )
+
+
+@reminders_bp.route("/api/reminders/due", methods=["POST"])
+def claim_due_reminders():
+    """
+    Polling fallback for pages whose stream was refused: claims and returns
+    the logged-in user's due reminders, and in how many seconds the next one
+    is due (null if none is scheduled).
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    user_id = session['user_id']
+    current_hub = hub
+    schedule = current_hub._load(user_id)
+    if schedule is None:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    now = time.time()
+    due = [(event_id, payload) for instant, event_id, payload in schedule if instant <= now]
+    upcoming = [instant for instant, _, _ in schedule if instant > now]
+    body = {
+        "reminders": [payload for event_id, payload in due if current_hub._claim(user_id, event_id)],
+        "next_in": round(upcoming[0] - now, 1) if upcoming else None,
+    }
+    return Response(json.dumps(body, default=str), mimetype='application/json')
@@ -0,0 +1,250 @@
+import itertools
+import os
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+import mysql.connector
+from mysql.connector import Error, pooling
+from mysql.connector.errors import PoolError
+from flask import g, has_request_context, session
+from config import Config
+import database
+import sqlite_backend
+from logs import get_logger
+from versioning import on_data_version_bump
+
+log = get_logger(__name__)
+
+# --- Read Replicas ---
+# Read-only views call get_read_connection() instead of get_db_connection().
+# With DB_REPLICAS set it hands out a replica connection when that is safe,
+# otherwise the primary:
+#   - Lag: a per-worker thread writes a heartbeat row (the current time) to
+#     the primary every REPLICA_LAG_INTERVAL seconds and reads it back from
+#     each replica; the difference is the replica's lag. Replicas that are
+#     unreachable or more than REPLICA_MAX_LAG behind get no reads.
+#   - Read-your-writes: every write bumps the user's data version
+#     (versioning.py), which also stamps the session with the write time. A
+#     replica serves that session again only once its lag is smaller than
+#     the time since that write.
+#   - ETags: conditional_get() has already read the user's version from the
+#     primary. The replica must have reached that version too, so an ETag is
+#     never attached to an older body.
+# Writes, and everything that still calls get_db_connection(), stay on the
+# primary.
+
+SESSION_KEY = "db_last_write"
+HEARTBEAT_ID = 1
+
+_settings = {"max_lag": 5.0, "interval": 1.0, "pool_size": 8}
+_replicas = []
+_round_robin = itertools.count()
+_monitor = {"thread": None, "pid": None}
+# Reads by where they went: the replica, or the primary and why
+read_counters = {"replica": 0, "primary_pinned": 0, "primary_lagging": 0,
+                 "primary_stale": 0, "primary_unavailable": 0}
+
+
+class Replica:
+    """One replica DSN with a lazily opened per-process pool and its last measured lag."""
+    pool_prefix = "replica"
+
+    def __init__(self, dsn, index):
+        parts = urlsplit(dsn)
+        self.kind = parts.scheme.lower()
+        if self.kind == "sqlite":
+            self.path = unquote(parts.path[1:])  # sqlite:///relative.db, sqlite:////absolute.db
+            self.name = self.path
+        elif self.kind == "mysql":
+            self.settings = dict(database.DB_CONFIG)
+            self.settings.update({key: value for key, value in {
+                "host": parts.hostname,
+                "port": parts.port,
+                "user": unquote(parts.username) if parts.username else None,
+                "password": unquote(parts.password) if parts.password else None,
+                "database": parts.path.lstrip("/") or None,
+            }.items() if value is not None})
+            self.name = f"{parts.hostname}:{parts.port or 3306}"
+        else:
+            raise ValueError(f"Unsupported replica DSN scheme '{parts.scheme}' (use mysql:// or sqlite:///)")
+        self.index = index
+        self.lag = None  # Seconds; None until measured or while unreachable
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def _raw_connection(self, pooled=True):
+        if self.kind == "sqlite":
+            return sqlite_backend.connect(sqlite_backend.engine(self.path, _settings["pool_size"]))
+        if not pooled:
+            return mysql.connector.connect(**self.settings)
+        if self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool_pid != os.getpid():
+                    self._pool = pooling.MySQLConnectionPool(
+                        pool_name=f"{self.pool_prefix}{self.index}-{os.getpid()}",
+                        pool_size=min(_settings["pool_size"], pooling.CNX_POOL_MAXSIZE),
+                        pool_reset_session=True,
+                        **self.settings
+                    )
+                    self._pool_pid = os.getpid()
+        try:
+            return self._pool.get_connection()
+        except PoolError:
+            return mysql.connector.connect(**self.settings)
+
+    def connect(self, pooled=True):
+        """A connection to this replica, or None if it cannot be reached."""
+        try:
+            return database._wrap(self._raw_connection(pooled))
+        except Error as e:
+            log.warning("replica.connect_failed", replica=self.name, error=str(e))
+            self.lag = None
+            return None
+
+
+# --- Lag Monitor ---
+def _serving(replica):
+    return replica.lag is not None and replica.lag <= _settings["max_lag"]
+
+
+def _write_heartbeat(now):
+    conn = database.get_db_connection()
+    if not conn:
+        return False
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO replica_heartbeat (id, beat) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE beat = VALUES(beat)",
+            (HEARTBEAT_ID, now)
+        )
+        conn.commit()
+        return True
+    except Error as e:
+        log.warning("replica.heartbeat_failed", error=str(e))
+        return False
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+def _measure(replica):
+    conn = replica.connect()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT beat FROM replica_heartbeat WHERE id = %s", (HEARTBEAT_ID,))
+        row = cursor.fetchone()
+        lag = max(0.0, time.time() - float(row[0])) if row else None
+    except Error as e:
+        log.warning("replica.lag_check_failed", replica=replica.name, error=str(e))
+        lag = None
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+    was_serving = _serving(replica)
+    replica.lag = lag
+    if _serving(replica) != was_serving:
+        log.warning("replica.rotation_changed", replica=replica.name, serving=not was_serving, lag=lag)
+
+
+def check_lag():
+    """Writes a heartbeat to the primary and re-measures every replica's lag."""
+    if _write_heartbeat(time.time()):
+        for replica in _replicas:
+            _measure(replica)
+
+
+def _monitor_loop():
+    while True:
+        try:
+            check_lag()
+        except Exception:
+            log.exception("replica.monitor_failed")
+        time.sleep(_settings["interval"])
+
+
+# --- Routing ---
+def _note_write(user_ids):
+    if _replicas and has_request_context() and session.get('user_id'):
+        session[SESSION_KEY] = time.time()
+
+
+on_data_version_bump(_note_write)
+
+
+def _choose_replica():
+    """(replica, None) when one may serve this request, else (None, reason)."""
+    healthy = [r for r in _replicas if _serving(r)]
+    if not healthy:
+        return None, "primary_lagging" if any(r.lag is not None for r in _replicas) else "primary_unavailable"
+    last_write = session.get(SESSION_KEY) if has_request_context() else None
+    if last_write:
+        # The lag was measured up to one interval ago and may have grown since
+        since_write = time.time() - last_write - _settings["interval"]
+        healthy = [r for r in healthy if r.lag < since_write]
+        if not healthy:
+            return None, "primary_pinned"
+    return healthy[next(_round_robin) % len(healthy)], None
+
+
+def _reached_version(conn):
+    """True unless conditional_get() saw a newer data version on the primary."""
+    expected = g.get('data_version') if has_request_context() else None
+    if not expected:
+        return True
+    user_id, version = expected
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM user_data_versions WHERE user_id = %s", (user_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        return (row[0] if row else 0) >= version
+    except Error:
+        return False
+
+
+def get_read_connection():
+    """
+    A connection for read-only work: a caught-up replica when one is
+    available, otherwise the primary. Never write through it.
+    """
+    if not _replicas:
+        return database.get_db_connection()
+    replica, reason = _choose_replica()
+    if replica is not None:
+        conn = replica.connect()
+        if conn is not None:
+            if _reached_version(conn):
+                read_counters["replica"] += 1
+                return conn
+            conn.close()
+            reason = "primary_stale"
+        else:
+            reason = "primary_unavailable"
+    read_counters[reason] += 1
+    return database.get_db_connection()
+
+
+def replica_stats():
+    """Name and lag (None = unreachable) of each configured replica."""
+    return [{"name": r.name, "lag": r.lag} for r in _replicas]
+
+
+def init_replicas(config=Config):
+    """Per-worker setup: parses DB_REPLICAS and starts the lag monitor thread."""
+    _settings.update(max_lag=config.REPLICA_MAX_LAG, interval=config.REPLICA_LAG_INTERVAL,
+                     pool_size=config.DB_POOL_SIZE or 1)
+    dsns = [dsn.strip() for dsn in config.DB_REPLICAS.split(",") if dsn.strip()]
+    _replicas[:] = [Replica(dsn, index) for index, dsn in enumerate(dsns)]
+    if not _replicas:
+        return
+    thread = _monitor["thread"]
+    if thread is None or not thread.is_alive() or _monitor["pid"] != os.getpid():
+        thread = threading.Thread(target=_monitor_loop, name="replica-lag", daemon=True)
+        thread.start()
+        _monitor.update(thread=thread, pid=os.getpid())
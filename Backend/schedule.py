@@ -1,7 +1,13 @@
 from flask import Blueprint, jsonify, session, request
 from database import get_db_connection
+from shards import get_shard_read_connection
+from archive import events_source, include_archived
 from mysql.connector import Error
-from datetime import datetime
+from versioning import conditional_get
+from payloads import select_task_fields, task_list_response
+from recurrence import month_day_states
+from free_slots import MAX_DAYS, find_free_slots, parse_hhmm
+from datetime import date, datetime
 import pytz
 
 # Configure IST timezone
@@ -10,29 +16,36 @@ IST = pytz.timezone('Asia/Kolkata')
 schedule_bp = Blueprint('schedule', __name__)
 
 @schedule_bp.route("/api/tasks/all")
+@conditional_get()
 def get_all_tasks():
-    """Fetches ALL tasks (pending and completed) for the logged-in user."""
+    """
+    Fetches ALL tasks (pending and completed) for the logged-in user.
+    Supports ?fields= and ?format=columnar (see payloads.py).
+    """
     if 'user_id' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
     user_id = session['user_id']
+    try:
+        fields, select_sql = select_task_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    conn = get_db_connection()
+    conn = get_shard_read_connection(user_id)
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
         
     try:
-        cursor = conn.cursor(dictionary=True)
-        # Fetches all tasks and orders them by date and time
-        query = """
-            SELECT id, title, description, category, date, time, done, reminder_setting 
-            FROM events 
-            WHERE user_id = %s
-            ORDER BY date, time
+        cursor = conn.cursor()
+        # Fetches all tasks and orders them by date and time; ?archived=0 skips the archive
+        source, params = events_source("user_id = %s", (user_id,), archived=include_archived(request.args))
+        query = f"""
+            SELECT {select_sql}
+            FROM {source} e
+            ORDER BY e.date, e.time
         """
-        cursor.execute(query, (user_id,))
-        tasks = cursor.fetchall()
-        return jsonify(tasks)
+        cursor.execute(query, params)
+        return task_list_response(cursor.fetchall(), fields)
     except Error as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -41,6 +54,7 @@ def get_all_tasks():
             conn.close()
 
 @schedule_bp.route("/api/schedule/events/month_view")
+@conditional_get()
 def get_events_for_month():
     """
     Fetches days with pending tasks and days with only completed tasks 
@@ -56,14 +70,16 @@ def get_events_for_month():
     if not year or not month:
         return jsonify({"error": "Year and month parameters are required"}), 400
 
-    conn = get_db_connection()
+    conn = get_shard_read_connection(user_id)
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
 
     try:
         cursor = conn.cursor(dictionary=True)
         date_pattern = f"{year}-{int(month):02d}-%"
-        cursor.execute("SELECT date, done FROM events WHERE user_id = %s AND date LIKE %s", (user_id, date_pattern))
+        source, params = events_source("user_id = %s AND date LIKE %s", (user_id, date_pattern),
+                                       f"{year}-{int(month):02d}-01", columns="date, done")
+        cursor.execute(f"SELECT date, done FROM {source} e", params)
         events = cursor.fetchall()
 
         events_by_day = {}
@@ -76,10 +92,81 @@ def get_events_for_month():
             else:
                 events_by_day[day]['hasPending'] = True
 
+        for day, (has_pending, has_completed) in month_day_states(user_id, year, month, cursor).items():
+            state = events_by_day.setdefault(day, {'hasPending': False, 'hasCompleted': False})
+            state['hasPending'] |= has_pending
+            state['hasCompleted'] |= has_completed
+
         return jsonify(events_by_day)
     except Error as e:
         return jsonify({"error": str(e)}), 500
     finally:
         if conn and conn.is_connected():
             cursor.close()
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+
+# --- Free Slots ---
+@schedule_bp.route("/api/schedule/free-slots")
+def get_free_slots():
+    """
+    Free time between ?start= and ?end= (YYYY-MM-DD, default today), within
+    ?work_start=/?work_end= (HH:MM, default 09:00-18:00), of at least
+    ?min_minutes= (default 30). ?with= takes comma-separated collaborator ids
+    whose events must not overlap either. See free_slots.py.
+    """
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    user_id = session['user_id']
+    today = datetime.now(IST).strftime('%Y-%m-%d')
+    start = request.args.get('start') or today
+    end = request.args.get('end') or start
+    try:
+        first, last = date.fromisoformat(start), date.fromisoformat(end)
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD"}), 400
+    if last < first:
+        return jsonify({"error": "end must not be before start"}), 400
+    if (last - first).days >= MAX_DAYS:
+        return jsonify({"error": f"At most {MAX_DAYS} days per request"}), 400
+
+    work_start = parse_hhmm(request.args.get('work_start', '09:00'))
+    work_end = parse_hhmm(request.args.get('work_end', '18:00'))
+    if work_start is None or work_end is None or work_start >= work_end:
+        return jsonify({"error": "work_start and work_end must be HH:MM with work_start before work_end"}), 400
+    try:
+        min_minutes = int(request.args.get('min_minutes', 30))
+    except ValueError:
+        return jsonify({"error": "min_minutes must be a number"}), 400
+    if min_minutes < 1:
+        return jsonify({"error": "min_minutes must be at least 1"}), 400
+
+    others = [u for u in dict.fromkeys(request.args.get('with', '').split(',')) if u and u != user_id]
+    if others:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        try:
+            cursor = conn.cursor()
+            placeholders = ", ".join(["%s"] * len(others))
+            cursor.execute(
+                "SELECT peer_id FROM collaboration_edges "
+                f"WHERE user_id = %s AND status = 'accepted' AND peer_id IN ({placeholders})",
+                (user_id, *others)
+            )
+            allowed = {row[0] for row in cursor.fetchall()}
+        except Error as e:
+            return jsonify({"error": str(e)}), 500
+        finally:
+            if conn and conn.is_connected():
+                cursor.close()
+                conn.close()
+        not_allowed = [u for u in others if u not in allowed]
+        if not_allowed:
+            return jsonify({"error": "Some users are not your collaborators", "user_ids": not_allowed}), 403
+
+    slots = find_free_slots([user_id, *others], start, end, work_start, work_end, min_minutes)
+    if slots is None:
+        return jsonify({"error": "Database connection failed"}), 500
+    return jsonify({"start": start, "end": end, "user_ids": [user_id, *others], "slots": slots})
@@ -0,0 +1,342 @@
+import mysql.connector
+from mysql.connector import Error
+from config import Config
+from logs import get_logger
+import sqlite_backend
+import shards
+
+log = get_logger(__name__)
+
+# --- Schema Setup ---
+# Every worker process calls ensure_schema() on startup. The DDL below is
+# idempotent, and a MySQL named lock makes sure only one process (on any
+# host) runs it at a time. With DB_BACKEND=sqlite the same DDL runs through
+# sqlite_backend, which translates it; SQLite's own write lock serialises it.
+SCHEMA_LOCK_NAME = "helpscout_schema_setup"
+
+_schema_ready = False
+
+
+def _create_tables(cursor, upgrade=True):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id varchar(255) not null UNIQUE,
+        photo_url VARCHAR(255),
+        profile_bio VARCHAR(255) DEFAULT 'Productivity enthusiast and UI/UX designer.',
+        username VARCHAR(255) NOT NULL,
+        email VARCHAR(255) UNIQUE NOT NULL,
+        phone VARCHAR(20) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    _create_event_tables(cursor, upgrade)
+    # One row per invitation; the source of truth for request ids
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS collaborations (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        inviter_id varchar(255) NOT NULL,
+        invitee_id varchar(255) NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY uq_collaborations_pair (inviter_id, invitee_id),
+        KEY idx_collaborations_invitee_status (invitee_id, status),
+        FOREIGN KEY (inviter_id) REFERENCES users(user_id) ON DELETE CASCADE,
+        FOREIGN KEY (invitee_id) REFERENCES users(user_id) ON DELETE CASCADE
+    )
+    """)
+    # Symmetric edge list: each collaboration is stored once per direction so
+    # "who are my collaborators" is a single index range scan on user_id.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS collaboration_edges (
+        user_id varchar(255) NOT NULL,
+        peer_id varchar(255) NOT NULL,
+        collaboration_id INT NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        PRIMARY KEY (user_id, peer_id),
+        KEY idx_collaboration_edges_user_status (user_id, status, peer_id),
+        KEY idx_collaboration_edges_collaboration (collaboration_id),
+        FOREIGN KEY (collaboration_id) REFERENCES collaborations(id) ON DELETE CASCADE
+    )
+    """)
+    _backfill_collaboration_edges(cursor)
+    # Bumped by every write path; read endpoints turn it into an ETag
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_data_versions (
+        user_id varchar(255) PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0
+    )
+    """)
+    # Heartbeat row written to the primary to measure replica lag (replicas.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS replica_heartbeat (
+        id INT PRIMARY KEY,
+        beat DOUBLE NOT NULL
+    )
+    """)
+    # Bucket -> shard map for user-hash sharding (shards.py); buckets without
+    # a row live on this database
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS shard_buckets (
+        bucket INT PRIMARY KEY,
+        shard INT NOT NULL,
+        frozen BOOLEAN NOT NULL DEFAULT FALSE
+    )
+    """)
+    # Per-statement totals written by the slow-query log (slow_queries.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS slow_queries (
+        fingerprint CHAR(16) PRIMARY KEY,
+        statement TEXT NOT NULL,
+        calls BIGINT NOT NULL DEFAULT 0,
+        total_ms DOUBLE NOT NULL DEFAULT 0,
+        max_ms DOUBLE NOT NULL DEFAULT 0,
+        sample_params TEXT,
+        plan TEXT,
+        first_seen DATETIME NOT NULL,
+        last_seen DATETIME NOT NULL
+    )
+    """)
+
+
+def _create_event_tables(cursor, upgrade=True, users_table=True):
+    """
+    The per-user tables that shards.py spreads across databases. A shard has
+    no users table, so there they are created without the foreign key to it.
+    """
+    user_fk = ",\n        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE" if users_table else ""
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS events (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id varchar(255),
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        Category VARCHAR(255),
+        date VARCHAR(255) NOT NULL,
+        time VARCHAR(50),
+        done BOOLEAN NOT NULL DEFAULT FALSE,
+        reminder_setting VARCHAR(50),
+        reminder_datetime VARCHAR(255),
+        reminde1 boolean,
+        reminde2 boolean,
+        reminde3 boolean,
+        reminde4 boolean,
+        KEY idx_events_user_date (user_id, date),
+        FULLTEXT KEY ft_events_title_description (title, description){user_fk}
+    )
+    """)
+    if upgrade:  # Only MySQL databases predate these keys
+        _ensure_index(cursor, "events", "idx_events_user_date", "(user_id, date)")
+        _ensure_index(cursor, "events", "ft_events_title_description", "(title, description)", kind="FULLTEXT INDEX")
+    # Completed events moved out of the hot table by archive.py; same columns
+    # in the same order, and the rows keep their event ids
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS events_archive (
+        id INT PRIMARY KEY,
+        user_id varchar(255),
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        Category VARCHAR(255),
+        date VARCHAR(255) NOT NULL,
+        time VARCHAR(50),
+        done BOOLEAN NOT NULL DEFAULT FALSE,
+        reminder_setting VARCHAR(50),
+        reminder_datetime VARCHAR(255),
+        reminde1 boolean,
+        reminde2 boolean,
+        reminde3 boolean,
+        reminde4 boolean,
+        KEY idx_events_archive_user_date (user_id, date),
+        FULLTEXT KEY ft_events_archive_title_description (title, description){user_fk}
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS assigned_tasks (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        assigner_id varchar(255) NOT NULL,
+        assignee_id varchar(255) NOT NULL,
+        event_id INT NOT NULL,
+        KEY idx_assigned_tasks_event (event_id),
+        KEY idx_assigned_tasks_assigner (assigner_id),
+        FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+    )
+    """)
+    # Recurring events: one rule row, expanded on read (recurrence.py)
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS recurring_events (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id varchar(255) NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        Category VARCHAR(255),
+        time VARCHAR(50),
+        reminder_setting VARCHAR(50),
+        freq VARCHAR(10) NOT NULL,
+        interval_n INT NOT NULL DEFAULT 1,
+        weekdays TINYINT NOT NULL DEFAULT 0,
+        start_date VARCHAR(10) NOT NULL,
+        until_date VARCHAR(10),
+        KEY idx_recurring_events_user_start (user_id, start_date){user_fk}
+    )
+    """)
+    # Sparse per-occurrence state: only occurrences that were completed,
+    # cancelled or edited get a row
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS recurring_event_overrides (
+        recurring_id INT NOT NULL,
+        occurrence_date VARCHAR(10) NOT NULL,
+        done BOOLEAN NOT NULL DEFAULT FALSE,
+        cancelled BOOLEAN NOT NULL DEFAULT FALSE,
+        title VARCHAR(255),
+        time VARCHAR(50),
+        PRIMARY KEY (recurring_id, occurrence_date),
+        FOREIGN KEY (recurring_id) REFERENCES recurring_events(id) ON DELETE CASCADE
+    )
+    """)
+
+
+def _ensure_index(cursor, table, index_name, definition, kind="INDEX"):
+    """Adds an index to a table created before the index was part of its DDL."""
+    cursor.execute(
+        "SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        (table, index_name)
+    )
+    if not cursor.fetchone():
+        cursor.execute(f"ALTER TABLE {table} ADD {kind} {index_name} {definition}")
+
+
+def _backfill_collaboration_edges(cursor):
+    """Builds edges for collaborations created before the edge table existed."""
+    cursor.execute("SELECT EXISTS(SELECT 1 FROM collaboration_edges)")
+    if cursor.fetchone()[0]:
+        return
+    cursor.execute("""
+    INSERT IGNORE INTO collaboration_edges (user_id, peer_id, collaboration_id, status)
+    SELECT inviter_id, invitee_id, id, status FROM collaborations
+    UNION ALL
+    SELECT invitee_id, inviter_id, id, status FROM collaborations
+    """)
+
+
+def _reserve_id_range(cursor, table, start, sqlite):
+    """Starts the table's AUTO_INCREMENT at `start` unless it has ids that high."""
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    if cursor.fetchone()[0] >= start:
+        return
+    if not sqlite:
+        cursor.execute(f"ALTER TABLE {table} AUTO_INCREMENT = {start}")
+        return
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", (table,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", (table, start - 1))
+    elif row[0] < start - 1:
+        cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", (start - 1, table))
+
+
+def init_shards(config=Config):
+    """
+    Creates the per-user tables on every DB_SHARDS database. Shard k hands
+    out ids from k * ID_STRIDE, so event ids stay unique across shards.
+    """
+    for shard in shards.parse_shards(config.DB_SHARDS):
+        conn = shard.connect(pooled=False)  # May run in a pre-fork master: no pool to inherit
+        if conn is None:
+            log.error("schema.init_failed", shard=shard.index, node=shard.name, error="unreachable")
+            return False
+        try:
+            cursor = conn.cursor()
+            conn.start_transaction()
+            _create_event_tables(cursor, upgrade=False, users_table=False)
+            for table in shards.ID_TABLES:
+                _reserve_id_range(cursor, table, shard.index * shards.ID_STRIDE, shard.kind == "sqlite")
+            conn.commit()
+            cursor.close()
+            log.info("schema.ready", shard=shard.index, node=shard.name)
+        except Error as e:
+            log.error("schema.init_failed", shard=shard.index, node=shard.name, error=str(e))
+            return False
+        finally:
+            conn.close()
+    return True
+
+
+def init_db(config=Config):
+    """Creates the database and tables if they do not exist yet."""
+    try:
+        conn = mysql.connector.connect(host=config.DB_HOST, user=config.DB_USER, password=config.DB_PASSWORD)
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {config.DB_DATABASE}")
+        cursor.close()
+        conn.close()
+
+        conn = mysql.connector.connect(host=config.DB_HOST, user=config.DB_USER, password=config.DB_PASSWORD, database=config.DB_DATABASE)
+        cursor = conn.cursor()
+        _create_tables(cursor)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        log.info("schema.ready")
+        return True
+    except Error as e:
+        log.error("schema.init_failed", error=str(e))
+        return False
+
+
+def init_sqlite(config=Config):
+    """Creates the tables in the SQLite database at SQLITE_PATH."""
+    conn = None
+    try:
+        engine = sqlite_backend.engine(config.SQLITE_PATH, config.DB_POOL_SIZE, config.SQLITE_BUSY_TIMEOUT)
+        conn = sqlite_backend.connect(engine)
+        cursor = conn.cursor()
+        conn.start_transaction()
+        _create_tables(cursor, upgrade=False)
+        conn.commit()
+        cursor.close()
+        log.info("schema.ready", backend="sqlite", path=config.SQLITE_PATH)
+        return True
+    except Error as e:
+        log.error("schema.init_failed", error=str(e))
+        return False
+    finally:
+        if conn:
+            conn.close()
+
+
+def ensure_schema(config=Config):
+    """
+    Runs init_db() (and init_shards()) at most once per process, serialised
+    across processes with GET_LOCK so concurrently starting workers never
+    race on DDL.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return True
+    if getattr(config, "DB_BACKEND", "mysql") == "sqlite":
+        _schema_ready = init_sqlite(config) and init_shards(config)
+        return _schema_ready
+
+    try:
+        lock_conn = mysql.connector.connect(host=config.DB_HOST, user=config.DB_USER, password=config.DB_PASSWORD)
+    except Error as e:
+        log.error("schema.init_failed", error=str(e))
+        return False
+
+    lock_cursor = lock_conn.cursor()
+    try:
+        lock_cursor.execute("SELECT GET_LOCK(%s, %s)", (SCHEMA_LOCK_NAME, config.SCHEMA_LOCK_TIMEOUT))
+        acquired = lock_cursor.fetchone()[0] == 1
+        if not acquired:
+            log.error("schema.lock_timeout", timeout=config.SCHEMA_LOCK_TIMEOUT)
+            return False
+        try:
+            _schema_ready = init_db(config) and init_shards(config)
+        finally:
+            lock_cursor.execute("SELECT RELEASE_LOCK(%s)", (SCHEMA_LOCK_NAME,))
+            lock_cursor.fetchone()
+        return _schema_ready
+    finally:
+        lock_cursor.close()
+        lock_conn.close()
@@ -0,0 +1,186 @@
+import re
+from flask import Blueprint, request, jsonify, session
+from mysql.connector import Error
+from shards import get_shard_read_connection
+from archive import needs_archive
+from versioning import conditional_get
+from payloads import select_task_fields, encode_columnar
+
+search_bp = Blueprint('search', __name__)
+
+# --- Task Search ---
+# GET /api/tasks/search?q=gro
+#   q         words to find in title/description; the last word is treated
+#             as a prefix so results update while the user types
+#   category  comma-separated categories
+#   status    pending | done | all (default all)
+#   from, to  inclusive YYYY-MM-DD bounds on the task date
+#   page, per_page
+# plus ?fields= and ?format=columnar (payloads.py).
+#
+# Matching uses the ft_events_title_description FULLTEXT index in boolean
+# mode, so every word must match. Results are ordered by relevance, with a
+# boost for titles starting with the query, then by newest date. Searches
+# that can reach archived events (archive.py) also match events_archive.
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+MAX_QUERY_TERMS = 8
+
+# InnoDB does not index words shorter than innodb_ft_min_token_size (3 by
+# default). Queries made only of such words fall back to a title prefix scan.
+FT_MIN_TOKEN_SIZE = 3
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STATUSES = {'all': None, 'pending': False, 'done': True}
+
+
+def build_boolean_query(text):
+    """
+    Turns free text into a boolean-mode AGAINST() string: every word is
+    required and the last one is a prefix. Returns None if no word is long
+    enough for the full-text index.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())[:MAX_QUERY_TERMS]
+    if not tokens:
+        return None
+    *complete, last = tokens
+    terms = [f"+{token}" for token in complete if len(token) >= FT_MIN_TOKEN_SIZE]
+    if len(last) >= FT_MIN_TOKEN_SIZE or terms:
+        terms.append(f"+{last}*")
+    return " ".join(terms) if terms else None
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def build_search_query(user_id, select_sql, text, categories=None, done=None,
+                       date_from=None, date_to=None, limit=DEFAULT_PER_PAGE, offset=0, archived=False):
+    """
+    Returns (sql, params) for one page of search results, ranked by relevance.
+    With `archived`, events_archive is searched too.
+    """
+    title_prefix = _escape_like(text.strip()) + '%'
+    boolean_query = build_boolean_query(text)
+    params = []
+    if boolean_query:
+        score_sql = "MATCH(e.title, e.description) AGAINST (%s IN BOOLEAN MODE) + 2 * (e.title LIKE %s)"
+        where = ["e.user_id = %s", "MATCH(e.title, e.description) AGAINST (%s IN BOOLEAN MODE)"]
+        params += [boolean_query, title_prefix, user_id, boolean_query]
+    else:
+        score_sql = "1"
+        where = ["e.user_id = %s", "e.title LIKE %s"]
+        params += [user_id, title_prefix]
+
+    if categories:
+        where.append(f"e.Category IN ({', '.join(['%s'] * len(categories))})")
+        params += categories
+    if done is not None:
+        where.append("e.done = %s")
+        params.append(done)
+    if date_from:
+        where.append("e.date >= %s")
+        params.append(date_from)
+    if date_to:
+        where.append("e.date <= %s")
+        params.append(date_to)
+
+    if not archived:
+        sql = f"""
+            SELECT {select_sql}, {score_sql} AS score
+            FROM events e
+            WHERE {' AND '.join(where)}
+            ORDER BY score DESC, e.date DESC, e.id DESC
+            LIMIT %s OFFSET %s
+        """
+        return sql, params + [limit, offset]
+
+    # Each table is matched through its own FULLTEXT index, then the two are ranked together
+    branches = [
+        f"SELECT {select_sql}, {score_sql} AS score, e.date AS sort_date, e.id AS sort_id "
+        f"FROM {table} e WHERE {' AND '.join(where)}"
+        for table in ("events", "events_archive")
+    ]
+    sql = f"""
+        SELECT * FROM ({' UNION ALL '.join(branches)}) r
+        ORDER BY score DESC, sort_date DESC, sort_id DESC
+        LIMIT %s OFFSET %s
+    """
+    return sql, params * 2 + [limit, offset]
+
+
+def _parse_filters(args):
+    """Validates the query string. Raises ValueError with a user-facing message."""
+    text = args.get('q', '').strip()
+    if not text:
+        raise ValueError("q is required")
+    status = args.get('status', 'all')
+    if status not in STATUSES:
+        raise ValueError("status must be pending, done or all")
+    page = int(args.get('page', 1))
+    per_page = int(args.get('per_page', DEFAULT_PER_PAGE))
+    if page < 1 or not 1 <= per_page <= MAX_PER_PAGE:
+        raise ValueError(f"page must be >= 1 and per_page between 1 and {MAX_PER_PAGE}")
+    categories = [c.strip() for c in args.get('category', '').split(',') if c.strip()]
+    return {
+        'text': text,
+        'categories': categories,
+        'done': STATUSES[status],
+        'date_from': args.get('from'),
+        'date_to': args.get('to'),
+        'page': page,
+        'per_page': per_page,
+    }
+
+
+@search_bp.route("/api/tasks/search")
+@conditional_get()
+def search_tasks():
+    """Ranked, filtered, paginated search over the user's tasks."""
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    user_id = session['user_id']
+    try:
+        filters = _parse_filters(request.args)
+        fields, select_sql = select_task_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_shard_read_connection(user_id)
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        page, per_page = filters['page'], filters['per_page']
+        # One extra row tells us whether there is a next page without a COUNT(*)
+        sql, params = build_search_query(
+            user_id, select_sql, filters['text'], filters['categories'], filters['done'],
+            filters['date_from'], filters['date_to'], limit=per_page + 1, offset=(page - 1) * per_page,
+            # Archived events are completed ones dated before the cutoff
+            archived=filters['done'] is not False and needs_archive(filters['date_from'])
+        )
+        cursor.execute(sql, params)
+        rows = [row[:len(fields)] for row in cursor.fetchall()]  # Drop the score and sort columns
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+
+        if request.args.get('format') == 'columnar':
+            results = encode_columnar(rows, fields)
+        else:
+            results = [dict(zip(fields, row)) for row in rows]
+        return jsonify({
+            "query": filters['text'],
+            "page": page,
+            "per_page": per_page,
+            "has_more": has_more,
+            "results": results
+        })
+    except Error as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
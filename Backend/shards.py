@@ -0,0 +1,666 @@
+"""
+User-hash sharding of the per-user tables, and the tool that moves buckets.
+
+    python shards.py status
+    python shards.py move <bucket> <shard>
+    python shards.py rebalance [--batch 32] [--dry-run]
+"""
+import argparse
+import math
+import sys
+import threading
+import time
+import zlib
+from flask import jsonify
+from mysql.connector import Error
+from config import Config
+import database
+import replicas
+from logs import get_logger
+from versioning import bump_data_version, notify_bump_listeners
+
+log = get_logger(__name__)
+
+# --- Shards ---
+# events, assigned_tasks, recurring_events and recurring_event_overrides hold
+# one user's rows each and are spread across databases by user id:
+#   - Shard 0 is the primary; shard k is the k-th DSN in DB_SHARDS.
+#   - A user id hashes (CRC32) into one of BUCKETS buckets. `shard_buckets`
+#     on the primary maps a bucket to its shard; buckets without a row are
+#     on shard 0, so without DB_SHARDS (or before the first move) nothing
+#     changes. Workers cache the map for SHARD_MAP_TTL seconds.
+#   - users, collaborations, collaboration_edges and user_data_versions stay
+#     on the primary. Queries never join them with a shard's tables; names
+#     and emails are looked up separately (user_columns()).
+#   - bump_data_version() through a shard connection is applied on the
+#     primary right after the shard commits, so an ETag never describes data
+#     that is not there yet. The two commits are not atomic: the bump is
+#     retried BUMP_ATTEMPTS times. If the primary still can't take it,
+#     commit() returns as usual: the write is saved, and failing the request
+#     would only make the client repeat it. This worker drops its cached
+#     copies, and a thread retries the bump every BUMP_RETRY_INTERVAL seconds
+#     until the primary takes it. Until then, other workers and clients
+#     holding an ETag may see the old data.
+#   - Shard k hands out ids from k * ID_STRIDE, so event ids are unique
+#     across shards (as long as no shard allocates ID_STRIDE of them).
+# Cross-shard operations:
+#   - An assigned task is the assignee's event: create_and_assign_task writes
+#     the event and its assigned_tasks row on the assignee's shard.
+#     create_and_assign_task_many commits once per shard involved; each
+#     shard's copies are atomic, the request as a whole is not.
+#   - "Assigned by me" and deleting a task you assigned fan out to every
+#     shard. Rows are only taken from the shard their owner maps to, so the
+#     copies a bucket move leaves behind are never seen twice.
+#   - Collaborators, invitations and profiles only touch the primary.
+# Moving buckets (move_buckets()) copies their users while they keep working,
+# then freezes the buckets (writes get 503 + Retry-After), re-copies users
+# whose data version changed, switches the map and deletes the old copies.
+# Moved rows get new ids on the new shard; the users' versions are bumped
+# so clients refetch.
+
+BUCKETS = 1024
+BUMP_ATTEMPTS = 3
+BUMP_BACKOFF = 0.05  # Seconds before the second attempt, doubled after each
+BUMP_RETRY_INTERVAL = 5.0  # Seconds between later retries of bumps the primary didn't take
+ID_STRIDE = 100000000
+ID_TABLES = ("events", "assigned_tasks", "recurring_events")
+SETTLE_GRACE = 2.0  # Seconds on top of SHARD_MAP_TTL for in-flight requests to finish
+
+_settings = {"ttl": 5.0}
+_shards = []  # Shard 1..N; shard 0, the primary, is not in the list
+_map = {"buckets": None, "loaded_at": None}  # bucket -> (shard, frozen)
+_map_lock = threading.Lock()
+_pending_bumps = {"user_ids": set(), "thread": None}
+_pending_lock = threading.Lock()
+
+
+class VersionBumpFailed(Error):
+    """A shard write committed but its data-version bump on the primary did not."""
+
+    def __init__(self, user_ids):
+        super().__init__(msg="data version bump failed after the shard commit")
+        self.user_ids = user_ids
+
+
+class BucketMoving(Exception):
+    """A write to a bucket that is frozen while it moves between shards."""
+
+    def __init__(self, bucket):
+        super().__init__(f"bucket {bucket} is moving to another shard")
+        self.bucket = bucket
+
+
+class Shard(replicas.Replica):
+    """One DB_SHARDS DSN; connections are ShardConnections."""
+    pool_prefix = "shard"
+
+    def connect(self, pooled=True):
+        """A connection to this shard, or None if it cannot be reached; pooled=False skips the pool."""
+        try:
+            return ShardConnection(database._wrap(self._raw_connection(pooled)))
+        except Error as e:
+            log.warning("shard.connect_failed", shard=self.index, node=self.name, error=str(e))
+            return None
+
+
+class ShardConnection:
+    """
+    Connection to a shard other than the primary. Version bumps made through
+    its cursors are collected and applied on the primary after commit().
+    """
+    __slots__ = ("_conn", "_bumps")
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._bumps = []
+
+    def cursor(self, *args, **kwargs):
+        return _ShardCursor(self._conn.cursor(*args, **kwargs), self._bumps)
+
+    def commit(self):
+        self._conn.commit()
+        if self._bumps:
+            user_ids = list(self._bumps)
+            self._bumps.clear()
+            if not _bump_on_primary(user_ids):
+                _defer_bump(user_ids)
+
+    def rollback(self):
+        self._bumps.clear()
+        return self._conn.rollback()
+
+    def close(self):
+        self._bumps.clear()
+        return self._conn.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _ShardCursor:
+    __slots__ = ("_cursor", "_bumps")
+
+    def __init__(self, cursor, bumps):
+        self._cursor = cursor
+        self._bumps = bumps
+
+    def defer_version_bumps(self, user_ids):
+        """Called by bump_data_version() instead of writing to this shard."""
+        self._bumps.extend(user_ids)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _try_bump(user_ids):
+    conn = database.get_db_connection()
+    if not conn:
+        return "primary unavailable"
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        bump_data_version(cursor, *user_ids)
+        conn.commit()
+        return None
+    except Error as e:
+        return str(e)
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if conn.is_connected():
+            conn.close()
+
+
+def _bump_on_primary(user_ids):
+    """Bumps the versions after a shard commit; returns False if every attempt failed."""
+    for attempt in range(BUMP_ATTEMPTS):
+        if attempt:
+            time.sleep(BUMP_BACKOFF * 2 ** (attempt - 1))
+        error = _try_bump(user_ids)
+        if error is None:
+            return True
+        log.warning("shard.version_bump_retry", user_ids=user_ids, attempt=attempt + 1, error=error)
+    log.error("shard.version_bump_failed", user_ids=user_ids, attempts=BUMP_ATTEMPTS)
+    notify_bump_listeners(user_ids)  # At least this worker stops serving the old rows
+    return False
+
+
+def _defer_bump(user_ids):
+    """Leaves the bump to a thread that retries it until the primary takes it."""
+    with _pending_lock:
+        _pending_bumps["user_ids"].update(user_ids)
+        thread = _pending_bumps["thread"]
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_retry_pending_bumps, name="version-bump-retry", daemon=True)
+            _pending_bumps["thread"] = thread
+            thread.start()
+
+
+def _retry_pending_bumps():
+    while True:
+        time.sleep(BUMP_RETRY_INTERVAL)
+        with _pending_lock:
+            user_ids = sorted(_pending_bumps["user_ids"])
+            if not user_ids:
+                _pending_bumps["thread"] = None
+                return
+        error = _try_bump(user_ids)
+        if error is None:
+            with _pending_lock:
+                _pending_bumps["user_ids"].difference_update(user_ids)
+            log.info("shard.version_bump_recovered", user_ids=user_ids)
+        else:
+            log.warning("shard.version_bump_pending", user_ids=user_ids, error=error)
+
+
+def parse_shards(dsns):
+    """Shard objects for a comma-separated DB_SHARDS value, numbered from 1."""
+    dsns = [dsn.strip() for dsn in dsns.split(",") if dsn.strip()]
+    return [Shard(dsn, index) for index, dsn in enumerate(dsns, start=1)]
+
+
+# --- Shard Map ---
+def bucket_of(user_id):
+    return zlib.crc32(str(user_id).encode("utf-8")) % BUCKETS
+
+
+def _read_map(cursor):
+    cursor.execute("SELECT bucket, shard, frozen FROM shard_buckets")
+    return {bucket: (shard, bool(frozen)) for bucket, shard, frozen in cursor.fetchall()}
+
+
+def _load_map():
+    conn = database.get_db_connection()
+    if not conn:
+        raise Error("shard map unavailable: primary unreachable")
+    try:
+        cursor = conn.cursor()
+        buckets = _read_map(cursor)
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+    unknown = {shard for shard, _ in buckets.values() if shard > len(_shards)}
+    if unknown:
+        raise Error(f"shard map names shards {sorted(unknown)} but DB_SHARDS has {len(_shards)}")
+    return buckets
+
+
+def _bucket_map():
+    now = time.monotonic()
+    loaded_at = _map["loaded_at"]
+    if loaded_at is None or now - loaded_at >= _settings["ttl"]:
+        with _map_lock:
+            if _map["loaded_at"] == loaded_at:
+                try:
+                    _map["buckets"] = _load_map()
+                except Error as e:
+                    if _map["buckets"] is None:
+                        raise
+                    log.warning("shard.map_reload_failed", error=str(e))  # Keep routing with the old map
+                _map["loaded_at"] = now
+    return _map["buckets"]
+
+
+def _route(user_id):
+    """(shard, frozen) for the user. Raises Error if the map cannot be read."""
+    if not _shards:
+        return 0, False
+    return _bucket_map().get(bucket_of(user_id), (0, False))
+
+
+def shard_for(user_id):
+    return _route(user_id)[0]
+
+
+def shard_indexes():
+    return range(len(_shards) + 1)
+
+
+def ensure_writable(user_id):
+    """Raises BucketMoving while the user's bucket is frozen."""
+    if _route(user_id)[1]:
+        raise BucketMoving(bucket_of(user_id))
+
+
+def connect_shard(index):
+    """A connection to shard `index` (0 = the primary), or None."""
+    if index == 0:
+        return database.get_db_connection()
+    return _shards[index - 1].connect()
+
+
+def get_shard_connection(user_id, write=True):
+    """
+    A connection to the shard holding `user_id`'s events. None if it cannot
+    be reached; raises BucketMoving while the user's bucket is being moved,
+    unless write=False (reads that must not go to a replica).
+    """
+    try:
+        shard, frozen = _route(user_id)
+    except Error as e:
+        log.error("shard.route_failed", error=str(e))
+        return None
+    if frozen and write:
+        raise BucketMoving(bucket_of(user_id))
+    return connect_shard(shard)
+
+
+def get_shard_read_connection(user_id):
+    """Like get_shard_connection() for read-only work; shard 0 may use a replica."""
+    try:
+        shard, _ = _route(user_id)
+    except Error as e:
+        log.error("shard.route_failed", error=str(e))
+        return None
+    if shard == 0:
+        return replicas.get_read_connection()
+    return _shards[shard - 1].connect()
+
+
+def group_by_shard(user_ids):
+    """{shard: [user_id, ...]} in first-seen order. Raises BucketMoving / Error."""
+    groups = {}
+    for user_id in user_ids:
+        shard, frozen = _route(user_id)
+        if frozen:
+            raise BucketMoving(bucket_of(user_id))
+        groups.setdefault(shard, []).append(user_id)
+    return groups
+
+
+def query_owned_rows(query, params, owner_column):
+    """
+    Runs a read-only query on every shard and returns the tuple rows whose
+    owner (the user id at `owner_column`) is mapped to the shard they came
+    from. Raises Error if a shard cannot be reached.
+    """
+    rows = []
+    for index in shard_indexes():
+        conn = replicas.get_read_connection() if index == 0 else _shards[index - 1].connect()
+        if not conn:
+            raise Error(f"shard {index} unavailable")
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            found = cursor.fetchall()
+        finally:
+            if conn.is_connected():
+                cursor.close()
+                conn.close()
+        if _shards:
+            found = [row for row in found if shard_for(row[owner_column]) == index]
+        rows.extend(found)
+    return rows
+
+
+def user_columns(user_ids, column):
+    """{user_id: users.<column>} for the given ids, read from the primary."""
+    user_ids = list(dict.fromkeys(u for u in user_ids if u))
+    if not user_ids:
+        return {}
+    conn = replicas.get_read_connection()
+    if not conn:
+        raise Error("database unavailable")
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        cursor.execute(f"SELECT user_id, {column} FROM users WHERE user_id IN ({placeholders})", user_ids)
+        return dict(cursor.fetchall())
+    finally:
+        if conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+def resolve_user_column(rows, fields, field, column):
+    """Replaces the user ids in `field` of tuple rows with users.<column>."""
+    if field not in fields:
+        return rows
+    index = fields.index(field)
+    values = user_columns([row[index] for row in rows], column)
+    return [tuple(row[:index]) + (values.get(row[index]),) + tuple(row[index + 1:]) for row in rows]
+
+
+def register_shards(app):
+    """Answers writes to a moving bucket with 503 and a Retry-After."""
+    @app.errorhandler(BucketMoving)
+    def bucket_moving(e):
+        retry_after = str(math.ceil(2 * _settings["ttl"] + SETTLE_GRACE))
+        return jsonify({"error": "Your data is being moved, please retry shortly."}), 503, {'Retry-After': retry_after}
+
+
+def init_shards(config=Config):
+    """Per-worker setup: parses DB_SHARDS and forgets the cached map."""
+    _settings["ttl"] = config.SHARD_MAP_TTL
+    _shards[:] = parse_shards(config.DB_SHARDS)
+    _map.update(buckets=None, loaded_at=None)
+
+
+# --- Moving Buckets ---
+def _primary():
+    conn = database.get_db_connection()
+    if not conn:
+        raise RuntimeError("primary unavailable")
+    return conn
+
+
+def _shard(index):
+    if not 0 <= index <= len(_shards):
+        raise RuntimeError(f"no shard {index} (DB_SHARDS has {len(_shards)})")
+    conn = connect_shard(index)
+    if not conn:
+        raise RuntimeError(f"shard {index} unavailable")
+    return conn
+
+
+def _set_buckets(states):
+    """Writes [(bucket, shard, frozen), ...] to the map on the primary."""
+    conn = _primary()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO shard_buckets (bucket, shard, frozen) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE shard = VALUES(shard), frozen = VALUES(frozen)",
+            states
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _bucket_users(buckets):
+    """{user_id: (bucket, data version)} for every user hashing into `buckets`."""
+    conn = _primary()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT u.user_id, v.version FROM users u LEFT JOIN user_data_versions v ON v.user_id = u.user_id")
+        users = {}
+        for user_id, version in cursor.fetchall():
+            bucket = bucket_of(user_id)
+            if bucket in buckets:
+                users[user_id] = (bucket, version or 0)
+        return users
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _insert_row(cursor, table, row, keep_id=False):
+    columns = [column for column in row if keep_id or column != "id"]
+    cursor.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+        [row[column] for column in columns]
+    )
+    return cursor.lastrowid
+
+
+def _delete_user_rows(cursor, user_id):
+    # assigned_tasks and recurring_event_overrides go with them (ON DELETE CASCADE)
+    cursor.execute("DELETE FROM events WHERE user_id = %s", (user_id,))
+    cursor.execute("DELETE FROM events_archive WHERE user_id = %s", (user_id,))
+    cursor.execute("DELETE FROM recurring_events WHERE user_id = %s", (user_id,))
+
+
+def _copy_user(user_id, source, target):
+    """
+    Replaces the user's rows on `target` with a copy of those on `source`.
+    Returns the assigners of the user's tasks (their views show the ids).
+    """
+    src = _shard(source)
+    try:
+        cursor = src.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM events WHERE user_id = %s ORDER BY id", (user_id,))
+        events = cursor.fetchall()
+        cursor.execute("SELECT * FROM events_archive WHERE user_id = %s ORDER BY id", (user_id,))
+        archived = cursor.fetchall()
+        cursor.execute("SELECT a.* FROM assigned_tasks a JOIN events e ON e.id = a.event_id WHERE e.user_id = %s", (user_id,))
+        assignments = cursor.fetchall()
+        cursor.execute("SELECT * FROM recurring_events WHERE user_id = %s ORDER BY id", (user_id,))
+        rules = cursor.fetchall()
+        cursor.execute(
+            "SELECT o.* FROM recurring_event_overrides o JOIN recurring_events r ON r.id = o.recurring_id WHERE r.user_id = %s",
+            (user_id,)
+        )
+        overrides = cursor.fetchall()
+        cursor.close()
+    finally:
+        src.close()
+
+    dst = _shard(target)
+    try:
+        cursor = dst.cursor()
+        dst.start_transaction()
+        _delete_user_rows(cursor, user_id)
+        event_ids = {row["id"]: _insert_row(cursor, "events", row) for row in events}
+        for row in assignments:
+            _insert_row(cursor, "assigned_tasks", dict(row, event_id=event_ids[row["event_id"]]))
+        for row in archived:  # Nothing refers to archived ids, and they are unique across shards
+            _insert_row(cursor, "events_archive", row, keep_id=True)
+        rule_ids = {row["id"]: _insert_row(cursor, "recurring_events", row) for row in rules}
+        for row in overrides:
+            _insert_row(cursor, "recurring_event_overrides", dict(row, recurring_id=rule_ids[row["recurring_id"]]))
+        dst.commit()
+        cursor.close()
+    except Error:
+        dst.rollback()
+        raise
+    finally:
+        dst.close()
+    return {row["assigner_id"] for row in assignments}
+
+
+def _delete_users(moved, side):
+    """Deletes moved users' rows from their source (side 0) or target (side 1) shard."""
+    by_shard = {}
+    for user_id, shards in moved.items():
+        by_shard.setdefault(shards[side], []).append(user_id)
+    for index, user_ids in by_shard.items():
+        conn = _shard(index)
+        try:
+            cursor = conn.cursor()
+            for user_id in user_ids:
+                conn.start_transaction()
+                _delete_user_rows(cursor, user_id)
+                conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+
+def move_buckets(targets):
+    """
+    Moves every user in the buckets of `targets` ({bucket: shard}) while the
+    app keeps serving them; only writes during the short freeze are refused.
+    Returns the number of users moved.
+    """
+    current = bucket_assignment()
+    for bucket, target in targets.items():
+        _shard(target).close()  # Fail before copying anything if it is unreachable
+    stale = [(bucket, target, False) for bucket, target in targets.items() if current[bucket] == (target, True)]
+    if stale:
+        _set_buckets(stale)  # Unfreeze buckets an interrupted move left behind
+    plan = {bucket: (current[bucket][0], target) for bucket, target in targets.items() if current[bucket][0] != target}
+    if not plan:
+        return 0
+    settle = _settings["ttl"] + SETTLE_GRACE
+    log.info("shard.move_started", buckets=sorted(plan))
+
+    versions = _bucket_users(plan)
+    moved, assigners = {}, {}
+    for user_id, (bucket, _) in versions.items():
+        moved[user_id] = plan[bucket]
+        assigners[user_id] = _copy_user(user_id, *plan[bucket])
+
+    _set_buckets([(bucket, source, True) for bucket, (source, _) in plan.items()])
+    try:
+        time.sleep(settle)  # Every worker has seen the freeze and finished its writes
+        latest = _bucket_users(plan)
+        for user_id, (bucket, version) in latest.items():
+            if user_id not in versions or versions[user_id][1] != version:
+                moved[user_id] = plan[bucket]
+                assigners[user_id] = _copy_user(user_id, *plan[bucket])
+        _set_buckets([(bucket, target, False) for bucket, (_, target) in plan.items()])
+    except BaseException:
+        _set_buckets([(bucket, source, False) for bucket, (source, _) in plan.items()])
+        _delete_users(moved, 1)
+        log.error("shard.move_aborted", buckets=sorted(plan))
+        raise
+
+    # Moved rows have new ids: make the users (and their assigners) refetch
+    refetch = list(moved) + sorted(set().union(*assigners.values()))
+    bumped = _bump_on_primary(refetch)  # If not, the move itself is done; finish it before reporting
+    time.sleep(settle)  # No worker still reads the source's copy
+    _delete_users(moved, 0)
+    log.info("shard.move_finished", buckets=sorted(plan), users=len(moved))
+    if not bumped:
+        raise VersionBumpFailed(refetch)  # The CLI exits, so no thread would retry it
+    return len(moved)
+
+
+def bucket_assignment():
+    """Shard of every bucket, from the primary (not the cache)."""
+    conn = _primary()
+    try:
+        cursor = conn.cursor()
+        mapped = _read_map(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+    return {bucket: mapped.get(bucket, (0, False)) for bucket in range(BUCKETS)}
+
+
+def plan_rebalance():
+    """[(bucket, source, target)] that gives every shard an equal share of buckets, moving as few as possible."""
+    count = len(_shards) + 1
+    quota = {index: BUCKETS // count + (1 if index < BUCKETS % count else 0) for index in range(count)}
+    by_shard = {index: [] for index in range(count)}
+    for bucket, (shard, _) in bucket_assignment().items():
+        by_shard[shard].append(bucket)
+    spare = []
+    for index, buckets in by_shard.items():
+        spare.extend((bucket, index) for bucket in sorted(buckets)[quota[index]:])
+    moves = []
+    for index in range(count):
+        while len(by_shard[index]) < quota[index]:
+            bucket, source = spare.pop()
+            by_shard[index].append(bucket)
+            moves.append((bucket, source, index))
+    return moves
+
+
+def print_status():
+    shards = {index: {"buckets": 0, "frozen": []} for index in shard_indexes()}
+    for bucket, (shard, frozen) in bucket_assignment().items():
+        shards[shard]["buckets"] += 1
+        if frozen:
+            shards[shard]["frozen"].append(bucket)
+    names = ["primary"] + [shard.name for shard in _shards]
+    for index, state in shards.items():
+        frozen = f"  frozen: {state['frozen']}" if state["frozen"] else ""
+        print(f"shard {index:<3} {names[index]:<40} {state['buckets']:>5} buckets{frozen}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shard map and bucket moves.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Buckets per shard")
+    move = commands.add_parser("move", help="Move one bucket to another shard")
+    move.add_argument("bucket", type=int)
+    move.add_argument("shard", type=int)
+    rebalance = commands.add_parser("rebalance", help="Spread buckets evenly over all shards")
+    rebalance.add_argument("--batch", type=int, default=32, help="Buckets moved (and frozen) together")
+    rebalance.add_argument("--dry-run", action="store_true", help="Print the moves without making them")
+    args = parser.parse_args(argv)
+
+    database.init_pool(Config)
+    init_shards(Config)
+    try:
+        if args.command == "status":
+            print_status()
+        elif args.command == "move":
+            if not 0 <= args.bucket < BUCKETS:
+                parser.error(f"bucket must be between 0 and {BUCKETS - 1}")
+            print(f"moved {move_buckets({args.bucket: args.shard})} users")
+        else:
+            moves = plan_rebalance()
+            for bucket, source, target in moves:
+                print(f"bucket {bucket}: shard {source} -> {target}")
+            if not args.dry_run:
+                for offset in range(0, len(moves), args.batch):
+                    batch = moves[offset:offset + args.batch]
+                    users = move_buckets({bucket: target for bucket, _, target in batch})
+                    print(f"moved buckets {', '.join(str(bucket) for bucket, _, _ in batch)} ({users} users)")
+            print(f"{len(moves)} buckets {'to move' if args.dry_run else 'moved'}")
+    except (Error, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Slow-query log and its report.
+
+    python slow_queries.py top [--limit 20] [--by total|max|calls|avg] [--plans]
+    python slow_queries.py reset
+"""
+import argparse
+import hashlib
+import json
+import queue
+import re
+import sys
+import threading
+import time
+from mysql.connector import Error
+from config import Config
+import database
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- Slow-Query Log ---
+# Every statement is timed by the cursor wrapper in database.py. Statements
+# slower than SLOW_QUERY_MS are handed to a per-worker background thread,
+# which:
+#   - normalizes the SQL (literals and placeholders become ?, IN lists
+#     collapse), so all calls of one statement share a fingerprint
+#   - runs EXPLAIN with the same parameters on its own connection, at most
+#     once per fingerprint every SLOW_QUERY_EXPLAIN_INTERVAL seconds
+#   - logs a `db.slow_query` record with redacted parameters and the plan
+#   - adds the call to that fingerprint's totals in `slow_queries`, so the
+#     report covers every worker and host
+# The request thread only pays for a put_nowait(); when the queue is full the
+# record is dropped and counted.
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+PLAN_FIELDS = ("table", "type", "key", "rows", "filtered", "Extra")
+MAX_EXPLAINED = 10000  # Fingerprints remembered for the EXPLAIN interval
+
+_settings = {"threshold": None, "explain": True, "explain_interval": 300.0}
+_state = {"queue": None, "worker": None, "dropped": 0}
+_explained = {}  # fingerprint -> time.monotonic() of its last EXPLAIN
+_local = threading.local()  # .quiet is set on the worker so its own queries are not logged
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_PLACEHOLDER_RE = re.compile(r"%s|%\(\w+\)s")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+_SAFE_STRING_RE = re.compile(r"^\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?$|^\d{2}:\d{2}(?::\d{2})?$")
+
+
+def normalize_sql(statement):
+    """Statement shape: literals and placeholders become ?, lists of them (?+)."""
+    sql = _STRING_RE.sub("?", statement)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?+)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _redact_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value if _SAFE_STRING_RE.match(value) else f"<{len(value)} chars>"
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_params(params):
+    """Keeps numbers, dates and times; strings become their length."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    return [_redact_value(value) for value in params]
+
+
+def _observe(statement, seconds, params):
+    if (_settings["threshold"] is None or seconds < _settings["threshold"]
+            or getattr(_local, "quiet", False) or not isinstance(statement, str)):
+        return
+    try:
+        _state["queue"].put_nowait((statement, params, seconds, time.time()))
+    except queue.Full:
+        _state["dropped"] += 1
+
+
+def _explain(cursor, statement, params):
+    """EXPLAIN rows for the statement, reduced to PLAN_FIELDS (on SQLite, the plan steps)."""
+    try:
+        if database.backend() == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, params)
+            return [{"detail": row["detail"]} for row in cursor.fetchall()]
+        cursor.execute("EXPLAIN " + statement, params)
+        return [{field: row.get(field) for field in PLAN_FIELDS} for row in cursor.fetchall()]
+    except Error as e:
+        return [{"error": str(e)}]
+
+
+def _wants_plan(normalized, key):
+    if not _settings["explain"] or normalized[:6].upper() not in EXPLAINABLE:
+        return False
+    now = time.monotonic()
+    last = _explained.get(key)
+    if last is not None and now - last < _settings["explain_interval"]:
+        return False
+    if len(_explained) >= MAX_EXPLAINED:
+        _explained.clear()
+    _explained[key] = now
+    return True
+
+
+def _record_batch(batch):
+    conn = None
+    cursor = None
+    try:
+        conn = database.get_db_connection()
+        if not conn:
+            return
+        cursor = conn.cursor(dictionary=True)
+        for statement, params, seconds, at in batch:
+            normalized = normalize_sql(statement)
+            key = fingerprint(normalized)
+            redacted = redact_params(params)
+            plan = _explain(cursor, statement, params) if _wants_plan(normalized, key) else None
+            ms = round(seconds * 1000, 2)
+            log.warning("db.slow_query", ms=ms, fingerprint=key, sql=normalized, params=redacted, plan=plan)
+            cursor.execute("""
+                INSERT INTO slow_queries
+                    (fingerprint, statement, calls, total_ms, max_ms, sample_params, plan, first_seen, last_seen)
+                VALUES (%s, %s, 1, %s, %s, %s, %s, FROM_UNIXTIME(%s), FROM_UNIXTIME(%s))
+                ON DUPLICATE KEY UPDATE
+                    calls = calls + 1,
+                    total_ms = total_ms + VALUES(total_ms),
+                    max_ms = GREATEST(max_ms, VALUES(max_ms)),
+                    sample_params = VALUES(sample_params),
+                    plan = COALESCE(VALUES(plan), plan),
+                    last_seen = VALUES(last_seen)
+            """, (key, normalized, ms, ms, json.dumps(redacted, default=str),
+                  json.dumps(plan, default=str) if plan is not None else None, at, at))
+        conn.commit()
+    except Error as e:
+        log.error("slow_query.record_failed", error=str(e))
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+def _worker_loop(records):
+    _local.quiet = True
+    while True:
+        batch = [records.get()]
+        while len(batch) < 100:
+            try:
+                batch.append(records.get_nowait())
+            except queue.Empty:
+                break
+        _record_batch(batch)
+
+
+def dropped_count():
+    """Slow statements dropped in this process because the queue was full."""
+    return _state["dropped"]
+
+
+def init_slow_query_log(config=Config):
+    """Per-worker setup: registers the query observer and starts the recording thread."""
+    threshold = config.SLOW_QUERY_MS
+    _settings.update(threshold=threshold / 1000 if threshold > 0 else None,
+                     explain=config.SLOW_QUERY_EXPLAIN,
+                     explain_interval=config.SLOW_QUERY_EXPLAIN_INTERVAL)
+    if _settings["threshold"] is None:
+        return
+    if _observe not in database._query_observers:
+        database.on_query(_observe)
+    worker = _state["worker"]
+    if worker is None or not worker.is_alive():  # Threads do not survive fork()
+        records = queue.Queue(maxsize=config.SLOW_QUERY_QUEUE)
+        worker = threading.Thread(target=_worker_loop, args=(records,), name="slow-query-log", daemon=True)
+        worker.start()
+        _state.update(queue=records, worker=worker, dropped=0)
+
+
+# --- Report ---
+ORDERINGS = {
+    "total": "total_ms DESC",
+    "max": "max_ms DESC",
+    "calls": "calls DESC",
+    "avg": "total_ms / calls DESC",
+}
+
+
+def top_offenders(limit=20, by="total"):
+    """Fingerprints with the most time spent (or the slowest call, most calls, highest mean)."""
+    conn = database.get_db_connection()
+    if not conn:
+        raise RuntimeError("database unavailable")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"""
+            SELECT fingerprint, statement, calls, total_ms, max_ms, total_ms / calls AS avg_ms,
+                   sample_params, plan, first_seen, last_seen
+            FROM slow_queries
+            ORDER BY {ORDERINGS[by]}
+            LIMIT %s
+        """, (limit,))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    for row in rows:
+        row["sample_params"] = json.loads(row["sample_params"]) if row["sample_params"] else None
+        row["plan"] = json.loads(row["plan"]) if row["plan"] else None
+    return rows
+
+
+def reset():
+    """Clears the aggregated statistics (e.g. after adding an index)."""
+    conn = database.get_db_connection()
+    if not conn:
+        raise RuntimeError("database unavailable")
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM slow_queries")
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def print_offenders(rows, plans=False):
+    header = f"{'fingerprint':<16} {'calls':>8} {'total_ms':>12} {'avg_ms':>9} {'max_ms':>9}  statement"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['fingerprint']:<16} {row['calls']:>8} {row['total_ms']:>12.1f} "
+              f"{row['avg_ms']:>9.1f} {row['max_ms']:>9.1f}  {row['statement'][:120]}")
+        if plans:
+            print(f"    params: {row['sample_params']}")
+            for step in row["plan"] or []:
+                print(f"    plan:   {step}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Slow-query report.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    top = commands.add_parser("top", help="Statements ranked by time spent")
+    top.add_argument("--limit", type=int, default=20)
+    top.add_argument("--by", choices=sorted(ORDERINGS), default="total")
+    top.add_argument("--plans", action="store_true", help="Show sample parameters and EXPLAIN plans")
+    top.add_argument("--json", action="store_true", help="Print rows as JSON")
+    commands.add_parser("reset", help="Clear the aggregated statistics")
+    args = parser.parse_args(argv)
+
+    database.init_pool(Config)
+    try:
+        if args.command == "reset":
+            reset()
+            print("slow query statistics cleared")
+            return 0
+        rows = top_offenders(args.limit, args.by)
+    except (Error, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(rows, default=str, indent=2))
+    else:
+        print_offenders(rows, args.plans)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
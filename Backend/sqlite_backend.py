@@ -0,0 +1,429 @@
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from mysql.connector import errors
+
+# --- Embedded SQLite Driver ---
+# Selected with DB_BACKEND=sqlite (database.py). It gives the app's SQL the
+# slice of the mysql.connector API the blueprints use: cursor(dictionary=True),
+# %s / %(name)s parameters, executemany(), lastrowid, rowcount,
+# start_transaction(), commit() / rollback(), is_connected() and close().
+#
+# Statements are rewritten once and cached:
+#   - INSERT IGNORE, ON DUPLICATE KEY UPDATE ... VALUES(col), IF(), GREATEST(),
+#     LEAST(), LAST_INSERT_ID(), @@auto_increment_increment, FOR UPDATE
+#   - MATCH(...) AGAINST (... IN BOOLEAN MODE) becomes a scoring function
+#   - LIKE gets MySQL's backslash escape
+#   - CREATE TABLE: AUTO_INCREMENT keys, and inline KEY / UNIQUE KEY become
+#     CREATE INDEX statements (FULLTEXT keys are dropped)
+# STR_TO_DATE, DAY, MONTH, YEAR, FROM_UNIXTIME, NOW and CURDATE are
+# registered as SQL functions. sqlite3 errors are raised as the matching
+# mysql.connector errors, so the existing `except Error` handlers apply.
+#
+# A file database runs in WAL mode with a per-process pool of connections;
+# writers take the database lock up front (BEGIN IMMEDIATE) and wait for it
+# up to SQLITE_BUSY_TIMEOUT. ":memory:" keeps one shared connection per
+# process and is meant for tests, demos and benchmarks.
+
+MEMORY = ":memory:"
+WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+MAX_CACHED_STATEMENTS = 2048
+
+_engines = {}  # (pid, path) -> _Engine
+_engines_lock = threading.Lock()
+_translated = {}
+
+_LITERAL_RE = re.compile(r"('(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\")")
+_NAMED_PARAM_RE = re.compile(r"%\((\w+)\)s")
+_REWRITES = [
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bIF\s*\(", re.I), "IIF("),
+    (re.compile(r"\bGREATEST\s*\(", re.I), "MAX("),
+    (re.compile(r"\bLEAST\s*\(", re.I), "MIN("),
+    (re.compile(r"\bLAST_INSERT_ID\s*\(\s*\)", re.I), "last_insert_rowid()"),
+    (re.compile(r"@@auto_increment_increment", re.I), "1"),
+    (re.compile(r"\s+FOR\s+UPDATE\b|\s+LOCK\s+IN\s+SHARE\s+MODE\b", re.I), ""),
+    (re.compile(r"\bMATCH\s*\(([^)]*)\)\s*AGAINST\s*\(\s*\?\s+IN\s+BOOLEAN\s+MODE\s*\)", re.I),
+     r"MATCH_AGAINST(\1, ?)"),
+    (re.compile(r"\bLIKE\s+\?(?!\s+ESCAPE)", re.I), "LIKE ? ESCAPE '\\\\'"),
+]
+_ON_DUPLICATE_RE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_REF_RE = re.compile(r"\bVALUES\s*\(\s*(\w+)\s*\)", re.I)
+
+_CREATE_TABLE_RE = re.compile(r"^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)\)[^)]*$", re.I | re.S)
+_INLINE_KEY_RE = re.compile(r"^(UNIQUE\s+|FULLTEXT\s+)?(?:KEY|INDEX)\s+(\w+)\s*(\(.*\))$", re.I | re.S)
+_AUTO_PK_RE = re.compile(r"\bINT(?:EGER)?\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.I)
+
+
+def _split_top_level(body):
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in body:
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+
+def _translate_create_table(match):
+    if_not_exists, table, body = match.group(1) or "", match.group(2), match.group(3)
+    columns, indexes = [], []
+    for item in _split_top_level(body):
+        key = _INLINE_KEY_RE.match(item)
+        if not key:
+            columns.append(_AUTO_PK_RE.sub("INTEGER PRIMARY KEY AUTOINCREMENT", item))
+            continue
+        kind = (key.group(1) or "").strip().upper()
+        if kind == "FULLTEXT":
+            continue  # Searched with MATCH_AGAINST() instead
+        unique = "UNIQUE " if kind == "UNIQUE" else ""
+        indexes.append(f"CREATE {unique}INDEX IF NOT EXISTS {key.group(2)} ON {table} {key.group(3)}")
+    columns_sql = ",\n    ".join(columns)
+    return [f"CREATE TABLE {if_not_exists}{table} (\n    {columns_sql}\n)"] + indexes
+
+
+def _translate_code(code):
+    code = _NAMED_PARAM_RE.sub(r":\1", code).replace("%s", "?")
+    for pattern, replacement in _REWRITES:
+        code = pattern.sub(replacement, code)
+    return code
+
+
+def translate(statement):
+    """MySQL statement -> list of SQLite statements (usually one)."""
+    cached = _translated.get(statement)
+    if cached is not None:
+        return cached
+    create = _CREATE_TABLE_RE.match(statement)
+    if create:
+        result = _translate_create_table(create)
+    else:
+        # Rewrite outside string literals only
+        pieces = _LITERAL_RE.split(statement)
+        sql = "".join(piece if i % 2 else _translate_code(piece) for i, piece in enumerate(pieces))
+        duplicate = _ON_DUPLICATE_RE.search(sql)
+        if duplicate:
+            update = _VALUES_REF_RE.sub(r"excluded.\1", sql[duplicate.end():])
+            sql = sql[:duplicate.start()] + "ON CONFLICT DO UPDATE SET" + update
+        result = [sql]
+    if len(_translated) >= MAX_CACHED_STATEMENTS:
+        _translated.clear()
+    _translated[statement] = result
+    return result
+
+
+# --- SQL Functions ---
+_DATE_FORMAT_TOKENS = {"%Y": "%Y", "%y": "%y", "%m": "%m", "%c": "%m", "%d": "%d", "%e": "%d",
+                       "%H": "%H", "%k": "%H", "%i": "%M", "%s": "%S", "%S": "%S", "%p": "%p"}
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _str_to_date(value, fmt):
+    if value is None or fmt is None:
+        return None
+    pattern = re.sub(r"%\w", lambda m: _DATE_FORMAT_TOKENS.get(m.group(0), m.group(0)), fmt)
+    try:
+        parsed = datetime.strptime(str(value), pattern)
+    except ValueError:
+        return None  # MySQL returns NULL for unparseable input
+    if any(token in fmt for token in ("%H", "%k", "%i", "%s", "%S")):
+        return parsed.strftime("%Y-%m-%d %H:%M:%S")
+    return parsed.strftime("%Y-%m-%d")
+
+
+def _date_part(index):
+    def part(value):
+        if value is None:
+            return None
+        try:
+            return int(str(value)[:10].split("-")[index])
+        except (ValueError, IndexError):
+            return None
+    return part
+
+
+def _from_unixtime(seconds):
+    return None if seconds is None else datetime.fromtimestamp(float(seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _match_against(*args):
+    """Boolean-mode AGAINST(): +word required, -word excluded, word* prefix. Returns a score."""
+    *columns, query = args
+    words = set(_TOKEN_RE.findall(" ".join(str(c) for c in columns if c).lower()))
+    score = 0
+    for term in (query or "").lower().split():
+        required, excluded = term.startswith("+"), term.startswith("-")
+        term = term.lstrip("+-")
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if not term:
+            continue
+        found = any(w.startswith(term) for w in words) if prefix else term in words
+        if (required and not found) or (excluded and found):
+            return 0
+        score += found and not excluded
+    return score
+
+
+def _register_functions(raw):
+    raw.create_function("STR_TO_DATE", 2, _str_to_date, deterministic=True)
+    raw.create_function("YEAR", 1, _date_part(0), deterministic=True)
+    raw.create_function("MONTH", 1, _date_part(1), deterministic=True)
+    raw.create_function("DAY", 1, _date_part(2), deterministic=True)
+    raw.create_function("DAYOFMONTH", 1, _date_part(2), deterministic=True)
+    raw.create_function("FROM_UNIXTIME", 1, _from_unixtime, deterministic=True)
+    raw.create_function("NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    raw.create_function("CURDATE", 0, lambda: date.today().isoformat())
+    raw.create_function("MATCH_AGAINST", -1, _match_against, deterministic=True)
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+for _decltype in ("DATETIME", "TIMESTAMP"):
+    sqlite3.register_converter(_decltype, lambda raw: datetime.fromisoformat(raw.decode()))
+
+
+_INTEGER_RE = re.compile(r"^-?(?:0|[1-9]\d{0,17})$")
+
+
+def _coerce(value):
+    """
+    Binds integer-looking strings as integers. MySQL compares '2024' with
+    YEAR(...) numerically; SQLite would compare text with an integer. TEXT
+    columns convert the value back, so stored strings are unchanged.
+    """
+    if isinstance(value, str) and _INTEGER_RE.match(value):
+        return int(value)
+    return value
+
+
+# --- Errors ---
+@contextmanager
+def _mysql_errors():
+    """Re-raises sqlite3 errors as the mysql.connector error the app catches."""
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        errno = 1062 if "UNIQUE" in str(e) or "PRIMARY KEY" in str(e) else 1452
+        raise errors.IntegrityError(msg=str(e), errno=errno) from e
+    except sqlite3.OperationalError as e:
+        raise errors.OperationalError(msg=str(e)) from e
+    except sqlite3.Error as e:
+        raise errors.DatabaseError(msg=str(e)) from e
+
+
+# --- Engine (one per process and path) ---
+class _Engine:
+    def __init__(self, path, pool_size, busy_timeout):
+        self.path = path
+        self.memory = path == MEMORY
+        self.pool_size = max(1, pool_size)
+        self.busy_timeout = busy_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+        # One shared connection for :memory:, so transactions are serialised
+        # by this lock instead of SQLite's file lock
+        self.write_lock = threading.RLock() if self.memory else None
+        self._shared = self._open() if self.memory else None
+
+    def _open(self):
+        raw = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                              detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        raw.execute("PRAGMA foreign_keys = ON")
+        if not self.memory:
+            raw.execute("PRAGMA journal_mode = WAL")
+            raw.execute("PRAGMA synchronous = NORMAL")
+        _register_functions(raw)
+        self.created += 1
+        return raw
+
+    def acquire(self):
+        if self.memory:
+            return self._shared
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._open()
+
+    def release(self, raw):
+        if self.memory:
+            return
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(raw)
+                return
+        raw.close()
+
+    def stats(self):
+        if self.memory:
+            return {"size": 1, "idle": 1}
+        return {"size": self.pool_size, "idle": len(self._idle)}
+
+
+def engine(path, pool_size=8, busy_timeout=5.0):
+    """This process's engine for `path`; forked children open their own."""
+    key = (os.getpid(), path)
+    with _engines_lock, _mysql_errors():
+        found = _engines.get(key)
+        if found is None:
+            found = _engines[key] = _Engine(path, pool_size, busy_timeout)
+        return found
+
+
+def connect(owner):
+    """A connection from `owner` (an engine()); close() hands it back."""
+    with _mysql_errors():
+        return SQLiteConnection(owner, owner.acquire())
+
+
+# --- Connection / Cursor ---
+class SQLiteConnection:
+    """mysql.connector-style connection over a pooled sqlite3 connection."""
+
+    def __init__(self, owner, raw):
+        self._engine = owner
+        self._raw = raw
+        self._owns_transaction = False
+
+    def cursor(self, dictionary=False, buffered=None, **kwargs):
+        return SQLiteCursor(self, dictionary)
+
+    def _begin(self):
+        if self._owns_transaction:
+            return
+        lock = self._engine.write_lock
+        if lock is not None:
+            lock.acquire()
+            if self._raw.in_transaction:
+                lock.release()
+                return  # Joins the transaction of a connection further up this thread's stack
+        try:
+            with _mysql_errors():
+                self._raw.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self._release_write_lock()
+            raise
+        self._owns_transaction = True
+
+    def _release_write_lock(self):
+        if self._engine.write_lock is not None:
+            self._engine.write_lock.release()
+
+    def _end(self, verb):
+        if not self._owns_transaction:
+            return
+        try:
+            with _mysql_errors():
+                self._raw.execute(verb)
+        finally:
+            self._owns_transaction = False
+            self._release_write_lock()
+
+    def start_transaction(self, *args, **kwargs):
+        self._begin()
+
+    def commit(self):
+        self._end("COMMIT")
+
+    def rollback(self):
+        self._end("ROLLBACK")
+
+    def statement_lock(self):
+        """Serialises statements on a shared :memory: connection."""
+        lock = self._engine.write_lock
+        return nullcontext() if lock is None or self._owns_transaction else lock
+
+    def is_connected(self):
+        return self._raw is not None
+
+    def ping(self, *args, **kwargs):
+        return None
+
+    def close(self):
+        if self._raw is None:
+            return
+        if self._owns_transaction:
+            self.rollback()  # Like pool_reset_session on MySQL
+        self._engine.release(self._raw)
+        self._raw = None
+
+
+class SQLiteCursor:
+    """mysql.connector-style cursor; rows are tuples, or dicts with dictionary=True."""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._dictionary = dictionary
+        self._cursor = None
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def _run(self, operation, params):
+        statements = translate(operation)
+        if statements[0].lstrip()[:7].upper().startswith(WRITE_VERBS):
+            self._connection._begin()
+        if isinstance(params, dict):
+            params = {key: _coerce(value) for key, value in params.items()}
+        elif params:
+            params = tuple(_coerce(value) for value in params)
+        raw = self._connection._raw
+        with self._connection.statement_lock(), _mysql_errors():
+            for sql in statements:
+                self._cursor = raw.execute(sql, params or ())
+        return self._cursor
+
+    def execute(self, operation, params=None, multi=False):
+        cursor = self._run(operation, params)
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = cursor.rowcount
+
+    def executemany(self, operation, seq_params):
+        # A MySQL multi-row INSERT reports the first new id; do the same
+        first_id, total = None, 0
+        for params in seq_params:
+            cursor = self._run(operation, params)
+            if first_id is None:
+                first_id = cursor.lastrowid
+            total += max(cursor.rowcount, 0)
+        self.lastrowid = first_id
+        self.rowcount = total
+
+    @property
+    def description(self):
+        return self._cursor.description if self._cursor is not None else None
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self.description or ())
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone()) if self._cursor is not None else None
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)] if self._cursor is not None else []
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()] if self._cursor is not None else []
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor = None
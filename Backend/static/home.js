@@ -168,10 +168,52 @@ document.addEventListener('DOMContentLoaded', () => {
         window.location.href = '/';
     });
 
+    // --- REMINDER STREAM ---
+    const REMINDER_POLL_MS = 60000;
+
+    const showReminder = (task) => {
+        const body = `${task.date} at ${task.time}`;
+        if ('Notification' in window && Notification.permission === 'granted') {
+            new Notification(`⏰ ${task.title}`, { body });
+        } else {
+            alert(`⏰ Reminder: ${task.title}\n${body}`);
+        }
+        fetchAndRenderTodayTasks();
+    };
+
+    // Used when the server refuses the stream (204: no asgi.py behind /api/stream/)
+    const pollReminders = async () => {
+        const response = await apiFetch('/api/reminders/due', { method: 'POST' });
+        let delay = REMINDER_POLL_MS;
+        if (response && response.ok) {
+            const data = await response.json();
+            data.reminders.forEach(showReminder);
+            if (data.next_in !== null) delay = Math.min(delay, Math.max(1000, data.next_in * 1000));
+        }
+        setTimeout(pollReminders, delay);
+    };
+
+    const startReminderStream = () => {
+        if ('Notification' in window && Notification.permission === 'default') {
+            Notification.requestPermission();
+        }
+        if (!window.EventSource) {
+            pollReminders();
+            return;
+        }
+        const source = new EventSource('/api/stream/reminders');
+        source.addEventListener('reminder', (event) => showReminder(JSON.parse(event.data)));
+        source.addEventListener('error', () => {
+            // EventSource retries dropped connections itself; CLOSED means the server refused the stream
+            if (source.readyState === EventSource.CLOSED) pollReminders();
+        });
+    };
+
     // --- INITIAL LOAD ---
     const initializePage = () => {
         fetchAndRenderTodayTasks();
         renderCalendar();
+        startReminderStream();
     };
 
     initializePage();
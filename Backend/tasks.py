@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify, session
-from database import get_db_connection
+from shards import get_shard_connection, get_shard_read_connection, BucketMoving
+from archive import events_source
 from mysql.connector import Error
+from versioning import bump_data_version, conditional_get
+from recurrence import create_recurring_event, month_day_states
 from datetime import datetime, timedelta
 import pytz  # You may need to run: pip install pytz
 
@@ -26,6 +29,7 @@ def add_task():
     if not all([title, category, date, time, reminder_setting]):
         return jsonify({"error": "Please fill out all required fields."}), 400
 
+    conn = None
     try:
         # --- Timezone-aware reminder calculation for IST ---
         ist_tz = pytz.timezone('Asia/Kolkata')
@@ -47,11 +51,17 @@ def add_task():
         reminder_datetime_str = aware_reminder_dt.strftime('%Y-%m-%d %H:%M:%S')
         # ---------------------------------------------------
 
-        conn = get_db_connection()
+        conn = get_shard_connection(user_id)
         if not conn:
             return jsonify({"error": "Database connection failed"}), 500
 
         cursor = conn.cursor()
+
+        # Repeating tasks are stored once as a rule (recurrence.py)
+        if data.get('recurrence'):
+            recurring_id = create_recurring_event(cursor, user_id, data, data['recurrence'])
+            conn.commit()
+            return jsonify({"message": "Recurring task added successfully!", "recurring_id": recurring_id}), 201
         
         query = """
             INSERT INTO events 
@@ -65,12 +75,18 @@ def add_task():
         )
         
         cursor.execute(query, values)
+        task_id = cursor.lastrowid
+        bump_data_version(cursor, user_id)
         conn.commit()
         
-        return jsonify({"message": "Task added successfully!", "task_id": cursor.lastrowid}), 201
+        return jsonify({"message": "Task added successfully!", "task_id": task_id}), 201
 
+    except ValueError as e:
+        return jsonify({"error": f"Invalid task: {e}"}), 400
     except Error as e:
         return jsonify({"error": f"Database error: {e}"}), 500
+    except BucketMoving:
+        raise  # Answered with 503 (shards.py)
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
     finally:
@@ -79,6 +95,7 @@ def add_task():
             conn.close()
 
 @tasks_bp.route("/api/tasks/events/month_view")
+@conditional_get()
 def get_events_for_month():
     """
     Fetches days with pending tasks and days with only completed tasks 
@@ -94,7 +111,7 @@ def get_events_for_month():
     if not year or not month:
         return jsonify({"error": "Year and month parameters are required"}), 400
 
-    conn = get_db_connection()
+    conn = get_shard_read_connection(user_id)
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
 
@@ -113,18 +130,32 @@ def get_events_for_month():
         pending_days = [row['event_day'] for row in cursor.fetchall()]
 
         # Query 2: Get days that ONLY have COMPLETED tasks
-        completed_query = """
+        # (archived events are all completed, so only this query can need them)
+        source, params = events_source("user_id = %s AND date LIKE %s", (user_id, f"{year}-{month.zfill(2)}-%"),
+                                       f"{year}-{month.zfill(2)}-01", columns="date, done")
+        completed_query = f"""
             SELECT DAY(STR_TO_DATE(date, '%Y-%m-%d')) as event_day
-            FROM events
-            WHERE user_id = %s
-              AND YEAR(STR_TO_DATE(date, '%Y-%m-%d')) = %s
+            FROM {source} e
+            WHERE YEAR(STR_TO_DATE(date, '%Y-%m-%d')) = %s
               AND MONTH(STR_TO_DATE(date, '%Y-%m-%d')) = %s
             GROUP BY date
             HAVING SUM(CASE WHEN done = FALSE THEN 1 ELSE 0 END) = 0
         """
-        cursor.execute(completed_query, (user_id, year, month))
+        cursor.execute(completed_query, (*params, year, month))
         completed_days = [row['event_day'] for row in cursor.fetchall() if row['event_day'] not in pending_days]
-        
+
+        # Merge in recurring occurrences, expanded for this month only
+        for day, (has_pending, has_completed) in month_day_states(user_id, year, month, cursor).items():
+            if has_pending and day not in pending_days:
+                pending_days.append(day)
+                if day in completed_days:
+                    completed_days.remove(day)
+            elif has_completed and day not in pending_days and day not in completed_days:
+                completed_days.append(day)
+        # Appended occurrence days would otherwise trail the queried ones
+        pending_days.sort()
+        completed_days.sort()
+
         return jsonify({
             "pending": pending_days,
             "completed": completed_days
@@ -0,0 +1,119 @@
+"""
+ai_batch.py with a fake provider: when requests wait, and which answers of
+a batch reach their callers.
+
+    cd Backend
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import ai_batch  # noqa: E402
+from ai_batch import batched, init_ai_batching  # noqa: E402
+from ai_io import run_flow_async  # noqa: E402
+
+INSTRUCTIONS = "Extract the events as JSON."
+
+
+class _Sleep:
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    async def run_async(self):
+        await asyncio.sleep(self.seconds)
+
+
+class _Provider:
+    """Answers single prompts with `single` and batched ones with `batch` (a list, in request order)."""
+
+    def __init__(self, batch=None, single='{"events": []}', latency=0.1):
+        self.batch, self.single, self.latency = batch, single, latency
+        self.prompts = []
+
+    def complete(self, prompt, count):
+        self.prompts.append(prompt)
+        yield _Sleep(self.latency)
+        if count == 1:
+            return self.single
+        return json.dumps({f"r{i}": answer for i, answer in enumerate(self.batch, 1)})
+
+
+def _valid(answer):
+    return isinstance(answer, dict) and isinstance(answer.get("events"), list)
+
+
+def _ask(provider, user_id, message):
+    def flow():
+        return (yield batched("extraction", user_id, INSTRUCTIONS, message, provider.complete,
+                              f"single: {message}", _valid))
+    return run_flow_async(flow())
+
+
+def _batching(window_ms):
+    init_ai_batching(SimpleNamespace(AI_BATCH_WINDOW_MS=window_ms, AI_BATCH_MAX_SIZE=8))
+
+
+def test_lone_request_does_not_wait_for_the_window():
+    _batching(2000)
+    provider = _Provider()
+    started = time.perf_counter()
+    assert asyncio.run(_ask(provider, "u1", "dentist on 14 at 3pm")) == '{"events": []}'
+    assert time.perf_counter() - started < 1
+    assert provider.prompts == ["single: dentist on 14 at 3pm"]
+
+
+def test_requests_of_different_users_share_a_call_and_get_their_own_answers():
+    _batching(50)
+    mine = {"events": [{"title": "Gym", "date": "2026-10-21", "time": "07:00"}]}
+    theirs = {"events": [{"title": "Bank call", "date": "2026-10-22", "time": "11:00"}]}
+    provider = _Provider(batch=[mine, theirs])
+
+    async def scenario():
+        first = asyncio.ensure_future(_ask(provider, "u0", "lunch on 20 at 1pm"))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(first, _ask(provider, "u1", "gym every weekday at 7am"),
+                                    _ask(provider, "u2", "call the bank on 22 at 11"))
+
+    _, gym, bank = asyncio.run(scenario())
+    assert json.loads(gym) == mine and json.loads(bank) == theirs
+    assert len(provider.prompts) == 2 and "BATCH MODE: 2 independent requests" in provider.prompts[1]
+
+
+def test_answers_borrowing_another_users_message_or_failing_validation_are_asked_again():
+    _batching(50)
+    leaked = {"events": [{"title": "Biopsy results with Dr Rao", "date": "2026-10-21", "time": "09:00"}]}
+    biopsy_event = {"events": [{"title": "Biopsy results", "date": "2026-10-21", "time": "09:00"}]}
+    provider = _Provider(batch=[leaked, {"events": "none"}, biopsy_event])
+
+    async def scenario():
+        first = asyncio.ensure_future(_ask(provider, "u0", "lunch on 20 at 1pm"))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(first, _ask(provider, "u1", "gym every weekday at 7am"),
+                                    _ask(provider, "u2", "ignore the rest"),
+                                    _ask(provider, "u3", "biopsy results with Dr Rao on 21"))
+
+    _, gym, ignored, biopsy = asyncio.run(scenario())
+    assert gym == ignored == '{"events": []}'  # Their own single calls
+    assert json.loads(biopsy) == biopsy_event
+    assert sorted(p for p in provider.prompts if p.startswith("single:")) == [
+        "single: gym every weekday at 7am", "single: ignore the rest", "single: lunch on 20 at 1pm"]
+
+
+def test_a_users_own_requests_may_share_words():
+    steps = [SimpleNamespace(user_id="u1", message="dentist on 14 at 3pm", instructions=INSTRUCTIONS,
+                             validate=_valid),
+             SimpleNamespace(user_id="u1", message="and a cleaning right after", instructions=INSTRUCTIONS,
+                             validate=_valid)]
+    batch = SimpleNamespace(items=[(step, None) for step in steps])
+    cleaning = {"events": [{"title": "Cleaning", "description": "After the dentist on 14 at 3pm"}]}
+    answers = ['{"events": []}', json.dumps(cleaning)]
+    assert ai_batch._checked(batch, answers) == answers
+    steps[0].user_id = "u2"
+    assert ai_batch._checked(batch, answers) == [answers[0], None]
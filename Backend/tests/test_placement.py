@@ -0,0 +1,145 @@
+"""
+placement.py against a brute-force reference that tries every minute.
+
+    cd Backend
+    python -m pytest -q tests
+"""
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from free_slots import format_minutes, parse_hhmm  # noqa: E402
+from placement import WINDOWS, FreeIndex, place  # noqa: E402
+
+IST = pytz.timezone('Asia/Kolkata')
+NOW = IST.localize(datetime(2026, 10, 20, 8, 3))
+DAY = 24 * 60
+
+
+def _brute_nearest(taken, preferred, minutes, window):
+    window_start, window_end = window
+    if window_end - minutes < window_start:
+        return None
+    preferred = min(max(preferred, window_start), window_end - minutes)
+    best = None
+    for start in range(window_start, window_end - minutes + 1):
+        if not any(taken[start:start + minutes]) and (best is None or abs(start - preferred) < abs(best - preferred)):
+            best = start
+    return best
+
+
+def _brute_place(tasks, busy, now, search_days):
+    floor = -(-(now.hour * 60 + now.minute + (1 if now.second else 0)) // 5) * 5
+    taken = {}
+
+    def day_taken(day):
+        if day not in taken:
+            minutes = [False] * DAY
+            blocked = DAY if day < now.date().isoformat() else floor if day == now.date().isoformat() else 0
+            for m in range(blocked):
+                minutes[m] = True
+            for start, end in busy.get(day, ()):
+                for m in range(start, end):
+                    minutes[m] = True
+            taken[day] = minutes
+        return taken[day]
+
+    def reserve(day, start, end):
+        minutes = day_taken(day)
+        for m in range(start, min(end, DAY)):
+            minutes[m] = True
+
+    results, flexible = [dict(t) for t in tasks], []
+    for task in results:
+        start, minutes = parse_hhmm(task['time']), task['duration_minutes']
+        if task['fixed']:
+            reserve(task['date'], start, start + minutes)
+        else:
+            flexible.append((task['date'], start, minutes, task))
+    flexible.sort(key=lambda item: (item[0], item[1], -item[2]))
+    for day, start, minutes, task in flexible:
+        first = max(date.fromisoformat(day), now.date())
+        found = None
+        for offset in range(search_days + 1):
+            candidate_day = (first + timedelta(days=offset)).isoformat()
+            window = WINDOWS[task['window']]
+            for candidate_window in (window, WINDOWS['any']) if window != WINDOWS['any'] else (window,):
+                candidate = _brute_nearest(day_taken(candidate_day), start, minutes, candidate_window)
+                if candidate is not None:
+                    found = candidate_day, candidate
+                    break
+            if found:
+                break
+        if found:
+            reserve(found[0], found[1], found[1] + minutes)
+            task['date'], task['time'] = found[0], format_minutes(found[1])
+        else:
+            task['conflict'] = True
+    return results
+
+
+def _random_busy(rng, days):
+    busy = {}
+    for offset in range(days):
+        day = (NOW.date() + timedelta(days=offset)).isoformat()
+        intervals = []
+        for _ in range(rng.randint(0, 12)):
+            start = rng.randrange(0, DAY - 15, 5)
+            intervals.append((start, min(DAY, start + rng.choice([15, 30, 45, 60, 90, 120]))))
+        busy[day] = intervals
+    return busy
+
+
+def test_nearest_shifts_earlier_within_the_gap_holding_the_preferred_time():
+    index = FreeIndex({'2026-10-21': [(0, 540), (600, DAY)]}, NOW)
+    assert index.nearest('2026-10-21', 570, 60, WINDOWS['morning']) == 540
+
+
+def test_nearest_clamps_preferred_time_into_the_window():
+    index = FreeIndex({'2026-10-21': []}, NOW)
+    assert index.nearest('2026-10-21', 20 * 60, 60, WINDOWS['morning']) == 11 * 60
+    assert index.nearest('2026-10-21', 60, 60, WINDOWS['evening']) == 17 * 60
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(2000):
+        busy = {'2026-10-21': _random_busy(rng, 1)['2026-10-20']}
+        index = FreeIndex(busy, NOW)
+        taken = [False] * DAY
+        for start, end in busy['2026-10-21']:
+            for m in range(start, end):
+                taken[m] = True
+        window = rng.choice(list(WINDOWS.values()))
+        preferred, minutes = rng.randrange(0, DAY, 5), rng.choice([15, 30, 60, 120, 240])
+        expected = _brute_nearest(taken, preferred, minutes, window)
+        assert index.nearest('2026-10-21', preferred, minutes, window) == expected, (busy, preferred, minutes, window)
+
+
+def test_place_matches_brute_force():
+    rng = random.Random(11)
+    for _ in range(150):
+        busy = _random_busy(rng, 6)
+        tasks = []
+        for i in range(rng.randint(1, 25)):
+            tasks.append({
+                'title': f'Task {i}',
+                'date': (NOW.date() + timedelta(days=rng.randrange(-1, 3))).isoformat(),
+                'time': format_minutes(rng.randrange(0, DAY, 15)),
+                'duration_minutes': rng.choice([15, 30, 45, 60, 90]),
+                'window': rng.choice(list(WINDOWS)),
+                'fixed': rng.random() < 0.15,
+            })
+        expected = _brute_place(tasks, busy, NOW, 2)
+        placed = place([dict(t) for t in tasks], busy, NOW, search_days=2)
+        for got, want in zip(placed, expected):
+            if want.get('conflict') and not want['fixed']:
+                assert got.get('conflict')
+            elif not want['fixed']:
+                assert (got['date'], got['time']) == (want['date'], want['time']), (busy, tasks)
@@ -0,0 +1,121 @@
+"""
+recurrence.py: rule expansion on its own, and per-occurrence overrides
+applied on read on a SQLite primary.
+
+    cd Backend
+    python -m pytest -q tests
+"""
+import os
+import sys
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import database  # noqa: E402
+import schema  # noqa: E402
+from recurrence import create_recurring_event, expand_rule, get_occurrences, recurrence_bp  # noqa: E402
+
+MON, WED = 1 << 0, 1 << 2
+
+
+def _days(*args):
+    return [day.isoformat() for day in expand_rule(*args)]
+
+
+def test_daily_rule_jumps_to_the_window_on_its_interval():
+    # Every third day from 1 Oct: 1, 4, ..., 19, 22, 25, 28
+    assert _days('daily', 3, 0, '2026-10-01', None, '2026-10-20', '2026-10-28') == [
+        '2026-10-22', '2026-10-25', '2026-10-28']
+    # A weekly cadence from a Monday decades back still lands on Mondays
+    assert _days('daily', 7, 0, '1990-01-01', None, '2026-10-01', '2026-10-31') == [
+        '2026-10-05', '2026-10-12', '2026-10-19', '2026-10-26']
+    assert _days('daily', 1, 0, '2026-10-25', '2026-10-26', '2026-10-20', '2026-10-31') == [
+        '2026-10-25', '2026-10-26']
+
+
+def test_weekly_rule_keeps_its_weekdays_and_skipped_weeks():
+    # Starts Monday 5 Oct 2026, every other week on Monday and Wednesday
+    assert _days('weekly', 2, MON | WED, '2026-10-05', None, '2026-10-06', '2026-11-04') == [
+        '2026-10-07', '2026-10-19', '2026-10-21', '2026-11-02', '2026-11-04']
+
+
+def test_monthly_rule_skips_months_without_its_day():
+    assert _days('monthly', 1, 0, '2026-01-31', None, date(2026, 1, 1), date(2026, 6, 30)) == [
+        '2026-01-31', '2026-03-31', '2026-05-31']
+    assert _days('monthly', 1, 0, '2026-01-31', '2026-01-30', '2026-01-01', '2026-12-31') == []
+
+
+@pytest.fixture
+def client(tmp_path):
+    config = SimpleNamespace(DB_CONFIG={}, DB_POOL_SIZE=2, DB_BACKEND="sqlite", SQLITE_BUSY_TIMEOUT=5,
+                             SQLITE_PATH=str(tmp_path / "primary.sqlite3"))
+    database.init_pool(config)
+    assert schema.init_sqlite(config)
+
+    conn = database.get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (user_id, username, email, phone, password) VALUES (%s, %s, %s, %s, %s)",
+                   ("alice", "alice", "alice@example.com", "555-0100", "x"))
+    rule_id = create_recurring_event(cursor, "alice", {"title": "Gym", "date": "2026-10-19", "time": "07:00"},
+                                     {"freq": "daily"})
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(recurrence_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = "alice"
+    client.rule_id = rule_id
+    return client
+
+
+def _override(client, day, **fields):
+    response = client.post(f"/api/tasks/recurring/{client.rule_id}/occurrences/{day}", json=fields)
+    assert response.status_code == 200, response.json
+
+
+def _week(include_done=True):
+    return {o['date']: o for o in get_occurrences("alice", "2026-10-19", "2026-10-25", include_done=include_done)}
+
+
+def test_overrides_complete_cancel_and_edit_single_occurrences(client):
+    _override(client, "2026-10-20", done=True)
+    _override(client, "2026-10-21", cancelled=True)
+    _override(client, "2026-10-22", title="Leg day", time="18:00")
+
+    week = _week()
+    assert sorted(week) == ['2026-10-19', '2026-10-20', '2026-10-22', '2026-10-23', '2026-10-24', '2026-10-25']
+    assert week['2026-10-20']['done'] and not week['2026-10-19']['done']
+    assert (week['2026-10-22']['title'], week['2026-10-22']['time']) == ("Leg day", "18:00")
+    assert (week['2026-10-23']['title'], week['2026-10-23']['time']) == ("Gym", "07:00")
+    assert '2026-10-20' not in _week(include_done=False)
+
+
+def test_partial_edit_keeps_done_and_cancelled(client):
+    _override(client, "2026-10-20", done=True)
+    _override(client, "2026-10-21", cancelled=True)
+    _override(client, "2026-10-20", title="Swim")
+    _override(client, "2026-10-21", time="08:00")
+
+    week = _week()
+    assert week['2026-10-20']['done'] and week['2026-10-20']['title'] == "Swim"
+    assert '2026-10-21' not in week
+
+    _override(client, "2026-10-20", done=False)
+    _override(client, "2026-10-21", cancelled=False)
+    week = _week()
+    assert not week['2026-10-20']['done'] and week['2026-10-20']['title'] == "Swim"
+    assert week['2026-10-21']['time'] == "08:00"
+
+
+def test_override_on_a_day_without_an_occurrence_is_refused(client):
+    response = client.post(f"/api/tasks/recurring/{client.rule_id}/occurrences/2026-10-18", json={"done": True})
+    assert response.status_code == 404
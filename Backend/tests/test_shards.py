@@ -0,0 +1,127 @@
+"""
+shards.py on a SQLite primary and one SQLite shard.
+
+    cd Backend
+    python -m pytest -q tests
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import database  # noqa: E402
+import schema  # noqa: E402
+import shards  # noqa: E402
+from versioning import bump_data_version  # noqa: E402
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    config = SimpleNamespace(DB_CONFIG={}, DB_POOL_SIZE=2, DB_BACKEND="sqlite", SQLITE_BUSY_TIMEOUT=5,
+                             SQLITE_PATH=str(tmp_path / "primary.sqlite3"),
+                             DB_SHARDS=f"sqlite:///{tmp_path / 'shard1.sqlite3'}", SHARD_MAP_TTL=0)
+    database.init_pool(config)
+    assert schema.init_sqlite(config) and schema.init_shards(config)
+    shards.init_shards(config)
+    yield config
+    shards.init_shards(SimpleNamespace(DB_SHARDS="", SHARD_MAP_TTL=5.0))
+
+
+def _execute(index, query, params=()):
+    conn = shards.connect_shard(index)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall() if cursor.description else None
+        conn.commit()
+        cursor.close()
+        return rows
+    finally:
+        conn.close()
+
+
+def _map_bucket(user_id, shard, frozen=False):
+    _execute(0, "INSERT INTO shard_buckets (bucket, shard, frozen) VALUES (%s, %s, %s)",
+             (shards.bucket_of(user_id), shard, frozen))
+
+
+def test_shard_commit_succeeds_and_retries_the_bump_when_the_primary_refuses_it(cluster, monkeypatch):
+    attempts = []
+
+    def refuse_three_times(user_ids):
+        attempts.append(list(user_ids))
+        return "primary unavailable" if len(attempts) <= 3 else None
+
+    monkeypatch.setattr(shards, "_try_bump", refuse_three_times)
+    monkeypatch.setattr(shards, "BUMP_BACKOFF", 0)
+    monkeypatch.setattr(shards, "BUMP_RETRY_INTERVAL", 0.01)
+    _map_bucket("alice", 1)
+
+    conn = shards.get_shard_connection("alice")
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO events (user_id, title, date, time) VALUES (%s, 'Dentist', '2026-10-21', '15:00')",
+                   ("alice",))
+    bump_data_version(cursor, "alice")
+    conn.commit()  # Does not raise: the event is saved
+    cursor.close()
+    conn.close()
+
+    assert _execute(1, "SELECT title FROM events WHERE user_id = %s", ("alice",)) == [("Dentist",)]
+    deadline = time.monotonic() + 5
+    while shards._pending_bumps["user_ids"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not shards._pending_bumps["user_ids"]
+    assert attempts == [["alice"]] * 4
+
+
+def test_frozen_bucket_refuses_writes_but_not_reads(cluster):
+    _map_bucket("alice", 1, frozen=True)
+    _map_bucket("bob", 1)
+
+    with pytest.raises(shards.BucketMoving):
+        shards.get_shard_connection("alice")
+    with pytest.raises(shards.BucketMoving):
+        shards.ensure_writable("alice")
+    with pytest.raises(shards.BucketMoving):
+        shards.group_by_shard(["bob", "alice"])
+    shards.ensure_writable("bob")
+    assert shards.group_by_shard(["bob", "carol"]) == {1: ["bob"], 0: ["carol"]}
+
+    conn = shards.get_shard_connection("alice", write=False)
+    assert conn is not None
+    conn.close()
+
+
+def test_bucket_moving_is_answered_with_503_and_retry_after(cluster):
+    _map_bucket("alice", 1, frozen=True)
+    app = Flask(__name__)
+    shards.register_shards(app)
+
+    @app.route("/write")
+    def write():
+        shards.get_shard_connection("alice")
+        return "written"
+
+    response = app.test_client().get("/write")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_query_owned_rows_skips_copies_left_on_another_shard(cluster):
+    _map_bucket("alice", 1)
+    for user_id in ("alice", "bob"):
+        _execute(0, "INSERT INTO users (user_id, username, email, phone, password) VALUES (%s, %s, %s, %s, 'x')",
+                 (user_id, user_id, f"{user_id}@example.com", f"555-{user_id}"))
+    insert = "INSERT INTO events (user_id, title, date, time) VALUES (%s, %s, '2026-10-21', '09:00')"
+    _execute(1, insert, ("alice", "Dentist"))
+    _execute(0, insert, ("alice", "Dentist (stale copy)"))  # Left behind by an interrupted move
+    _execute(0, insert, ("bob", "Standup"))
+
+    rows = shards.query_owned_rows("SELECT user_id, title FROM events ORDER BY title", (), 0)
+    assert sorted(rows) == [("alice", "Dentist"), ("bob", "Standup")]
@@ -0,0 +1,125 @@
+"""
+sqlite_backend.py: each MySQL rewrite, as text and run against a file
+database, plus the parameter coercion and executemany() bookkeeping.
+
+    cd Backend
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import sqlite_backend  # noqa: E402
+from sqlite_backend import translate  # noqa: E402
+
+
+@pytest.fixture
+def conn(tmp_path):
+    connection = sqlite_backend.connect(sqlite_backend.engine(str(tmp_path / "test.sqlite3")))
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE stats (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(50) NOT NULL,
+            calls INT NOT NULL DEFAULT 0,
+            max_ms INT NOT NULL DEFAULT 0,
+            UNIQUE KEY uq_stats_name (name)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE notes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            code TEXT,
+            date TEXT,
+            body TEXT,
+            FULLTEXT KEY ft_notes (body)
+        )
+    """)
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+def _rows(conn, query, params=()):
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def test_insert_ignore_skips_duplicates(conn):
+    assert translate("INSERT IGNORE INTO stats (name) VALUES (%s)") == ["INSERT OR IGNORE INTO stats (name) VALUES (?)"]
+    cursor = conn.cursor()
+    cursor.execute("INSERT IGNORE INTO stats (name, calls) VALUES (%s, %s)", ("login", 1))
+    cursor.execute("INSERT IGNORE INTO stats (name, calls) VALUES (%s, %s)", ("login", 5))
+    assert cursor.rowcount == 0
+    conn.commit()
+    assert _rows(conn, "SELECT name, calls FROM stats") == [("login", 1)]
+
+
+def test_on_duplicate_key_update_becomes_an_upsert(conn):
+    query = ("INSERT INTO stats (name, calls, max_ms) VALUES (%s, 1, %s) "
+             "ON DUPLICATE KEY UPDATE calls = calls + 1, max_ms = GREATEST(max_ms, VALUES(max_ms))")
+    assert translate(query) == [
+        "INSERT INTO stats (name, calls, max_ms) VALUES (?, 1, ?) "
+        "ON CONFLICT DO UPDATE SET calls = calls + 1, max_ms = MAX(max_ms, excluded.max_ms)"]
+    cursor = conn.cursor()
+    for ms in (40, 90, 60):
+        cursor.execute(query, ("search", ms))
+    conn.commit()
+    assert _rows(conn, "SELECT name, calls, max_ms FROM stats") == [("search", 3, 90)]
+
+
+def test_match_against_scores_boolean_mode_terms(conn):
+    query = "SELECT id FROM notes WHERE MATCH(body) AGAINST (%s IN BOOLEAN MODE) ORDER BY id"
+    assert translate(query) == ["SELECT id FROM notes WHERE MATCH_AGAINST(body, ?) ORDER BY id"]
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO notes (body) VALUES (%s)",
+                       [("dentist appointment",), ("dental cleaning",), ("gym session",)])
+    conn.commit()
+    assert _rows(conn, query, ("dent*",)) == [(1,), (2,)]
+    assert _rows(conn, query, ("+dent* -cleaning",)) == [(1,)]
+    assert _rows(conn, query, ("gym",)) == [(3,)]
+    assert _rows(conn, query, ("+dentist +gym",)) == []
+
+
+def test_auto_increment_increment_reads_as_one(conn):
+    assert translate("SELECT @@auto_increment_increment AS step") == ["SELECT 1 AS step"]
+    assert _rows(conn, "SELECT @@auto_increment_increment AS step") == [(1,)]
+
+
+def test_string_literals_are_not_rewritten():
+    query = "SELECT 'INSERT IGNORE %s', IF(a, 1, 2) FROM t WHERE b = %s"
+    assert translate(query) == ["SELECT 'INSERT IGNORE %s', IIF(a, 1, 2) FROM t WHERE b = ?"]
+
+
+def test_coerce_binds_only_integer_looking_strings():
+    assert sqlite_backend._coerce("2026") == 2026
+    assert sqlite_backend._coerce("-5") == -5
+    for value in ("007", "12.5", "1e3", " 42", "abc", "12345678901234567890", None, 3.5):
+        assert sqlite_backend._coerce(value) == value
+
+
+def test_coerced_strings_compare_numerically_and_stay_text_in_text_columns(conn):
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO notes (code, date) VALUES (%s, %s)", ("42", "2026-10-21"))
+    cursor.execute("INSERT INTO notes (code, date) VALUES (%(code)s, %(date)s)", {"code": "0042", "date": "2025-01-02"})
+    conn.commit()
+    assert _rows(conn, "SELECT code FROM notes ORDER BY id") == [("42",), ("0042",)]
+    assert _rows(conn, "SELECT id FROM notes WHERE YEAR(date) = %s AND MONTH(date) = %s", ("2026", "10")) == [(1,)]
+
+
+def test_executemany_reports_the_first_new_id_and_total_rowcount(conn):
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO stats (name) VALUES (%s)", ("existing",))
+    cursor.executemany("INSERT INTO stats (name) VALUES (%s)", [("a",), ("b",), ("c",)])
+    assert (cursor.lastrowid, cursor.rowcount) == (2, 3)
+    cursor.executemany("INSERT IGNORE INTO stats (name) VALUES (%s)", [("a",), ("d",)])
+    assert cursor.rowcount == 1
+    conn.commit()
+    assert _rows(conn, "SELECT name FROM stats ORDER BY id") == [("existing",), ("a",), ("b",), ("c",), ("d",)]
@@ -0,0 +1,87 @@
+"""
+versioning.py on a SQLite primary: ETags follow the user's data version and
+a matching If-None-Match is answered without running the view.
+
+    cd Backend
+    python -m pytest -q tests
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import database  # noqa: E402
+import schema  # noqa: E402
+from versioning import bump_data_version, conditional_get  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path):
+    config = SimpleNamespace(DB_CONFIG={}, DB_POOL_SIZE=2, DB_BACKEND="sqlite", SQLITE_BUSY_TIMEOUT=5,
+                             SQLITE_PATH=str(tmp_path / "primary.sqlite3"))
+    database.init_pool(config)
+    assert schema.init_sqlite(config)
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.view_calls = 0
+
+    @app.route("/api/items")
+    @conditional_get()
+    def items():
+        app.view_calls += 1
+        return jsonify({"calls": app.view_calls})
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = "alice"
+    return client
+
+
+def _bump(user_id):
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        bump_data_version(cursor, user_id)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def test_matching_etag_gets_304_without_running_the_view(client):
+    first = client.get("/api/items")
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    again = client.get("/api/items", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert client.application.view_calls == 1
+
+
+def test_write_changes_the_etag(client):
+    before = client.get("/api/items").headers["ETag"]
+    _bump("bob")  # Someone else's write leaves alice's ETag alone
+    assert client.get("/api/items", headers={"If-None-Match": before}).status_code == 304
+
+    _bump("alice")
+    after = client.get("/api/items", headers={"If-None-Match": before})
+    assert after.status_code == 200 and after.json == {"calls": 2}
+    assert after.headers["ETag"] != before
+
+
+def test_etag_depends_on_the_url(client):
+    assert client.get("/api/items?page=1").headers["ETag"] != client.get("/api/items?page=2").headers["ETag"]
+
+
+def test_anonymous_requests_run_the_view_without_an_etag(client):
+    with client.session_transaction() as session:
+        session.clear()
+    response = client.get("/api/items")
+    assert response.status_code == 200 and "ETag" not in response.headers
@@ -1,35 +1,29 @@
 from flask import Blueprint, request, jsonify, session
 import mysql.connector
 from mysql.connector import Error
-from bcrypt import hashpw, gensalt, checkpw
-from config import Config
+from passwords import hash_password, verify_password, HashingOverloaded
+from database import get_db_connection
+from replicas import get_read_connection
+from shards import get_shard_read_connection
+from archive import events_source
+from versioning import bump_data_version_with_peers, conditional_get
+from collaboration import adjacency_cache
+from recurrence import month_day_states
 from dotenv import load_dotenv
 
 load_dotenv()
 
 profile_bp = Blueprint('profile', __name__)
 
-# --- Database Configuration from Environment Variables ---
-DB_HOST = Config.DB_HOST
-DB_USER = Config.DB_USER
-DB_PASSWORD = Config.DB_PASSWORD
-DB_DATABASE = Config.DB_DATABASE
-
-def get_db_connection():
-    try:
-        return mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASSWORD, database=DB_DATABASE)
-    except Error as e:
-        print(f"❌ DB Connection Error: {e}")
-        return None
-
 # --- API Endpoints for Profile Data ---
 @profile_bp.route('/api/profile', methods=['GET'])
+@conditional_get()
 def get_profile_data():
     user_id = session.get('user_id')
     if not user_id:
         return jsonify({'message': 'Not logged in'}), 401
 
-    conn = get_db_connection()
+    conn = get_read_connection()
     if conn is None: return jsonify({'message': 'Database connection error'}), 500
     
     cursor = conn.cursor(dictionary=True)
@@ -39,15 +33,28 @@ def get_profile_data():
 
         if not user_data: return jsonify({'message': 'User not found'}), 404
 
-        # Updated stat queries
-        cursor.execute("SELECT COUNT(*) as tasks_done FROM events WHERE user_id = %s AND done = TRUE", (user_id,))
-        tasks_done = cursor.fetchone()['tasks_done']
-        
-        cursor.execute("SELECT COUNT(*) as undone_tasks FROM events WHERE user_id = %s AND done = FALSE", (user_id,))
-        undone_tasks = cursor.fetchone()['undone_tasks']
-
-        cursor.execute("SELECT COUNT(*) as total_tasks FROM events WHERE user_id = %s", (user_id,))
-        total_tasks = cursor.fetchone()['total_tasks']
+        # Updated stat queries (events live on the user's shard)
+        events_conn = get_shard_read_connection(user_id)
+        if events_conn is None: return jsonify({'message': 'Database connection error'}), 500
+        events_cursor = events_conn.cursor(dictionary=True)
+        try:
+            events_cursor.execute("SELECT COUNT(*) as tasks_done FROM events WHERE user_id = %s AND done = TRUE", (user_id,))
+            tasks_done = events_cursor.fetchone()['tasks_done']
+
+            events_cursor.execute("SELECT COUNT(*) as undone_tasks FROM events WHERE user_id = %s AND done = FALSE", (user_id,))
+            undone_tasks = events_cursor.fetchone()['undone_tasks']
+
+            events_cursor.execute("SELECT COUNT(*) as total_tasks FROM events WHERE user_id = %s", (user_id,))
+            total_tasks = events_cursor.fetchone()['total_tasks']
+
+            # Archived events (archive.py) are all completed ones
+            events_cursor.execute("SELECT COUNT(*) as archived_tasks FROM events_archive WHERE user_id = %s", (user_id,))
+            archived_tasks = events_cursor.fetchone()['archived_tasks']
+            tasks_done += archived_tasks
+            total_tasks += archived_tasks
+        finally:
+            events_cursor.close()
+            events_conn.close()
 
         profile_data = {
             'username': user_data['username'],
@@ -83,7 +90,9 @@ def update_profile_data():
     cursor = conn.cursor()
     try:
         cursor.execute("UPDATE users SET username = %s, profile_bio = %s WHERE user_id = %s", (new_username, new_bio, user_id))
+        peer_ids = bump_data_version_with_peers(cursor, user_id)
         conn.commit()
+        adjacency_cache.invalidate(*peer_ids)
         return jsonify({'message': 'Profile updated successfully'}), 200
     except mysql.connector.Error as err:
         conn.rollback()
@@ -107,7 +116,9 @@ def update_profile_photo():
     cursor = conn.cursor()
     try:
         cursor.execute("UPDATE users SET photo_url = %s WHERE user_id = %s", (new_photo_url, user_id))
+        peer_ids = bump_data_version_with_peers(cursor, user_id)
         conn.commit()
+        adjacency_cache.invalidate(*peer_ids)
         return jsonify({'message': 'Profile photo updated successfully'}), 200
     except mysql.connector.Error as err:
         conn.rollback()
@@ -136,6 +147,7 @@ def update_contact_info():
             return jsonify({'message': 'Email or phone number is already in use.'}), 409
         
         cursor.execute("UPDATE users SET email = %s, phone = %s WHERE user_id = %s", (new_email, new_phone, user_id))
+        bump_data_version_with_peers(cursor, user_id)  # assigner_email appears in peers' task lists
         conn.commit()
         return jsonify({'message': 'Contact information updated successfully'}), 200
     except mysql.connector.Error as err:
@@ -163,15 +175,17 @@ def change_password():
         user = cursor.fetchone()
         if not user: return jsonify({'message': 'User not found'}), 404
 
-        if checkpw(old_password.encode('utf-8'), user['password'].encode('utf-8')):
-            hashed_new_password = hashpw(new_password.encode('utf-8'), gensalt())
+        if verify_password(old_password, user['password']):
+            hashed_new_password = hash_password(new_password)
             update_cursor = conn.cursor()
-            update_cursor.execute("UPDATE users SET password = %s WHERE user_id = %s", (hashed_new_password.decode('utf-8'), user_id))
+            update_cursor.execute("UPDATE users SET password = %s WHERE user_id = %s", (hashed_new_password, user_id))
             conn.commit()
             update_cursor.close()
             return jsonify({'message': 'Password updated successfully'}), 200
         else:
             return jsonify({'message': 'Incorrect old password'}), 403
+    except HashingOverloaded:
+        return jsonify({'message': 'Server is busy, please try again.'}), 503, {'Retry-After': '1'}
     except mysql.connector.Error as err:
         conn.rollback()
         return jsonify({'message': f'Server error: {err}'}), 500
@@ -181,6 +195,7 @@ def change_password():
 
 # New endpoint to fetch events for the calendar
 @profile_bp.route('/api/events', methods=['GET'])
+@conditional_get()
 def get_events_for_month():
     user_id = session.get('user_id')
     if not user_id: return jsonify({'message': 'Not logged in'}), 401
@@ -191,14 +206,16 @@ def get_events_for_month():
     if not year or not month:
         return jsonify({'message': 'Year and month parameters are required'}), 400
 
-    conn = get_db_connection()
+    conn = get_shard_read_connection(user_id)
     if conn is None: return jsonify({'message': 'Database connection error'}), 500
 
     cursor = conn.cursor(dictionary=True)
     try:
         # Query for events in the given month and year
         date_pattern = f"{year}-{int(month):02d}-%"
-        cursor.execute("SELECT date, done FROM events WHERE user_id = %s AND date LIKE %s", (user_id, date_pattern))
+        source, params = events_source("user_id = %s AND date LIKE %s", (user_id, date_pattern),
+                                       f"{year}-{int(month):02d}-01", columns="date, done")
+        cursor.execute(f"SELECT date, done FROM {source} e", params)
         events = cursor.fetchall()
 
         events_by_day = {}
@@ -213,6 +230,11 @@ def get_events_for_month():
             else:
                 events_by_day[day]['hasPending'] = True
 
+        for day, (has_pending, has_completed) in month_day_states(user_id, year, month, cursor).items():
+            state = events_by_day.setdefault(day, {'hasPending': False, 'hasCompleted': False})
+            state['hasPending'] |= has_pending
+            state['hasCompleted'] |= has_completed
+
         return jsonify(events_by_day)
 
     except mysql.connector.Error as err:
@@ -0,0 +1,124 @@
+import hashlib
+from functools import wraps
+from flask import g, request, session, make_response
+from database import get_db_connection
+from mysql.connector import Error
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- Per-User Data Versions ---
+# Every write that changes what a user can read bumps that user's version in
+# the same transaction. Read endpoints derive their ETag from the version, so
+# a conditional GET can be answered with 304 after one primary-key lookup,
+# without touching the events table.
+
+
+_bump_listeners = []
+
+
+def on_data_version_bump(listener):
+    """
+    Registers `listener(user_ids)` to run whenever versions are bumped in this
+    process, e.g. to drop cache entries early. Listeners run once the bump has
+    committed, so a read they trigger sees the write.
+    """
+    _bump_listeners.append(listener)
+    return listener
+
+
+def bump_data_version(cursor, *user_ids):
+    """
+    Increments the data version of each user. Call before conn.commit() so the
+    bump commits (or rolls back) together with the write it describes.
+    """
+    user_ids = [u for u in dict.fromkeys(user_ids) if u]
+    if not user_ids:
+        return
+    defer = getattr(cursor, "defer_version_bumps", None)
+    if defer is not None:
+        defer(user_ids)  # A shard cursor: versions live on the primary (shards.py)
+        return
+    cursor.executemany(
+        "INSERT INTO user_data_versions (user_id, version) VALUES (%s, 1) "
+        "ON DUPLICATE KEY UPDATE version = version + 1",
+        [(user_id,) for user_id in user_ids]
+    )
+    after_commit = getattr(cursor, "after_commit", None)
+    if after_commit is not None:
+        after_commit(lambda: notify_bump_listeners(user_ids))
+    else:
+        notify_bump_listeners(user_ids)
+
+
+def notify_bump_listeners(user_ids):
+    """Runs the on_data_version_bump() listeners, e.g. when a bump could not be written."""
+    for listener in _bump_listeners:
+        listener(user_ids)
+
+
+def bump_data_version_with_peers(cursor, user_id):
+    """
+    Bumps `user_id` and all of their collaborators (whose collaborator lists
+    and task views show this user's profile). Returns the peer ids.
+    """
+    cursor.execute("SELECT peer_id FROM collaboration_edges WHERE user_id = %s", (user_id,))
+    peer_ids = [row[0] if not isinstance(row, dict) else row['peer_id'] for row in cursor.fetchall()]
+    bump_data_version(cursor, user_id, *peer_ids)
+    return peer_ids
+
+
+def get_data_version(user_id):
+    """Returns the user's current data version, or None if it can't be read."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM user_data_versions WHERE user_id = %s", (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    except Error as e:
+        log.error("versioning.read_failed", user_id=user_id, error=str(e))
+        return None
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+def make_etag(user_id, version, *parts):
+    raw = "|".join([user_id, str(version), request.full_path, *map(str, parts)])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+
+def conditional_get(extra=None):
+    """
+    Decorator for per-user read endpoints. Emits an ETag built from the user's
+    data version and the request URL, and answers a matching If-None-Match
+    with 304 before the view runs. `extra` is an optional callable returning
+    anything else the response depends on (e.g. today's date).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = session.get('user_id')
+            if not user_id:
+                return view(*args, **kwargs)
+            version = get_data_version(user_id)
+            if version is None:
+                return view(*args, **kwargs)
+            g.data_version = (user_id, version)  # Replicas must have reached it (replicas.py)
+
+            etag = make_etag(user_id, version, extra() if extra else "")
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
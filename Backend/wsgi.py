@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    waitress-serve --threads=8 wsgi:app     (Windows)
+
+See DEPLOYMENT.md for the full multi-core recipe.
+"""
+from app import create_app
+
+app = create_app()